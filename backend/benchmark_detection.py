@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import json
+import argparse
+import cv2
+import numpy as np
+
+# Ensure project root on sys.path when invoked directly
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.config import FACE_DETECTION_SCALE_FACTOR, FACE_DETECTION_MIN_NEIGHBORS
+from backend.detection import detect_faces_scaled, face_size_limits
+from backend.tracking import iou
+
+# Compare Haar detection time and recall at several detection scales on a
+# recorded video. Recall is measured against full-resolution (1x) detections
+# without size limits, which act as the reference.
+#
+#   python backend/benchmark_detection.py classroom.mp4 --scales 1 0.5 0.33
+
+def match_count(reference, boxes, threshold=0.5):
+    """Number of reference boxes overlapped by some detected box with IoU >= threshold."""
+    matched = 0
+    for ref in reference:
+        if any(iou(ref, box) >= threshold for box in boxes):
+            matched += 1
+    return matched
+
+def run_benchmark(video_path, scales, max_frames=None, use_size_limits=True):
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video: {video_path}")
+
+    timings = {scale: [] for scale in scales}
+    matched = {scale: 0 for scale in scales}
+    detected = {scale: 0 for scale in scales}
+    reference_total = 0
+    frames = 0
+
+    while max_frames is None or frames < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        reference = detect_faces_scaled(cascade, gray, FACE_DETECTION_SCALE_FACTOR,
+                                        FACE_DETECTION_MIN_NEIGHBORS)
+        reference_total += len(reference)
+
+        min_size, max_size = face_size_limits(gray.shape[1]) if use_size_limits else (None, None)
+        for scale in scales:
+            start = time.perf_counter()
+            boxes = detect_faces_scaled(cascade, gray, FACE_DETECTION_SCALE_FACTOR,
+                                        FACE_DETECTION_MIN_NEIGHBORS, detection_scale=scale,
+                                        min_size=min_size, max_size=max_size)
+            timings[scale].append(time.perf_counter() - start)
+            detected[scale] += len(boxes)
+            matched[scale] += match_count(reference, boxes)
+
+    cap.release()
+
+    results = []
+    for scale in scales:
+        ms = np.array(timings[scale]) * 1000 if timings[scale] else np.zeros(1)
+        results.append({
+            "scale": scale,
+            "frames": frames,
+            "mean_ms": float(ms.mean()),
+            "p95_ms": float(np.percentile(ms, 95)),
+            "detections": detected[scale],
+            "recall": matched[scale] / reference_total if reference_total else None,
+        })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Haar detection at several scales")
+    parser.add_argument("video", help="Recorded classroom video")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.5, 0.33])
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--no-size-limits", action="store_true",
+                        help="Do not apply the classroom min/max face size (CLASSROOM_*_DISTANCE in config)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.video, args.scales, args.max_frames, not args.no_size_limits)
+
+    print(f"{'scale':>6} {'mean ms':>9} {'p95 ms':>9} {'faces':>7} {'recall':>7}")
+    for r in results:
+        recall = f"{r['recall']:.3f}" if r["recall"] is not None else "n/a"
+        print(f"{r['scale']:>6.2f} {r['mean_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['detections']:>7} {recall:>7}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
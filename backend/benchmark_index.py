@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import json
+import argparse
+import cv2
+import numpy as np
+
+# Ensure project root on sys.path when invoked directly
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.config import MODEL_PATH, STUDENT_MAP_PATH
+from backend.lbph_engine import LBPHEngine
+from backend.lbph_index import CentroidIndex
+from backend.face_dataset import FaceDataset
+
+# Accuracy/latency trade-off of centroid search against exhaustive search.
+# Test images are read from <test_dir>/<roll_no>/*.jpg (same layout as the
+# training folder) and each search strategy is scored on:
+#   - accuracy: predicted label equals the folder's label
+#   - agreement: predicted label equals the exhaustive search label
+#   - ms/face: mean prediction time per face
+#
+#   python backend/benchmark_index.py --test-dir data/faces/test --top-k 1 3 5 10
+
+def load_test_faces(test_dir, cache_dir, student_id_map):
+    """Test faces and their model labels, read through the packed face cache."""
+    dataset = FaceDataset(test_dir, cache_dir)
+    dataset.sync()
+    label_of_student = np.array([student_id_map.get(name, -1) for name in dataset.students], dtype=np.int32)
+    labels = label_of_student[dataset.labels] if len(dataset) else np.empty(0, np.int32)
+    known = labels >= 0
+    return dataset.faces[known], labels[known]
+
+def time_predictions(predict, queries):
+    start = time.perf_counter()
+    predictions = predict(queries)
+    elapsed = time.perf_counter() - start
+    return np.array([label for label, _ in predictions]), elapsed * 1000 / max(1, len(queries))
+
+def run_benchmark(test_dir, cache_dir, top_ks):
+    with open(STUDENT_MAP_PATH) as f:
+        student_id_map = json.load(f)
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(MODEL_PATH)
+    engine = LBPHEngine.from_recognizer(recognizer)
+
+    faces, truth = load_test_faces(test_dir, cache_dir, student_id_map)
+    if len(faces) == 0:
+        raise RuntimeError(f"No test images for known students under {test_dir}")
+    queries = engine.compute_histograms(faces)
+
+    exhaustive, exhaustive_ms = time_predictions(engine.predict_histograms, queries)
+    results = [{
+        "search": "exhaustive",
+        "top_k": None,
+        "accuracy": float((exhaustive == truth).mean()),
+        "agreement": 1.0,
+        "ms_per_face": exhaustive_ms,
+    }]
+    for k in top_ks:
+        index = CentroidIndex.build(engine, top_k=k)
+        labels, ms = time_predictions(lambda q: index.predict_histograms(engine, q), queries)
+        results.append({
+            "search": "centroid",
+            "top_k": k,
+            "accuracy": float((labels == truth).mean()),
+            "agreement": float((labels == exhaustive).mean()),
+            "ms_per_face": ms,
+        })
+    return {"faces": len(faces), "training_rows": len(engine), "results": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare centroid index and exhaustive LBPH search")
+    parser.add_argument("--test-dir", default=os.path.join(PROJECT_ROOT, "data", "faces", "test"))
+    parser.add_argument("--cache-dir", default=os.path.join(PROJECT_ROOT, "data", "cache", "test"),
+                        help="Packed face cache for the test images")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.test_dir, args.cache_dir, args.top_k)
+    print(f"{report['faces']} test faces, {report['training_rows']} training histograms")
+    print(f"{'search':>10} {'top_k':>6} {'accuracy':>9} {'agreement':>10} {'ms/face':>9}")
+    for r in report["results"]:
+        top_k = r["top_k"] if r["top_k"] is not None else "-"
+        print(f"{r['search']:>10} {top_k:>6} {r['accuracy']:>9.3f} {r['agreement']:>10.3f} {r['ms_per_face']:>9.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
@@ -0,0 +1,421 @@
+import os
+import sys
+import glob
+import time
+import json
+import tempfile
+import argparse
+import subprocess
+from datetime import datetime, timedelta
+import cv2
+import numpy as np
+
+# Ensure project root on sys.path when invoked directly
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.config import (
+    CONFIDENCE_THRESHOLD, DEFAULT_SESSION, DETECTION_SCALE, RECOGNITION_ENGINE, RECOGNITION_SEARCH,
+    CENTROID_TOP_K, FACE_DETECTION_SCALE_FACTOR, FACE_DETECTION_MIN_NEIGHBORS
+)
+from backend.repository import SQLiteRepository
+from backend.tracking import iou
+
+# Headless end-to-end benchmark of the recognizer on recorded input. Frames
+# from videos or image folders go through the same detect / crop / predict
+# functions as backend/face_recognition.py (which loads the trained model on
+# import), and recognized faces are written to a scratch SQLite database
+# through the repository. Reported:
+#   - per-stage latency percentiles (decode, detect, resize, predict, db_write)
+#   - end-to-end FPS and peak resident memory
+# Latency and FPS are medians over --repeat passes after --warmup frames, so
+# a baseline comparison is not decided by one noisy run.
+#   - precision / recall at several confidence thresholds, given ground truth
+#
+#   python backend/benchmark_recognition.py classroom.mp4 frames_dir/ \
+#       --truth truth.json --thresholds 40 50 60 70 80 --json results.json
+#   python backend/benchmark_recognition.py classroom.mp4 --baseline results.json
+#
+# truth.json maps each source (as given on the command line, or its base
+# name) to the faces visible in annotated frames; roll_no null marks a
+# person who is not enrolled and should stay unknown:
+#   {"classroom.mp4": [{"frame": 12, "box": [x, y, w, h], "roll_no": "S01"}, ...]}
+# Only annotated frames are scored.
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+STAGES = ["decode", "detect", "resize", "predict", "db_write"]
+PERCENTILES = [50, 90, 95, 99]
+
+
+def iter_frames(source):
+    """Yield BGR frames from a video file, an image folder or a glob pattern."""
+    if os.path.isdir(source):
+        paths = sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+    elif any(char in source for char in "*?["):
+        paths = sorted(glob.glob(source))
+    else:
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open video: {source}")
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield frame
+        finally:
+            cap.release()
+        return
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is not None:
+            yield frame
+
+
+def load_truth(path, sources):
+    """{source: {frame_index: [(box, roll_no)]}} for the given sources."""
+    if path is None:
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    truth = {}
+    for source in sources:
+        entries = data.get(source, data.get(os.path.basename(os.path.normpath(source)), []))
+        frames = {}
+        for entry in entries:
+            frames.setdefault(entry["frame"], []).append((tuple(entry["box"]), entry.get("roll_no")))
+        truth[source] = frames
+    return truth
+
+
+def match_faces(truth_faces, results, threshold=0.5):
+    """Pair each ground-truth face with the best unused detection (IoU >= threshold).
+
+    Returns ([(roll_no, result or None)], unmatched results).
+    """
+    unused = list(results)
+    pairs = []
+    for box, roll_no in truth_faces:
+        best, best_iou = None, threshold
+        for result in unused:
+            overlap = iou(box, result[:4])
+            if overlap >= best_iou:
+                best, best_iou = result, overlap
+        if best is not None:
+            unused.remove(best)
+        pairs.append((roll_no, best))
+    return pairs, unused
+
+
+def score(observations, thresholds, label_to_name):
+    """Precision / recall of student identification at each threshold.
+
+    observations are (truth roll_no or None, (label, confidence) or None).
+    A face counts as identified when its confidence is below the threshold;
+    identifying the wrong student (or anyone, for a face that is not
+    enrolled) is a false positive, and an enrolled face that is missed,
+    left unknown or misidentified is a false negative.
+    """
+    results = []
+    enrolled = sum(1 for roll_no, _ in observations if roll_no is not None)
+    for threshold in thresholds:
+        tp = fp = 0
+        for roll_no, prediction in observations:
+            if prediction is None or prediction[1] >= threshold:
+                continue
+            if label_to_name.get(prediction[0]) == roll_no:
+                tp += 1
+            else:
+                fp += 1
+        results.append({
+            "threshold": threshold,
+            "true_positives": tp,
+            "false_positives": fp,
+            "false_negatives": enrolled - tp,
+            "precision": tp / (tp + fp) if tp + fp else None,
+            "recall": tp / enrolled if enrolled else None,
+        })
+    return results
+
+
+def latency_summary(samples):
+    """Milliseconds: count, mean, max and the PERCENTILES of one stage."""
+    if not samples:
+        return {"count": 0}
+    ms = np.array(samples) * 1000
+    summary = {"count": len(ms), "mean_ms": float(ms.mean()), "max_ms": float(ms.max())}
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = float(np.percentile(ms, p))
+    return summary
+
+
+def peak_memory_mb():
+    """Peak resident set size of this process, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def scratch_repository(path, roll_numbers):
+    """Fresh SQLite database with one student per roll number; returns (repository, roll -> id)."""
+    repository = SQLiteRepository(path)
+    repository.migrate()
+    student_ids = {roll_no: repository.add_student(roll_no, roll_no)[0] for roll_no in roll_numbers}
+    return repository, student_ids
+
+
+def run_pass(fr, sources, truth, max_frames, recorder=None, timings=None, observations=None):
+    """Run every frame of sources through detect / crop / predict; returns (frames, faces, elapsed)."""
+    frames = faces = 0
+    start = time.perf_counter()
+    for source in sources:
+        annotated = truth.get(source, {})
+        frame_iter = iter_frames(source)
+        index = 0
+        while max_frames is None or frames < max_frames:
+            t0 = time.perf_counter()
+            frame = next(frame_iter, None)
+            if frame is None:
+                break
+            t1 = time.perf_counter()
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            boxes = fr.detect_faces(gray)
+            t2 = time.perf_counter()
+            if timings is not None:
+                timings["decode"].append(t1 - t0)
+                timings["detect"].append(t2 - t1)
+
+            results = []
+            if len(boxes):
+                crops = fr.crop_faces(gray, boxes)
+                t3 = time.perf_counter()
+                predictions = fr.predict_crops(crops)
+                t4 = time.perf_counter()
+                if timings is not None:
+                    timings["resize"].append(t3 - t2)
+                    timings["predict"].append(t4 - t3)
+                results = [(int(x), int(y), int(w), int(h), label, confidence)
+                           for (x, y, w, h), (label, confidence) in zip(boxes, predictions)]
+
+            if recorder is not None:
+                recorder.write(results, timings)
+
+            if observations is not None and index in annotated:
+                pairs, extra = match_faces(annotated[index], results)
+                observations.extend((roll_no, r[4:6] if r else None) for roll_no, r in pairs)
+                # Detections with no ground-truth face can only add false positives
+                observations.extend((None, r[4:6]) for r in extra)
+            faces += len(results)
+            frames += 1
+            index += 1
+    return frames, faces, time.perf_counter() - start
+
+
+class AttendanceRecorder:
+    """Writes recognized students to the scratch database like the live recognizer.
+
+    The live recognizer stores each student once per session, so every
+    write here uses a date of its own: each insert is really stored (and
+    its summaries refreshed) instead of being ignored by the unique index.
+    """
+
+    def __init__(self, repository, student_ids, label_to_name):
+        self.repository = repository
+        self.student_ids = student_ids
+        self.label_to_name = label_to_name
+        self.writes = 0
+        self.stored = 0
+
+    def write(self, results, timings):
+        roll_numbers = [self.label_to_name.get(r[4]) for r in results if r[5] < CONFIDENCE_THRESHOLD]
+        roll_numbers = [roll_no for roll_no in roll_numbers if roll_no in self.student_ids]
+        if not roll_numbers:
+            return
+        now = datetime.now() - timedelta(days=self.writes)
+        self.writes += 1
+        records = [
+            (self.student_ids[roll_no], roll_no, "Present", now.strftime("%Y-%m-%d %H:%M:%S"),
+             now.strftime("%Y-%m-%d"), DEFAULT_SESSION)
+            for roll_no in dict.fromkeys(roll_numbers)
+        ]
+        t0 = time.perf_counter()
+        self.stored += len(self.repository.add_attendance(records))
+        if timings is not None:
+            timings["db_write"].append(time.perf_counter() - t0)
+
+
+def median_summary(summaries):
+    """Per-statistic median of several latency_summary results."""
+    runs = [s for s in summaries if s["count"]]
+    if not runs:
+        return {"count": 0}
+    summary = {key: float(np.median([s[key] for s in runs])) for key in runs[0]}
+    summary["count"] = int(summary["count"])
+    return summary
+
+
+def run_benchmark(sources, truth_path=None, thresholds=None, max_frames=None, db_path=None, write_db=True,
+                  repeat=3, warmup=10):
+    """Benchmark sources; latency and FPS are medians over repeat timed passes.
+
+    Each run starts with warmup untimed frames (model pages, cascade and
+    allocator caches) that skip the database, so back-to-back runs of the
+    same code compare equal within noise. Accuracy is scored on the first pass.
+    """
+    # Loads the trained model, engine and index exactly as the live recognizer does
+    from backend import face_recognition as fr
+
+    thresholds = sorted(thresholds or [CONFIDENCE_THRESHOLD])
+    truth = load_truth(truth_path, sources)
+    observations = []
+
+    scratch_dir = None
+    recorder = None
+    if write_db:
+        if db_path is None:
+            scratch_dir = tempfile.TemporaryDirectory(prefix="attendance_bench_")
+            db_path = os.path.join(scratch_dir.name, "bench.db")
+        repository, student_ids = scratch_repository(db_path, list(fr.model.student_id_map))
+        recorder = AttendanceRecorder(repository, student_ids, fr.model.label_to_name)
+
+    # Warmup frames write nothing, so db_rows_stored counts timed writes only
+    if warmup:
+        run_pass(fr, sources, truth, warmup)
+    runs = []
+    for number in range(max(1, repeat)):
+        timings = {stage: [] for stage in STAGES}
+        frames, faces, elapsed = run_pass(fr, sources, truth, max_frames, recorder, timings,
+                                          observations if number == 0 else None)
+        runs.append({
+            "frames": frames,
+            "faces": faces,
+            "elapsed_s": elapsed,
+            "fps": frames / elapsed if elapsed else None,
+            "stages": {stage: latency_summary(timings[stage]) for stage in STAGES},
+        })
+    if scratch_dir is not None:
+        scratch_dir.cleanup()
+
+    fps = [run["fps"] for run in runs if run["fps"]]
+    return {
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "recognition_engine": RECOGNITION_ENGINE,
+            "recognition_search": RECOGNITION_SEARCH,
+            "centroid_top_k": CENTROID_TOP_K,
+            "detection_scale": DETECTION_SCALE,
+            "scale_factor": FACE_DETECTION_SCALE_FACTOR,
+            "min_neighbors": FACE_DETECTION_MIN_NEIGHBORS,
+            "confidence_threshold": CONFIDENCE_THRESHOLD,
+        },
+        "sources": sources,
+        "repeat": len(runs),
+        "warmup_frames": warmup,
+        "frames": runs[0]["frames"],
+        "faces": runs[0]["faces"],
+        "elapsed_s": float(np.median([run["elapsed_s"] for run in runs])),
+        "fps": float(np.median(fps)) if fps else None,
+        "peak_memory_mb": peak_memory_mb(),
+        "stages": {stage: median_summary([run["stages"][stage] for run in runs]) for stage in STAGES},
+        "db_rows_stored": recorder.stored if recorder is not None else None,
+        "runs": runs,
+        "accuracy": score(observations, thresholds, fr.model.label_to_name) if truth else [],
+    }
+
+
+def compare(results, baseline, tolerance, accuracy_tolerance, min_delta_ms=1.0):
+    """Regressions of results against a baseline run (median FPS / p95), as printable strings."""
+    regressions = []
+    if results["fps"] and baseline.get("fps") and results["fps"] < baseline["fps"] * (1 - tolerance):
+        regressions.append(f"fps {baseline['fps']:.1f} -> {results['fps']:.1f}")
+    for stage in STAGES:
+        new, old = results["stages"][stage].get("p95_ms"), baseline["stages"].get(stage, {}).get("p95_ms")
+        # Sub-millisecond stages jitter by more than any relative tolerance
+        if new is not None and old and new > old * (1 + tolerance) and new - old > min_delta_ms:
+            regressions.append(f"{stage} p95 {old:.2f} ms -> {new:.2f} ms")
+    old_accuracy = {row["threshold"]: row for row in baseline.get("accuracy", [])}
+    for row in results["accuracy"]:
+        old = old_accuracy.get(row["threshold"])
+        for metric in ("precision", "recall"):
+            if old and row[metric] is not None and old[metric] is not None \
+                    and row[metric] < old[metric] - accuracy_tolerance:
+                regressions.append(f"{metric}@{row['threshold']} {old[metric]:.3f} -> {row[metric]:.3f}")
+    return regressions
+
+
+def print_report(results):
+    print(f"{results['frames']} frames, {results['faces']} faces, {results['fps']:.1f} fps end to end "
+          f"(median of {results['repeat']} runs)" if results["fps"] else "No frames read")
+    if results["peak_memory_mb"] is not None:
+        print(f"Peak memory: {results['peak_memory_mb']:.0f} MB")
+    print(f"{'stage':>9} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, s in results["stages"].items():
+        if s["count"]:
+            print(f"{stage:>9} {s['count']:>7} {s['mean_ms']:>9.2f} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f}")
+    if results["accuracy"]:
+        print(f"{'threshold':>9} {'precision':>9} {'recall':>7} {'tp':>5} {'fp':>5} {'fn':>5}")
+        for row in results["accuracy"]:
+            precision = f"{row['precision']:.3f}" if row["precision"] is not None else "n/a"
+            recall = f"{row['recall']:.3f}" if row["recall"] is not None else "n/a"
+            print(f"{row['threshold']:>9g} {precision:>9} {recall:>7} {row['true_positives']:>5} "
+                  f"{row['false_positives']:>5} {row['false_negatives']:>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recognition latency and accuracy on recorded input")
+    parser.add_argument("sources", nargs="+", help="Video files, image folders or quoted glob patterns")
+    parser.add_argument("--truth", help="Ground-truth JSON (see the comment at the top of this file)")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=None,
+                        help="Confidence thresholds to score (default: CONFIDENCE_THRESHOLD)")
+    parser.add_argument("--max-frames", type=int, default=None, help="Frames per timed run")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs; latency and FPS are their medians")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed frames processed before the timed runs")
+    parser.add_argument("--db", help="Scratch SQLite file for the db_write stage (default: temporary)")
+    parser.add_argument("--no-db", action="store_true", help="Skip the db_write stage")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Earlier results JSON; exit with status 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed relative FPS / p95 latency change against the baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="Ignore p95 latency increases smaller than this many milliseconds")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.01,
+                        help="Allowed absolute precision / recall drop against the baseline")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sources, args.truth, args.thresholds, args.max_frames,
+                            db_path=args.db, write_db=not args.no_db, repeat=args.repeat, warmup=args.warmup)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.accuracy_tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"Regressions against {args.baseline} ({baseline.get('commit')}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} ({baseline.get('commit')})")
@@ -9,8 +9,9 @@ PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from backend.config import LOG_FILE, LOG_LEVEL, CAMERA_INDEX
+from backend.config import LOG_FILE, LOG_LEVEL, CAMERA_INDEX, FACE_CACHE_DIR
 from backend.utils import add_student
+from backend.face_dataset import FaceDataset
 
 # Setup logging
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
@@ -97,4 +98,11 @@ cap.release()
 cv.destroyAllWindows()
 logging.info(f"Image capture completed for {student_name} ({roll_no}). Saved {count} images in {save_dir}")
 print(f"Saved {count} images for {student_name} ({roll_no}) in {save_dir}")
+
+# Append the new images to the packed training cache so training skips decoding them
+if count:
+    try:
+        FaceDataset(os.path.dirname(save_dir), os.path.join(PROJECT_ROOT, FACE_CACHE_DIR)).sync()
+    except Exception as e:
+        logging.error(f"Failed to update face cache: {str(e)}")
 print("Next step: run training to update the model → python backend/train_faces.py")
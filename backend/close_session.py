@@ -0,0 +1,51 @@
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime
+
+# Ensure project root on sys.path when invoked directly
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.config import LOG_FILE, LOG_LEVEL, SESSIONS
+from backend.repository import get_repository
+
+# Session-close job: students with no attendance record in a session are
+# marked Absent with one set-based INSERT ... SELECT, and the session's
+# summaries are recomputed. Safe to run more than once; schedule it (cron,
+# Task Scheduler) after each session ends:
+#
+#   python backend/close_session.py --session Morning
+#   python backend/close_session.py --all --date 2025-09-15
+
+os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+logging.basicConfig(
+    filename=LOG_FILE,
+    level=getattr(logging, LOG_LEVEL),
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    filemode='a'
+)
+
+def close_session(session, date=None):
+    """Mark absentees for one session and return how many were added."""
+    now = datetime.now()
+    date = date or now.strftime("%Y-%m-%d")
+    added = get_repository().close_session(date, session, now.strftime("%Y-%m-%d %H:%M:%S"))
+    logging.info(f"Session closed: {session} on {date}, {added} students marked absent")
+    print(f" {session} {date}: {added} students marked absent")
+    return added
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mark absentees and finalize summaries for a session")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--session", choices=SESSIONS, help="Session to close")
+    group.add_argument("--all", action="store_true", help="Close every configured session")
+    parser.add_argument("--date", default=None, help="Day to close (YYYY-MM-DD, default: today)")
+    args = parser.parse_args()
+
+    get_repository().migrate()
+    for session in (SESSIONS if args.all else [args.session]):
+        close_session(session, args.date)
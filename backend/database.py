@@ -1,9 +1,95 @@
-
+import os
+import queue
 import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+from backend.config import DATABASE_PATH, DB_POOL_SIZE, DB_BUSY_TIMEOUT, DB_STATEMENT_CACHE_SIZE
 
-DB_NAME = "attendance.db"
+# Absolute, so the same file is used whatever the working directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_NAME = os.path.join(PROJECT_ROOT, DATABASE_PATH)
 
-def get_connection():
-    """Return a SQLite connection object."""
-    conn = sqlite3.connect(DB_NAME)
+def get_connection(db_name=DB_NAME):
+    """Return a new configured SQLite connection owned by the caller.
+
+    WAL lets readers keep going while another process writes, synchronous=NORMAL
+    skips the per-commit fsync of the main database file, and the busy timeout
+    makes writers wait for the lock instead of failing with "database is locked".
+    Prefer connection() for short units of work; use this for long-lived
+    threads and migrations.
+    """
+    conn = sqlite3.connect(
+        db_name, timeout=DB_BUSY_TIMEOUT,
+        cached_statements=DB_STATEMENT_CACHE_SIZE, check_same_thread=False,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
     return conn
+
+
+class ConnectionPool:
+    """Thread-safe pool of configured connections to one database.
+
+    Connections are reused across threads and requests, which keeps their
+    prepared statement caches warm and removes the connect/PRAGMA cost from
+    every query. Up to `size` idle connections are kept; extra connections
+    created under load are closed when released.
+    """
+
+    def __init__(self, db_name=DB_NAME, size=DB_POOL_SIZE):
+        self.db_name = db_name
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return get_connection(self.db_name)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_name=DB_NAME):
+    """The shared pool for db_name, created on first use."""
+    with _pools_lock:
+        pool = _pools.get(db_name)
+        if pool is None:
+            pool = _pools[db_name] = ConnectionPool(db_name)
+            logging.info(f"Connection pool created for {db_name}")
+        return pool
+
+@contextmanager
+def connection(db_name=DB_NAME):
+    """Borrow a pooled connection; commits on success and rolls back on error.
+
+        with connection() as conn:
+            conn.execute("UPDATE ...")
+    """
+    pool = get_pool(db_name)
+    conn = pool.acquire()
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        pool.release(conn)
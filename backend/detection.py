@@ -0,0 +1,62 @@
+import math
+from functools import lru_cache
+import cv2
+import numpy as np
+
+from backend.config import (
+    CAMERA_HFOV_DEGREES, FACE_WIDTH_METERS,
+    CLASSROOM_MIN_DISTANCE, CLASSROOM_MAX_DISTANCE
+)
+
+def face_size_for_distance(distance, frame_width):
+    """Approximate face width in pixels for a face `distance` meters from the camera."""
+    focal_px = (frame_width / 2) / math.tan(math.radians(CAMERA_HFOV_DEGREES) / 2)
+    return focal_px * FACE_WIDTH_METERS / distance
+
+@lru_cache(maxsize=8)
+def face_size_limits(frame_width):
+    """(min, max) face size in full-resolution pixels for the classroom distances in config.
+
+    Either is None (no limit) when its distance is not configured.
+    """
+    min_size = max_size = None
+    if CLASSROOM_MAX_DISTANCE:
+        min_size = int(face_size_for_distance(CLASSROOM_MAX_DISTANCE, frame_width))
+    if CLASSROOM_MIN_DISTANCE:
+        max_size = int(math.ceil(face_size_for_distance(CLASSROOM_MIN_DISTANCE, frame_width)))
+    return min_size, max_size
+
+def detect_faces_scaled(cascade, gray, scale_factor, min_neighbors, detection_scale=1.0,
+                        min_size=None, max_size=None):
+    """Run Haar detection on a downscaled copy of `gray` and map boxes back.
+
+    min_size/max_size are full-resolution face widths; they are scaled along
+    with the image so detectMultiScale skips pyramid levels that cannot hold
+    a face at classroom distance. Returns an int array of (x, y, w, h) boxes
+    in full-resolution coordinates, so crops can be taken from `gray`.
+    """
+    if detection_scale != 1.0:
+        small = cv2.resize(gray, None, fx=detection_scale, fy=detection_scale,
+                           interpolation=cv2.INTER_AREA)
+    else:
+        small = gray
+
+    kwargs = {}
+    if min_size:
+        side = int(min_size * detection_scale)
+        kwargs["minSize"] = (side, side)
+    if max_size:
+        side = int(math.ceil(max_size * detection_scale))
+        kwargs["maxSize"] = (side, side)
+
+    faces = cascade.detectMultiScale(small, scale_factor, min_neighbors, **kwargs)
+    if len(faces) == 0 or detection_scale == 1.0:
+        return faces
+
+    boxes = np.round(np.asarray(faces, dtype=np.float32) / detection_scale).astype(int)
+    height, width = gray.shape[:2]
+    boxes[:, 0] = np.clip(boxes[:, 0], 0, width - 1)
+    boxes[:, 1] = np.clip(boxes[:, 1], 0, height - 1)
+    boxes[:, 2] = np.minimum(boxes[:, 2], width - boxes[:, 0])
+    boxes[:, 3] = np.minimum(boxes[:, 3], height - boxes[:, 1])
+    return boxes
@@ -0,0 +1,121 @@
+import os
+import time
+import logging
+import cv2
+
+# Frame output for the recognition loops. The loops hand every processed
+# frame and its labels to a display; only the display draws. WindowDisplay
+# is the interactive cv2.imshow window ('q' stops). HeadlessDisplay never
+# draws or opens a window, so the hot loop does no GUI work and runs on
+# servers without a display. Either can carry a Preview, which publishes a
+# low-rate, downscaled annotated JPEG for anyone who wants to watch.
+
+
+def draw_results(frame, labels, scale=1.0):
+    """Draw boxes and names; labels are (x, y, w, h, name) with name None for unknown faces."""
+    for (x, y, w, h, name) in labels:
+        x, y, w, h = (round(v * scale) for v in (x, y, w, h))
+        if name is not None:
+            cv2.putText(frame, name, (x, y-10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+        else:
+            cv2.putText(frame, "Unknown - Check Alerts", (x, y-10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
+
+
+class PreviewFile:
+    """Keeps the latest preview JPEG at path, replaced atomically."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def publish(self, jpeg):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(jpeg)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Failed to write preview frame: {str(e)}")
+
+    def close(self):
+        pass
+
+
+class Preview:
+    """At most fps frames per second: downscale, annotate, JPEG-encode once and
+    hand the same bytes to every output (PreviewFile, FrameRingWriter)."""
+
+    def __init__(self, outputs, fps, width=None, quality=80):
+        self.outputs = list(outputs)
+        self.interval = 1.0 / fps
+        self.width = width
+        self.quality = quality
+        self._next_frame = 0.0
+
+    def offer(self, frame, labels=()):
+        now = time.monotonic()
+        if now < self._next_frame:
+            return
+        self._next_frame = now + self.interval
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.width / width) if self.width else 1.0
+        if scale < 1.0:
+            # The resize is a new image, so the caller's frame stays unannotated
+            preview = cv2.resize(frame, (self.width, max(1, round(height * scale))),
+                                 interpolation=cv2.INTER_AREA)
+        else:
+            preview = frame.copy() if labels else frame
+        draw_results(preview, labels, scale)
+        ok, encoded = cv2.imencode(".jpg", preview, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+        jpeg = encoded.tobytes()
+        for output in self.outputs:
+            output.publish(jpeg)
+
+    def close(self):
+        for output in self.outputs:
+            output.close()
+
+
+class WindowDisplay:
+    """Annotated frames in a desktop window; returns False from show() when 'q' is pressed."""
+
+    def __init__(self, title="Face Recognition Attendance", preview=None):
+        self.title = title
+        self.preview = preview
+
+    def show(self, frame, labels):
+        draw_results(frame, labels)
+        if self.preview is not None:
+            self.preview.offer(frame)  # already annotated
+        cv2.imshow(self.title, frame)
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            logging.info("Face recognition stopped by user")
+            return False
+        return True
+
+    def close(self):
+        cv2.destroyAllWindows()
+        if self.preview is not None:
+            self.preview.close()
+
+
+class HeadlessDisplay:
+    """No window and no per-frame drawing; only the optional preview annotates."""
+
+    def __init__(self, preview=None):
+        self.preview = preview
+
+    def show(self, frame, labels):
+        if self.preview is not None:
+            self.preview.offer(frame, labels)
+        return True
+
+    def close(self):
+        if self.preview is not None:
+            self.preview.close()
@@ -0,0 +1,148 @@
+import json
+import queue
+import logging
+import threading
+from datetime import datetime
+
+from backend.config import EVENT_POLL_INTERVAL, EVENT_KEEPALIVE_INTERVAL, EVENT_QUEUE_SIZE
+from backend.pipeline import DropOldestQueue
+from backend.repository import get_repository
+
+
+def format_sse(event, data, event_id=None):
+    """Encode one Server-Sent Events message."""
+    message = ""
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    message += f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return message
+
+
+class EventBroker:
+    """In-process publish/subscribe hub for dashboard clients.
+
+    Every subscriber gets its own bounded queue; publish() fans one event out
+    to all of them without blocking, so a stalled browser only loses its own
+    oldest events. The latest value of each "state" event (e.g. the alert
+    count) is kept so new subscribers start from the current state.
+    """
+
+    def __init__(self, queue_size=EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = DropOldestQueue(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            for event, data in self._state.items():
+                subscriber.put((event, data))
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event, data, state=False):
+        """Send an event to every subscriber; state events are also replayed to new ones."""
+        with self._lock:
+            if state:
+                self._state[event] = data
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put((event, data))
+
+    def stream(self, keepalive=EVENT_KEEPALIVE_INTERVAL):
+        """Generator of SSE messages for one client; unsubscribes when the client goes away."""
+        subscriber = self.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event, data = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event, data)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+class DatabaseEventFeed:
+    """Turns rows committed by the recognition process into broker events.
+
+    The recognizer runs in its own process (or on another node) and writes
+    through the batched attendance writer, so the database is the hand-off
+    point. One feed thread per web server polls the repository's change token
+    (the SQLite file/WAL mtime); only when it changes does it query rows with
+    an id above the last one seen and publish:
+
+      attendance   list of new attendance rows (deltas only)
+      summary      today's per-session present / late / absent counts
+      alert_count  number of unresolved unknown faces, when it changes
+
+    The cost is one stat() per poll interval plus a pair of indexed queries
+    per change (every poll on server databases), independent of how many
+    dashboards are connected.
+    """
+
+    def __init__(self, broker, repository=None, poll_interval=EVENT_POLL_INTERVAL):
+        self.broker = broker
+        self.repository = repository or get_repository()
+        self.poll_interval = poll_interval
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._last_attendance_id = None
+        self._alert_count = None
+        self._loaded_token = None
+
+    def start(self):
+        """Start the feed thread once; safe to call on every new subscriber."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="event-feed", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        self._last_attendance_id = self.repository.max_attendance_id()
+        self._publish_alert_count()
+        logging.info("Dashboard event feed started")
+        while not self._stop.wait(self.poll_interval):
+            token = self.repository.change_token()
+            if token is not None and token == self._loaded_token:
+                continue
+            self._loaded_token = token
+            try:
+                self._publish_attendance()
+                self._publish_alert_count()
+            except Exception as e:
+                logging.error(f"Dashboard event feed query failed: {str(e)}")
+
+    def _publish_attendance(self):
+        rows = self.repository.attendance_since(self._last_attendance_id)
+        if not rows:
+            return
+        self._last_attendance_id = rows[-1]["id"]
+        self.broker.publish("attendance", rows)
+        # Read from the materialized summary table, not aggregated here
+        self.broker.publish("summary", self.repository.session_summary(datetime.now().strftime("%Y-%m-%d")), state=True)
+
+    def _publish_alert_count(self):
+        count = self.repository.alert_count()
+        if count != self._alert_count:
+            self._alert_count = count
+            self.broker.publish("alert_count", {"count": count}, state=True)
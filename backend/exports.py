@@ -0,0 +1,39 @@
+import io
+import csv
+import zlib
+
+from backend.config import EXPORT_FETCH_SIZE
+from backend.repository import EXPORT_COLUMNS, get_repository
+
+
+def iter_attendance_csv(repository=None, fetch_size=EXPORT_FETCH_SIZE, compress=False, **filters):
+    """Yield the attendance export as CSV chunks of at most fetch_size rows.
+
+    Rows are read fetch_size at a time so memory stays constant regardless of
+    table size. Filters (start_date, end_date, session, student_id) are passed
+    to Repository.iter_attendance. With compress=True the chunks form one gzip
+    stream.
+    """
+    repository = repository or get_repository()
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits 31 = gzip container
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def take():
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in repository.iter_attendance(fetch_size=fetch_size, **filters):
+        writer.writerows(rows)
+        chunk = take()
+        if chunk:
+            yield chunk
+
+    tail = take()
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
@@ -0,0 +1,186 @@
+import os
+import json
+import struct
+import logging
+import numpy as np
+
+from backend.config import FACE_SIZE_WIDTH, FACE_SIZE_HEIGHT
+from backend.image_loader import load_face_images
+
+# Fixed-size .npy header so the shape can be rewritten in place when rows are appended
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_HEADER_SIZE = 128
+
+
+def scan_dataset(root):
+    """Map "<roll_no>/<file>.jpg" -> (roll_no, path, mtime_ns, size) for every training image."""
+    files = {}
+    # Only include folders (skip files like .DS_Store)
+    for student_name in sorted(os.listdir(root)):
+        student_path = os.path.join(root, student_name)
+        if not os.path.isdir(student_path):
+            continue
+        for file_name in sorted(os.listdir(student_path)):
+            if file_name.endswith(".jpg"):
+                img_path = os.path.join(student_path, file_name)
+                stat = os.stat(img_path)
+                files[f"{student_name}/{file_name}"] = (student_name, img_path, stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def _npy_header(count, height, width):
+    header = repr({"descr": "|u1", "fortran_order": False, "shape": (count, height, width)})
+    body = header.ljust(NPY_HEADER_SIZE - len(NPY_MAGIC) - 2 - 1) + "\n"
+    return NPY_MAGIC + struct.pack("<H", len(body)) + body.encode("latin1")
+
+
+class FaceDataset:
+    """Packed, memory-mapped copy of a face folder tree (data/faces/train layout).
+
+    cache_dir holds:
+      faces.npy      uint8 array (n, height, width), opened with mmap
+      labels.npy     int32 index into manifest["students"] per row
+      manifest.json  students, image size and per-file row/mtime/size
+
+    sync() decodes only images that are new or whose mtime/size changed and
+    appends them to faces.npy; removed or replaced images leave stale rows
+    that are compacted away in the same call. Readers get faces and labels
+    as zero-copy memory maps.
+    """
+
+    def __init__(self, root, cache_dir, size=(FACE_SIZE_WIDTH, FACE_SIZE_HEIGHT)):
+        self.root = root
+        self.cache_dir = cache_dir
+        self.size = size
+        self.faces_path = os.path.join(cache_dir, "faces.npy")
+        self.labels_path = os.path.join(cache_dir, "labels.npy")
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        self.manifest = self._load_manifest()
+
+    # ---------- on-disk state ----------
+    def _empty_manifest(self):
+        return {"size": list(self.size), "count": 0, "students": [], "files": {}}
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path) or not os.path.exists(self.faces_path):
+            return self._empty_manifest()
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("size") != list(self.size):
+            logging.info("Face cache was built for another image size; rebuilding")
+            return self._empty_manifest()
+        return manifest
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _save_labels(self, labels):
+        tmp_path = self.labels_path + ".tmp.npy"
+        np.save(tmp_path, np.asarray(labels, dtype=np.int32))
+        os.replace(tmp_path, self.labels_path)
+
+    def _append_faces(self, faces, start_count):
+        width, height = self.size
+        os.makedirs(self.cache_dir, exist_ok=True)
+        mode = "r+b" if start_count and os.path.exists(self.faces_path) else "w+b"
+        with open(self.faces_path, mode) as f:
+            f.seek(NPY_HEADER_SIZE + start_count * height * width)
+            f.write(np.ascontiguousarray(faces, dtype=np.uint8).tobytes())
+            f.truncate()
+            # Header last: a crash mid-append leaves the old, still valid shape
+            f.seek(0)
+            f.write(_npy_header(start_count + len(faces), height, width))
+
+    # ---------- public API ----------
+    @property
+    def students(self):
+        return self.manifest["students"]
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    def __contains__(self, rel_path):
+        """True if "<roll_no>/<file>.jpg" is decoded in the cache."""
+        return rel_path in self.manifest["files"]
+
+    def sync(self):
+        """Bring the cache up to date with the image folders; returns the number of decoded images."""
+        files = scan_dataset(self.root) if os.path.isdir(self.root) else {}
+        known = self.manifest["files"]
+
+        fresh = [
+            rel_path for rel_path, (_, _, mtime_ns, size) in files.items()
+            if rel_path not in known
+            or known[rel_path]["mtime_ns"] != mtime_ns or known[rel_path]["size"] != size
+        ]
+        stale = len(known) - (len(files) - len(fresh))
+        if not fresh and not stale:
+            return 0
+
+        if stale:
+            # Removed or replaced images: rewrite with only the rows still in use
+            self._compact({rel_path for rel_path in files if rel_path not in fresh})
+
+        paths = [files[rel_path][1] for rel_path in fresh]
+        faces, ok = load_face_images(paths, size=self.size)
+        loaded = [rel_path for rel_path, good in zip(fresh, ok) if good]
+
+        students = self.manifest["students"]
+        student_index = {name: i for i, name in enumerate(students)}
+        labels = list(self.labels) if len(self) else []
+        count = len(self)
+        for row, rel_path in enumerate(loaded, start=count):
+            student_name, _, mtime_ns, size = files[rel_path]
+            if student_name not in student_index:
+                student_index[student_name] = len(students)
+                students.append(student_name)
+            labels.append(student_index[student_name])
+            self.manifest["files"][rel_path] = {"row": row, "mtime_ns": mtime_ns, "size": size}
+
+        self._append_faces(faces, count)
+        self._save_labels(labels)
+        self.manifest["count"] = count + len(loaded)
+        self._save_manifest()
+        logging.info(f"Face cache updated: {len(loaded)} images added, {len(self)} total")
+        return len(loaded)
+
+    def _compact(self, keep):
+        """Drop rows whose files were removed or replaced; `keep` lists rel_paths to retain."""
+        entries = sorted(
+            ((entry["row"], rel_path) for rel_path, entry in self.manifest["files"].items() if rel_path in keep)
+        )
+        rows = np.array([row for row, _ in entries], dtype=np.int64)
+        faces = np.array(self.faces[rows]) if len(rows) else np.empty((0, self.size[1], self.size[0]), np.uint8)
+        labels = np.array(self.labels[rows]) if len(rows) else np.empty(0, np.int32)
+
+        self._append_faces(faces, 0)
+        self._save_labels(labels)
+        self.manifest["files"] = {
+            rel_path: dict(self.manifest["files"][rel_path], row=new_row)
+            for new_row, (_, rel_path) in enumerate(entries)
+        }
+        self.manifest["count"] = len(entries)
+        self._save_manifest()
+        logging.info(f"Face cache compacted to {len(entries)} images")
+
+    @property
+    def faces(self):
+        """(n, height, width) uint8 memory map of every cached face."""
+        if not len(self):
+            return np.empty((0, self.size[1], self.size[0]), dtype=np.uint8)
+        return np.load(self.faces_path, mmap_mode="r")
+
+    @property
+    def labels(self):
+        """int32 memory map: index into `students` for every cached face."""
+        if not len(self):
+            return np.empty(0, dtype=np.int32)
+        return np.load(self.labels_path, mmap_mode="r")
+
+    def rows(self, rel_paths):
+        """Cache rows of the given "<roll_no>/<file>.jpg" paths (missing ones are skipped)."""
+        files = self.manifest["files"]
+        return np.array([files[p]["row"] for p in rel_paths if p in files], dtype=np.int64)
@@ -4,9 +4,10 @@ import time
 import cv2
 import numpy as np
 import logging
-import json
 import base64
-from datetime import datetime
+import signal
+import argparse
+import threading
 
 # Ensure project root for backend-relative imports when run directly
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -15,76 +16,30 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 from backend.utils import mark_attendance
-from backend.database import get_connection
+from backend.pipeline import RecognitionPipeline
+from backend.tracking import FaceTracker
+from backend.detection import detect_faces_scaled, face_size_limits
+from backend.lbph_engine import LBPHEngine
+from backend.model_loader import RecognitionModel, ModelReloader, model_file
+from backend.roster import RosterCache
+from backend.writers import AttendanceWriter, AlertWriter
+from backend.unknown_faces import UnknownFaceCache
+from backend.image_store import ImageStore
+from backend.display import WindowDisplay, HeadlessDisplay, Preview, PreviewFile
+from backend.frame_buffer import FrameRingWriter
 from backend.config import (
     LOG_FILE, LOG_LEVEL, CONFIDENCE_THRESHOLD, 
-    FACE_SIZE_WIDTH, FACE_SIZE_HEIGHT, MODEL_PATH, STUDENT_MAP_PATH
+    FACE_SIZE_WIDTH, FACE_SIZE_HEIGHT, STUDENT_MAP_PATH,
+    FACE_DETECTION_SCALE_FACTOR, FACE_DETECTION_MIN_NEIGHBORS,
+    DEFAULT_SESSION, RECOGNITION_MODE, PIPELINE_WORKERS,
+    PIPELINE_FRAME_QUEUE_SIZE, PIPELINE_STATS_INTERVAL,
+    DETECTION_INTERVAL, MOTION_THRESHOLD, TRACK_IOU_THRESHOLD, TRACK_MAX_MISSES,
+    DETECTION_SCALE, MODEL_RELOAD, ROSTER_REFRESH_INTERVAL, ATTENDANCE_BATCH_SIZE, ATTENDANCE_FLUSH_INTERVAL,
+    ALERT_QUEUE_SIZE, ALERT_BATCH_SIZE, ALERT_FLUSH_INTERVAL, ALERT_BACKPRESSURE, ALERT_SAMPLE_EVERY,
+    UNKNOWN_FACES_PATH, HEADLESS, PREVIEW_FPS, PREVIEW_WIDTH, PREVIEW_JPEG_QUALITY, PREVIEW_PATH,
+    CAMERA_INDEX
 )
 
-def mark_attendance_new(student_id, student_name, status="Present", session="Morning"):
-    """Insert an attendance record with new database structure."""
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        now = datetime.now()
-        timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
-        
-        cursor.execute("""
-            INSERT INTO attendance (student_id, student_name, status, timestamp, session)
-            VALUES (?, ?, ?, ?, ?)
-        """, (student_id, student_name, status, timestamp, session))
-        
-        conn.commit()
-        conn.close()
-        
-        logging.info(f"Attendance marked: {student_name} (ID: {student_id}), Status: {status}, Session: {session}, Time: {timestamp}")
-        print(f"✅ {student_name} marked present at {timestamp}")
-        
-    except Exception as e:
-        logging.error(f"Failed to mark attendance for {student_name}: {str(e)}")
-        raise
-
-def save_unknown_face(frame, x, y, w, h, confidence):
-    """Save unknown face to alerts table."""
-    try:
-        # Extract face region
-        face_img = frame[y:y+h, x:x+w]
-        
-        # Create filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"unknown_face_{timestamp}.jpg"
-        
-        # Save image to static folder
-        static_dir = os.path.join(PROJECT_ROOT, "frontend", "static", "unknown_faces")
-        os.makedirs(static_dir, exist_ok=True)
-        filepath = os.path.join(static_dir, filename)
-        cv2.imwrite(filepath, face_img)
-        
-        # Save to database
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        now = datetime.now()
-        detected_time = now.strftime("%Y-%m-%d %H:%M:%S")
-        
-        cursor.execute("""
-            INSERT INTO unverified_faces (image_path, detected_time, resolved)
-            VALUES (?, ?, 0)
-        """, (filename, detected_time))
-        
-        conn.commit()
-        conn.close()
-        
-        logging.warning(f"Unknown face detected and saved: {filename} (confidence: {confidence:.1f})")
-        print(f"⚠️ Unknown face detected! Saved as {filename}")
-        
-        return filename
-        
-    except Exception as e:
-        logging.error(f"Failed to save unknown face: {str(e)}")
-        return None
-
 # Setup logging
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 logging.basicConfig(
@@ -94,119 +49,345 @@ logging.basicConfig(
     filemode='a'
 )
 
-# Load student mapping
-student_id_map = {}
-if os.path.exists(STUDENT_MAP_PATH):
-    with open(STUDENT_MAP_PATH, 'r') as f:
-        student_id_map = json.load(f)
-    # Create reverse mapping (label -> student_name)
-    label_to_name = {v: k for k, v in student_id_map.items()}
-    logging.info(f"Loaded student mapping: {len(student_id_map)} students")
-else:
+# Check for the trained model
+if not os.path.exists(STUDENT_MAP_PATH):
     logging.error(f"Student mapping file not found: {STUDENT_MAP_PATH}")
     exit()
+if not os.path.exists(model_file()):
+    logging.error(f"No trained model found at {model_file()}! Run train_faces.py first.")
+    print(" No trained model found! Run train_faces.py first.")
+    exit()
 
 # Load Haar Cascade
-haar_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+HAAR_CASCADE_FILE = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+haar_cascade = cv2.CascadeClassifier(HAAR_CASCADE_FILE)
+
+# Recognizer, student mapping, batched engine and centroid index; replaced
+# as a whole by use_model() when a retrained model is hot-reloaded
+model = RecognitionModel.load()
+
+# Loads retrained models in the background while recognition runs
+model_reloader = ModelReloader()
 
-# Load trained recognizer
-recognizer = cv2.face.LBPHFaceRecognizer_create() if hasattr(cv2.face, "LBPHFaceRecognizer_create") else cv2.createLBPHFaceRecognizer()
-if os.path.exists(MODEL_PATH):
-    recognizer.read(MODEL_PATH)
-    logging.info(f"Loaded face recognizer model from {MODEL_PATH}")
+# Students table cached in memory; reloaded when the database file changes
+roster = RosterCache(model.label_to_name, check_interval=ROSTER_REFRESH_INTERVAL)
+
+# Attendance rows are only queued by the camera loop and committed in batches
+attendance_writer = AttendanceWriter(
+    batch_size=ATTENDANCE_BATCH_SIZE, flush_interval=ATTENDANCE_FLUSH_INTERVAL
+)
+
+# LBP histograms for unknown-face clustering use the recognizer's own parameters.
+# The engine holds only those parameters, not the training histograms, so a
+# hot-reloaded model does not keep the first one's matrix alive.
+if model.engine is not None:
+    _lbp_parameters = dict(radius=model.engine.radius, neighbors=model.engine.neighbors,
+                           grid_x=model.engine.grid_x, grid_y=model.engine.grid_y)
 else:
-    logging.error(f"No trained model found at {MODEL_PATH}! Run train_faces.py first.")
-    print(" No trained model found! Run train_faces.py first.")
-    exit()
+    _lbp_parameters = dict(radius=model.recognizer.getRadius(), neighbors=model.recognizer.getNeighbors(),
+                           grid_x=model.recognizer.getGridX(), grid_y=model.recognizer.getGridY())
+_histogram_engine = LBPHEngine(np.empty((0, 1), dtype=np.float32), [], **_lbp_parameters)
+# Unknown-face crops are encoded and their alerts inserted on a bounded background queue
+alert_writer = AlertWriter(
+    ImageStore(os.path.join(PROJECT_ROOT, UNKNOWN_FACES_PATH)), policy=ALERT_BACKPRESSURE, sample_every=ALERT_SAMPLE_EVERY,
+    batch_size=ALERT_BATCH_SIZE, flush_interval=ALERT_FLUSH_INTERVAL, max_pending=ALERT_QUEUE_SIZE,
+)
+
+def create_unknown_face_cache():
+    """Per-camera cache that groups sightings of the same unknown person into one alert."""
+    return UnknownFaceCache(_histogram_engine.compute_histograms, alert_writer)
+
+_thread_local = threading.local()
+
+def get_haar_cascade():
+    """Return a Haar cascade owned by the calling thread.
+
+    CascadeClassifier keeps internal buffers, so pipeline workers each get
+    their own instance instead of sharing the module-level one.
+    """
+    if threading.current_thread() is threading.main_thread():
+        return haar_cascade
+    cascade = getattr(_thread_local, "haar_cascade", None)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(HAAR_CASCADE_FILE)
+        _thread_local.haar_cascade = cascade
+    return cascade
+
+def detect_faces(gray):
+    """Run Haar detection on a grayscale frame and return (x, y, w, h) boxes.
+
+    Detection runs at DETECTION_SCALE; boxes come back in full-resolution
+    coordinates so recognition still crops the full-resolution image.
+    """
+    min_size, max_size = face_size_limits(gray.shape[1])
+    return detect_faces_scaled(
+        get_haar_cascade(), gray,
+        FACE_DETECTION_SCALE_FACTOR, FACE_DETECTION_MIN_NEIGHBORS,
+        detection_scale=DETECTION_SCALE, min_size=min_size, max_size=max_size,
+    )
+
+def crop_faces(gray, faces):
+    """Face crops resized to the training size, one per box."""
+    crops = []
+    for (x, y, w, h) in faces:
+        roi_gray = gray[y:y+h, x:x+w]
+        # Normalize face size to match training
+        crops.append(cv2.resize(roi_gray, (FACE_SIZE_WIDTH, FACE_SIZE_HEIGHT)))
+    return crops
+
+def predict_crops(crops):
+    """Predict a (label, confidence) for every crop with the current model."""
+    return model.predict(crops)
+
+def predict_boxes(gray, faces):
+    """Predict a (label, confidence) for every face box."""
+    return predict_crops(crop_faces(gray, faces))
+
+def recognize_faces(gray, faces):
+    """Return (x, y, w, h, label, confidence, face_key) for every detected face.
+
+    face_key identifies the face for the unknown-face cooldown; for plain
+    detections it is the box itself.
+    """
+    results = []
+    for (x, y, w, h), (label, confidence) in zip(faces, predict_boxes(gray, faces)):
+        results.append((x, y, w, h, label, confidence, f"{x}_{y}_{w}_{h}"))
+    return results
+
+def process_frame(frame):
+    """Detection + recognition stage: frame in, list of face results out."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return recognize_faces(gray, detect_faces(gray))
+
+def handle_results(frame, results, session, recognized_students, unknown_faces):
+    """Sink stage: mark attendance and group unknown faces into alerts.
+
+    Returns (x, y, w, h, name) labels for the display, name None for
+    unknown faces; nothing is drawn here.
+    """
+    labels = []
+    for (x, y, w, h, label, confidence, face_key) in results:
+        if confidence < CONFIDENCE_THRESHOLD:
+            # Use proper mapping from training
+            student_roll = model.label_to_name.get(label, f"Unknown_Label_{label}")
+            student_info = roster.get_by_label(label)
+
+            if student_info:
+                student_id, student_name = student_info
+                # Check if already recognized this session
+                if student_roll not in recognized_students:
+                    attendance_writer.mark(student_id, student_name, status="Present", session=session)
+                    recognized_students.add(student_roll)
+                    logging.info(f"Student {student_name} (ID: {student_id}) recognized with confidence {confidence:.1f}")
+                else:
+                    logging.debug(f"Student {student_name} already recognized this session")
+                labels.append((x, y, w, h, student_name))
+            else:
+                logging.warning(f"Student {student_roll} not found in database")
+                # Treat as unknown face
+                confidence = 100  # Force unknown face handling
+
+        if confidence >= CONFIDENCE_THRESHOLD:
+            # Unknown face: a new alert only for a person not seen recently
+            unknown_faces.observe(frame, x, y, w, h)
+            labels.append((x, y, w, h, None))
 
-def get_student_info_from_roll(roll_no):
-    """Fetch student info from DB using roll_no."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name FROM students WHERE roll_no = ?", (roll_no,))
-    result = cursor.fetchone()
-    conn.close()
-    return result if result else None
-
-def start_recognition(session="Morning"):
-    """Start webcam and perform real-time recognition."""
-    logging.info(f"Starting face recognition for {session} session")
+    unknown_faces.tick()
+    return labels
+
+def use_model(new_model):
+    """Switch recognition to a reloaded model; session state is kept.
+
+    Training keeps existing labels stable, so students already recognized
+    this session stay recognized under the new model.
+    """
+    global model
+    roster.set_label_map(new_model.label_to_name)
+    model = new_model
+
+def swap_reloaded_model():
+    """Called by the loops between frames: switch to a model that finished loading."""
+    new_model = model_reloader.take()
+    if new_model is not None:
+        use_model(new_model)
+
+# Set by stop_recognition() or SIGTERM/SIGINT; every loop checks it once per frame
+stop_event = threading.Event()
+
+def stop_recognition(*args):
+    """Ask the running recognition loop to finish; safe from signal handlers and other threads."""
+    stop_event.set()
+
+def create_display(headless=HEADLESS, preview_fps=PREVIEW_FPS):
+    """Window or headless display, publishing the dashboard preview when preview_fps > 0."""
+    preview = None
+    if preview_fps > 0:
+        outputs = []
+        try:
+            outputs.append(FrameRingWriter())
+        except OSError as e:
+            logging.warning(f"Live preview buffer unavailable: {str(e)}")
+        if PREVIEW_PATH:
+            outputs.append(PreviewFile(os.path.join(PROJECT_ROOT, PREVIEW_PATH)))
+        if outputs:
+            preview = Preview(outputs, preview_fps, PREVIEW_WIDTH, PREVIEW_JPEG_QUALITY)
+    if headless:
+        return HeadlessDisplay(preview)
+    return WindowDisplay(preview=preview)
+
+def start_recognition(session=DEFAULT_SESSION, mode=None, workers=None, headless=HEADLESS, preview_fps=PREVIEW_FPS):
+    """Start webcam and perform real-time recognition.
+
+    mode is "serial" (one loop does everything), "pipeline" (capture,
+    recognition workers and sink run as separate stages) or "tracking"
+    (periodic detection with tracked faces in between). Defaults to
+    RECOGNITION_MODE from config.
+
+    headless skips the window and all drawing. In every mode the loop also
+    ends on stop_recognition(), SIGTERM or SIGINT (besides the window's 'q'
+    key), after flushing queued attendance and alerts.
+
+    With MODEL_RELOAD, a model retrained by train_faces.py (or any model on
+    SIGHUP) is loaded in the background and used from the next frame on.
+    """
+    mode = mode or RECOGNITION_MODE
+    logging.info(f"Starting face recognition for {session} session ({mode} mode{', headless' if headless else ''})")
     
-    cap = cv2.VideoCapture(0)
+    cap = cv2.VideoCapture(CAMERA_INDEX)
     if not cap.isOpened():
-        logging.error("Failed to open camera")
+        logging.error(f"Failed to open camera {CAMERA_INDEX}")
         return
     
     logging.info("Camera opened successfully")
     recognized_students = set()  # Track already recognized students this session
-    unknown_face_cooldown = {}  # Track when unknown faces were last saved
+    unknown_faces = create_unknown_face_cache()  # Recently seen unknown people
+    display = create_display(headless, preview_fps)
+    stop_event.clear()
+    # The dashboard stops the recognizer with SIGTERM in every mode; end the
+    # loop cleanly so the writers below flush their queued batches
+    handlers = {signal.SIGTERM: stop_recognition, signal.SIGINT: stop_recognition}
+    if MODEL_RELOAD:
+        model_reloader.start()
+        if hasattr(signal, "SIGHUP"):  # not on Windows
+            handlers[signal.SIGHUP] = model_reloader.request
+    previous_handlers = {}
+    if threading.current_thread() is threading.main_thread():
+        for signum, handler in handlers.items():
+            previous_handlers[signum] = signal.signal(signum, handler)
+    attendance_writer.start()
+    alert_writer.start()
+
+    try:
+        if mode == "pipeline":
+            run_pipeline(cap, session, recognized_students, unknown_faces, display, workers)
+        elif mode == "tracking":
+            run_tracking(cap, session, recognized_students, unknown_faces, display)
+        else:
+            run_serial(cap, session, recognized_students, unknown_faces, display)
+    finally:
+        # Commit every queued attendance row and alert update before exiting
+        if MODEL_RELOAD:
+            model_reloader.stop()
+        attendance_writer.stop()
+        unknown_faces.close()
+        alert_writer.stop()
+        cap.release()
+        display.close()
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+    logging.info(f"Face recognition session ended. Recognized {len(recognized_students)} students")
 
-    while True:
+def run_serial(cap, session, recognized_students, unknown_faces, display):
+    """Original single-threaded capture/recognize/write loop."""
+    while not stop_event.is_set():
+        swap_reloaded_model()
+        ret, frame = cap.read()
+        if not ret:
+            logging.warning("Failed to read frame from camera")
+            break
+
+        results = process_frame(frame)
+        labels = handle_results(frame, results, session, recognized_students, unknown_faces)
+        if not display.show(frame, labels):
+            break
+
+def run_pipeline(cap, session, recognized_students, unknown_faces, display, workers=None):
+    """Staged loop: capture thread -> recognition workers -> sink thread.
+
+    The main thread only displays the latest frame and prints per-stage
+    FPS so the worker count can be sized for the camera.
+    """
+    def sink(frame, results):
+        return handle_results(frame, results, session, recognized_students, unknown_faces)
+
+    pipeline = RecognitionPipeline(
+        cap, process_frame, sink,
+        workers=workers or PIPELINE_WORKERS,
+        queue_size=PIPELINE_FRAME_QUEUE_SIZE,
+    )
+    pipeline.start()
+    last_report = time.time()
+
+    while pipeline.is_running() and not stop_event.is_set():
+        # Workers read the model once per frame, so a swap never splits one
+        swap_reloaded_model()
+        shown = pipeline.get_display_frame(timeout=0.05)
+        if shown is not None and not display.show(*shown):
+            break
+
+        if time.time() - last_report >= PIPELINE_STATS_INTERVAL:
+            report = pipeline.format_stats()
+            logging.info(f"Pipeline stats: {report}")
+            print(f"📊 {report}")
+            last_report = time.time()
+
+    pipeline.stop()
+    logging.info(f"Pipeline stopped. Final stats: {pipeline.format_stats()}")
+
+def run_tracking(cap, session, recognized_students, unknown_faces, display):
+    """Serial loop that only runs Haar every DETECTION_INTERVAL frames or on motion.
+
+    Faces are followed between detections with optical flow and each track is
+    recognized once, so LBPH predict runs per new face instead of per frame.
+    """
+    tracker = FaceTracker(
+        detect_interval=DETECTION_INTERVAL,
+        motion_threshold=MOTION_THRESHOLD,
+        iou_threshold=TRACK_IOU_THRESHOLD,
+        max_misses=TRACK_MAX_MISSES,
+        unknown_threshold=CONFIDENCE_THRESHOLD,
+    )
+
+    while not stop_event.is_set():
+        swap_reloaded_model()
         ret, frame = cap.read()
         if not ret:
             logging.warning("Failed to read frame from camera")
             break
 
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = haar_cascade.detectMultiScale(gray, 1.3, 5)
-
-        for (x, y, w, h) in faces:
-            roi_gray = gray[y:y+h, x:x+w]
-            # Normalize face size to match training
-            roi_gray = cv2.resize(roi_gray, (FACE_SIZE_WIDTH, FACE_SIZE_HEIGHT))
-
-            # Predict with recognizer
-            label, confidence = recognizer.predict(roi_gray)
-
-            if confidence < CONFIDENCE_THRESHOLD:
-                # Use proper mapping from training
-                student_roll = label_to_name.get(label, f"Unknown_Label_{label}")
-                student_info = get_student_info_from_roll(student_roll)
-
-                if student_info:
-                    student_id, student_name = student_info
-                    # Check if already recognized this session
-                    if student_roll not in recognized_students:
-                        mark_attendance_new(student_id, student_name, status="Present", session=session)
-                        recognized_students.add(student_roll)
-                        logging.info(f"Student {student_name} (ID: {student_id}) recognized with confidence {confidence:.1f}")
-                    else:
-                        logging.debug(f"Student {student_name} already recognized this session")
-
-                    # Draw rectangle + label for recognized student
-                    cv2.putText(frame, student_name, (x, y-10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                else:
-                    logging.warning(f"Student {student_roll} not found in database")
-                    # Treat as unknown face
-                    confidence = 100  # Force unknown face handling
-                    
-            if confidence >= CONFIDENCE_THRESHOLD:
-                # Unknown face detected
-                face_key = f"{x}_{y}_{w}_{h}"
-                current_time = time.time()
-                
-                # Only save unknown face every 5 seconds to avoid spam
-                if face_key not in unknown_face_cooldown or current_time - unknown_face_cooldown[face_key] > 5:
-                    save_unknown_face(frame, x, y, w, h, confidence)
-                    unknown_face_cooldown[face_key] = current_time
-                
-                # Draw rectangle + label for unknown face
-                cv2.putText(frame, "Unknown - Check Alerts", (x, y-10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
-
-        cv2.imshow("Face Recognition Attendance", frame)
-
-        # Exit with 'q'
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            logging.info("Face recognition stopped by user")
+        tracks = tracker.update(gray, detect_faces, predict_boxes)
+        results = [(*track.box, track.label, track.confidence, track.key) for track in tracks]
+        labels = handle_results(frame, results, session, recognized_students, unknown_faces)
+        if not display.show(frame, labels):
             break
 
-    cap.release()
-    cv2.destroyAllWindows()
-    logging.info(f"Face recognition session ended. Recognized {len(recognized_students)} students")
+    logging.info(
+        f"Tracking mode: {tracker.frame_count} frames, {tracker.detections_run} detections, "
+        f"{tracker.recognitions_run} recognitions"
+    )
 
 if __name__ == "__main__":
-    start_recognition()
+    parser = argparse.ArgumentParser(description="Real-time face recognition attendance")
+    parser.add_argument("--session", default=DEFAULT_SESSION, help="Session name to mark attendance for")
+    parser.add_argument("--mode", choices=["serial", "pipeline", "tracking"], default=RECOGNITION_MODE,
+                        help="serial loop, multi-threaded pipeline or detection + tracking")
+    parser.add_argument("--workers", type=int, default=PIPELINE_WORKERS,
+                        help="Number of recognition workers in pipeline mode")
+    parser.add_argument("--headless", action="store_true", default=HEADLESS,
+                        help="No window or drawing; stop with SIGTERM/SIGINT")
+    parser.add_argument("--preview-fps", type=float, default=PREVIEW_FPS,
+                        help="Annotated preview frames per second for the dashboard feed (0 = off)")
+    args = parser.parse_args()
+    start_recognition(session=args.session, mode=args.mode, workers=args.workers,
+                      headless=args.headless, preview_fps=args.preview_fps)
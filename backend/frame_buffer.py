@@ -0,0 +1,199 @@
+import time
+import struct
+import logging
+import threading
+from multiprocessing import shared_memory, resource_tracker
+
+import cv2
+import numpy as np
+
+from backend.config import PREVIEW_BUFFER_NAME, PREVIEW_BUFFER_SLOTS, PREVIEW_SLOT_SIZE, PREVIEW_IDLE_TIMEOUT
+
+# Shared-memory ring of encoded preview frames. The recognition process
+# JPEG-encodes each preview frame once and writes it into the next slot;
+# the web server maps the same segment read-only and hands the newest frame
+# to every /video_feed client, so viewers cost a memory copy, not an encode.
+#
+# Layout: a header (magic, slot count, slot size, newest sequence number)
+# followed by fixed-size slots of (sequence, length, JPEG bytes). The writer
+# clears a slot's sequence before overwriting it and stores it again last,
+# so a reader that sees the same sequence before and after copying has a
+# complete frame; anything else is skipped and the previous frame reused.
+
+_MAGIC = b"AFRB"
+_HEADER = struct.Struct("<4sIIQ")
+_SEQ = struct.Struct("<Q")
+_SEQ_OFFSET = 12
+_HEADER_SIZE = 64
+_SLOT = struct.Struct("<QI")
+_ATTACH_RETRY = 1.0
+_placeholder = None
+
+
+def placeholder_jpeg():
+    """Small "no preview" frame sent while the recognizer publishes nothing."""
+    global _placeholder
+    if _placeholder is None:
+        image = np.full((270, 480, 3), 40, dtype=np.uint8)
+        cv2.putText(image, "Waiting for camera preview", (60, 140),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (200, 200, 200), 2)
+        _placeholder = cv2.imencode(".jpg", image)[1].tobytes()
+    return _placeholder
+
+
+def _part(jpeg):
+    return (b"--frame\r\nContent-Type: image/jpeg\r\n"
+            b"Content-Length: " + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n")
+
+
+def _slot_offset(seq, slots, slot_size):
+    return _HEADER_SIZE + (seq % slots) * (_SLOT.size + slot_size)
+
+
+class FrameRingWriter:
+    """Owns the shared segment; used by the recognition process."""
+
+    def __init__(self, name=PREVIEW_BUFFER_NAME, slots=PREVIEW_BUFFER_SLOTS, slot_size=PREVIEW_SLOT_SIZE):
+        self.name = name
+        self.slots = slots
+        self.slot_size = slot_size
+        self.seq = 0
+        self._oversized = 0
+        size = _HEADER_SIZE + slots * (_SLOT.size + slot_size)
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a recognizer that was killed; replace it
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _HEADER.pack_into(self._shm.buf, 0, _MAGIC, slots, slot_size, 0)
+
+    def publish(self, jpeg):
+        """Store one encoded frame as the newest."""
+        length = len(jpeg)
+        if length > self.slot_size:
+            self._oversized += 1
+            if self._oversized == 1 or self._oversized % 100 == 0:
+                logging.warning(f"Preview frame of {length} bytes exceeds PREVIEW_SLOT_SIZE; "
+                                f"{self._oversized} frames skipped so far")
+            return
+        buf = self._shm.buf
+        seq = self.seq + 1
+        offset = _slot_offset(seq, self.slots, self.slot_size)
+        _SLOT.pack_into(buf, offset, 0, 0)
+        start = offset + _SLOT.size
+        buf[start:start + length] = jpeg
+        _SLOT.pack_into(buf, offset, seq, length)
+        _SEQ.pack_into(buf, _SEQ_OFFSET, seq)
+        self.seq = seq
+
+    def close(self):
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameFeed:
+    """Read side for the web server: one attachment shared by every viewer.
+
+    latest() copies a frame out of shared memory only when a newer one has
+    been published; all clients get the same bytes object. The segment is
+    attached lazily and detached when it stops advancing, so the feed picks
+    up a recognizer that was restarted. A segment left behind by a killed
+    recognizer is not served again until its sequence moves.
+    """
+
+    def __init__(self, name=PREVIEW_BUFFER_NAME, stale_after=5.0):
+        self.name = name
+        self.stale_after = stale_after
+        self._shm = None
+        self._seq = 0
+        self._frame = None
+        self._changed = 0.0
+        self._stale_seq = None
+        self._next_attach = 0.0
+        self._lock = threading.Lock()
+
+    def latest(self):
+        """(sequence, JPEG bytes) of the newest frame, or (0, None) if none is available."""
+        with self._lock:
+            if self._shm is None and not self._attach():
+                return 0, None
+            buf = self._shm.buf
+            seq = _SEQ.unpack_from(buf, _SEQ_OFFSET)[0]
+            now = time.monotonic()
+            if seq == self._seq:
+                if now - self._changed > self.stale_after:
+                    self._stale_seq = seq
+                    self._detach()
+                    return 0, None
+                return self._seq, self._frame
+            offset = _slot_offset(seq, self._slots, self._slot_size)
+            slot_seq, length = _SLOT.unpack_from(buf, offset)
+            if slot_seq == seq:
+                start = offset + _SLOT.size
+                frame = bytes(buf[start:start + length])
+                if _SLOT.unpack_from(buf, offset)[0] == seq:
+                    self._seq, self._frame = seq, frame
+            self._changed = now
+            return self._seq, self._frame
+
+    def stream(self, poll_interval=0.05, keepalive=2.0, idle_timeout=PREVIEW_IDLE_TIMEOUT):
+        """Generator of multipart/x-mixed-replace parts (boundary "frame") for one client.
+
+        Without new frames the last part (or the placeholder) is repeated
+        every keepalive seconds, so a client that went away is noticed on
+        the next write; after idle_timeout seconds the stream ends.
+        """
+        sent = 0
+        last_part = last_frame = time.monotonic()
+        yield _part(placeholder_jpeg())
+        while True:
+            seq, frame = self.latest()
+            now = time.monotonic()
+            if frame is not None and seq != sent:
+                sent = seq
+                last_part = last_frame = now
+                yield _part(frame)
+            elif now - last_frame > idle_timeout:
+                return
+            elif now - last_part > keepalive:
+                last_part = now
+                yield _part(frame if frame is not None else placeholder_jpeg())
+            time.sleep(poll_interval)
+
+    def _attach(self):
+        now = time.monotonic()
+        if now < self._next_attach:
+            return False
+        self._next_attach = now + _ATTACH_RETRY
+        try:
+            shm = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            self._stale_seq = None
+            return False
+        # Attaching registers the segment with this process's resource
+        # tracker, which would unlink it on exit; the writer owns it
+        resource_tracker.unregister(shm._name, "shared_memory")
+        magic, slots, slot_size, seq = _HEADER.unpack_from(shm.buf, 0)
+        if magic != _MAGIC or seq == self._stale_seq:
+            shm.close()
+            return False
+        self._stale_seq = None
+        self._shm, self._slots, self._slot_size = shm, slots, slot_size
+        self._seq, self._frame = 0, None
+        self._changed = time.monotonic()
+        return True
+
+    def _detach(self):
+        self._shm.close()
+        self._shm = None
+
+    def close(self):
+        with self._lock:
+            if self._shm is not None:
+                self._detach()
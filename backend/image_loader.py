@@ -0,0 +1,47 @@
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import cv2 as cv
+import numpy as np
+
+from backend.config import FACE_SIZE_WIDTH, FACE_SIZE_HEIGHT, LOADER_WORKERS
+
+def load_face_images(paths, size=(FACE_SIZE_WIDTH, FACE_SIZE_HEIGHT), workers=LOADER_WORKERS):
+    """Decode and resize grayscale images in parallel into one preallocated array.
+
+    imread/resize release the GIL, so a thread pool scales across cores
+    without pickling images between processes. Each worker resizes straight
+    into its slot of the (n, height, width) uint8 result. Returns
+    (faces, ok) where ok marks which paths were readable; faces only holds
+    the readable ones, in input order.
+    """
+    width, height = size
+    faces = np.empty((len(paths), height, width), dtype=np.uint8)
+    ok = np.zeros(len(paths), dtype=bool)
+
+    def load(i):
+        img = cv.imread(paths[i], cv.IMREAD_GRAYSCALE)
+        if img is None:
+            return
+        if img.shape == (height, width):
+            faces[i] = img
+        else:
+            cv.resize(img, size, dst=faces[i])
+        ok[i] = True
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        list(pool.map(load, range(len(paths))))
+    elapsed = time.perf_counter() - start
+
+    rate = len(paths) / elapsed if elapsed > 0 else 0.0
+    logging.info(f"Loaded {int(ok.sum())}/{len(paths)} images in {elapsed:.2f}s ({rate:.0f} images/s)")
+    print(f" Loaded {int(ok.sum())} images in {elapsed:.2f}s ({rate:.0f} images/s)")
+
+    if not ok.all():
+        for i in np.flatnonzero(~ok):
+            logging.warning(f"Skipping unreadable image: {paths[i]}")
+            print(f" Skipping unreadable image: {paths[i]}")
+        faces = faces[ok]
+    return faces, ok
@@ -0,0 +1,75 @@
+import os
+import re
+import hashlib
+
+import cv2
+
+from backend.config import ALERT_JPEG_QUALITY, ALERT_THUMBNAIL_SIZE
+
+# Content-addressed store for unknown-face crops. A crop is JPEG-encoded once
+# and saved as <aa>/<sha256>.jpg (aa = first two hex digits, so no directory
+# grows too large) with a thumbnail at thumbs/<aa>/<sha256>.jpg. Identical
+# crops map to the same file and are stored once, and a name never changes
+# content, so the web app can let browsers cache it for good. Names from
+# before the store (flat unknown_face_*.jpg files) have no thumbnail.
+
+THUMBNAIL_DIR = "thumbs"
+_NAME_PATTERN = re.compile(r"^(?:thumbs/)?[0-9a-f]{2}/([0-9a-f]{64})\.jpg$")
+
+
+def content_digest(name):
+    """SHA-256 digest of a content-addressed image or thumbnail name, else None."""
+    match = _NAME_PATTERN.match(name)
+    return match.group(1) if match else None
+
+
+def thumbnail_name(name):
+    """Thumbnail of a stored image; legacy names fall back to the image itself."""
+    return f"{THUMBNAIL_DIR}/{name}" if content_digest(name) else name
+
+
+class ImageStore:
+    """Writes JPEG crops and thumbnails under root, named by content hash."""
+
+    def __init__(self, root, quality=ALERT_JPEG_QUALITY, thumbnail_size=ALERT_THUMBNAIL_SIZE):
+        self.root = root
+        self.quality = quality
+        self.thumbnail_size = thumbnail_size
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split("/"))
+
+    def put(self, image):
+        """Store a BGR or grayscale image; returns its name relative to root."""
+        data = self._encode(image)
+        digest = hashlib.sha256(data).hexdigest()
+        name = f"{digest[:2]}/{digest}.jpg"
+        path = self.path(name)
+        if not os.path.exists(path):
+            # Thumbnail first: an existing image always has its thumbnail
+            self._write(self.path(thumbnail_name(name)), self._encode(self._shrink(image)))
+            self._write(path, data)
+        return name
+
+    def _encode(self, image):
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return encoded.tobytes()
+
+    def _shrink(self, image):
+        height, width = image.shape[:2]
+        scale = self.thumbnail_size / max(height, width)
+        if scale >= 1:
+            return image
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def _write(path, data):
+        """Write via a temporary file so readers never see a partial image."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
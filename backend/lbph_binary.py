@@ -0,0 +1,197 @@
+import os
+import sys
+import glob
+import time
+import struct
+import logging
+import argparse
+
+import cv2
+import numpy as np
+
+# Ensure project root on sys.path when invoked directly
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.config import MODEL_PATH, BINARY_MODEL_PATH, BINARY_MODEL_DTYPE
+from backend.lbph_engine import LBPHEngine
+
+# Compact binary LBPH model. OpenCV's YAML stores every histogram bin as
+# text, so a large class means hundreds of MB that recognizer.read has to
+# parse on every start. This format is a 64-byte header (parameters, row
+# and bin counts, storage dtype, scale), the int32 labels, and the histogram
+# matrix as one raw little-endian blob that is memory-mapped on load: start
+# up is a few page faults instead of a parse, and every process loading the
+# same file shares one copy in the page cache.
+#
+# A running recognizer keeps the file mapped, and Windows refuses to replace
+# or delete a mapped file. So every save writes a new versioned file
+# (face_recognizer-<ns>.lbph) and BINARY_MODEL_PATH is a one-line pointer to
+# the current one; versions nobody maps any more are removed on later saves.
+#
+# Histograms can be stored as
+#   float32  exactly as trained
+#   float16  half the size; distances change by well under a confidence point
+#   uint16   whole pixel counts per LBP cell (value = count * scale): half
+#            the size and lossless, since LBPH bins are counts / cell area
+#
+#   python backend/lbph_binary.py export --dtype uint16   # MODEL_PATH -> BINARY_MODEL_PATH
+#   python backend/lbph_binary.py import                  # BINARY_MODEL_PATH -> MODEL_PATH
+
+MAGIC = b"LBPHBIN\0"
+VERSION = 1
+_HEADER = struct.Struct("<8sHHIIIIQQdd")
+HEADER_SIZE = 64
+_ALIGNMENT = 64
+DTYPES = {"float32": (1, np.dtype("<f4")), "float16": (2, np.dtype("<f2")), "uint16": (3, np.dtype("<u2"))}
+_DTYPE_BY_CODE = {code: dtype for code, dtype in DTYPES.values()}
+_ROWS_PER_WRITE = 256
+
+
+def _data_offset(rows):
+    labels_end = HEADER_SIZE + 4 * rows
+    return -(-labels_end // _ALIGNMENT) * _ALIGNMENT
+
+
+def count_scale(engine):
+    """Scale that turns the engine's histogram values into whole uint16 counts, or None.
+
+    The smallest non-zero bin is one pixel of a cell, i.e. 1 / cell area.
+    """
+    smallest = None
+    for start in range(0, len(engine), _ROWS_PER_WRITE):
+        chunk = engine.decode_rows(slice(start, start + _ROWS_PER_WRITE), np.float64)
+        positive = chunk[chunk > 0]
+        if positive.size:
+            smallest = positive.min() if smallest is None else min(smallest, positive.min())
+    if smallest is None:
+        return None
+    area = round(1.0 / smallest)
+    for start in range(0, len(engine), _ROWS_PER_WRITE):
+        counts = engine.decode_rows(slice(start, start + _ROWS_PER_WRITE), np.float64) * area
+        if counts.max() > np.iinfo(np.uint16).max or np.abs(counts - np.round(counts)).max() > 1e-3:
+            return None
+    return 1.0 / area
+
+
+def save_binary(path, engine, dtype=BINARY_MODEL_DTYPE):
+    """Write an LBPHEngine's model; uint16 falls back to float32 if bins are not whole counts."""
+    code, storage = DTYPES[dtype]
+    scale = 1.0
+    if dtype == "uint16":
+        scale = count_scale(engine)
+        if scale is None:
+            logging.warning("Histograms are not whole pixel counts; storing float32 instead of uint16")
+            code, storage = DTYPES["float32"]
+            scale = 1.0
+
+    rows, bins = engine.histograms.shape
+    header = _HEADER.pack(MAGIC, VERSION, code, engine.radius, engine.neighbors, engine.grid_x,
+                          engine.grid_y, rows, bins, engine.threshold, scale)
+    with open(path, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(np.asarray(engine.labels, dtype="<i4").tobytes())
+        f.write(b"\0" * (_data_offset(rows) - f.tell()))
+        for start in range(0, rows, _ROWS_PER_WRITE):
+            values = engine.decode_rows(slice(start, start + _ROWS_PER_WRITE), np.float64)
+            if scale != 1.0:
+                values = np.round(values / scale)
+            f.write(values.astype(storage).tobytes())
+    logging.info(f"Binary model saved to {path}: {rows} histograms, {storage.name}")
+
+
+def binary_data_path(path):
+    """The model file path refers to: path itself, or the version a pointer file names."""
+    with open(path, "rb") as f:
+        head = f.read(len(MAGIC))
+        if head == MAGIC:
+            return path
+        name = (head + f.read()).decode("utf-8").strip()
+    return os.path.join(os.path.dirname(path), name)
+
+
+def publish_binary(path, engine, dtype=BINARY_MODEL_DTYPE):
+    """Save to a new versioned file next to path, then point path at it."""
+    root, ext = os.path.splitext(path)
+    version_path = f"{root}-{time.time_ns()}{ext}"
+    save_binary(version_path, engine, dtype)
+    tmp_path = f"{root}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(os.path.basename(version_path) + "\n")
+    os.replace(tmp_path, path)
+    for old_path in glob.glob(f"{glob.escape(root)}-*{ext}"):
+        if old_path != version_path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass  # still mapped by a recognizer on Windows; removed on a later save
+
+
+def load_binary(path, **kwargs):
+    """LBPHEngine over a read-only memory map of a binary model file (or pointer)."""
+    path = binary_data_path(path)
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError(f"{path} is not a binary LBPH model")
+    magic, version, code, radius, neighbors, grid_x, grid_y, rows, bins, threshold, scale = _HEADER.unpack(header)
+    if magic != MAGIC or code not in _DTYPE_BY_CODE:
+        raise ValueError(f"{path} is not a binary LBPH model")
+    if version != VERSION:
+        raise ValueError(f"{path} has unsupported format version {version}")
+    labels = np.fromfile(path, dtype="<i4", count=rows, offset=HEADER_SIZE)
+    histograms = np.memmap(path, dtype=_DTYPE_BY_CODE[code], mode="r",
+                           offset=_data_offset(rows), shape=(rows, bins))
+    return LBPHEngine(histograms, labels, radius=radius, neighbors=neighbors, grid_x=grid_x,
+                      grid_y=grid_y, threshold=threshold, scale=scale, **kwargs)
+
+
+def save_opencv(path, engine):
+    """Write an engine's model in OpenCV's LBPH YAML layout, readable by recognizer.read."""
+    fs = cv2.FileStorage(path, cv2.FILE_STORAGE_WRITE)
+    fs.startWriteStruct("opencv_lbphfaces", cv2.FileNode_MAP)
+    fs.write("threshold", engine.threshold)
+    fs.write("radius", engine.radius)
+    fs.write("neighbors", engine.neighbors)
+    fs.write("grid_x", engine.grid_x)
+    fs.write("grid_y", engine.grid_y)
+    fs.startWriteStruct("histograms", cv2.FileNode_SEQ)
+    for start in range(0, len(engine), _ROWS_PER_WRITE):
+        for row in engine.decode_rows(slice(start, start + _ROWS_PER_WRITE)):
+            fs.write("", row.reshape(1, -1))
+    fs.endWriteStruct()
+    fs.write("labels", np.asarray(engine.labels, dtype=np.int32).reshape(-1, 1))
+    fs.startWriteStruct("labelsInfo", cv2.FileNode_SEQ)
+    fs.endWriteStruct()
+    fs.endWriteStruct()
+    fs.release()
+    logging.info(f"OpenCV model saved to {path}: {len(engine)} histograms")
+
+
+if __name__ == "__main__":
+    from backend.model_loader import replace_file
+
+    parser = argparse.ArgumentParser(description="Convert the LBPH model between OpenCV YAML and the binary format")
+    parser.add_argument("direction", choices=["export", "import"],
+                        help="export: YAML -> binary; import: binary -> YAML")
+    parser.add_argument("--dtype", choices=list(DTYPES), default=BINARY_MODEL_DTYPE,
+                        help="Histogram storage for export")
+    parser.add_argument("--yaml", default=MODEL_PATH, help="OpenCV model file")
+    parser.add_argument("--binary", default=BINARY_MODEL_PATH, help="Binary model file")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.direction == "export":
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(args.yaml)
+        engine = LBPHEngine.from_recognizer(recognizer)
+        publish_binary(args.binary, engine, args.dtype)
+        source, target = args.yaml, binary_data_path(args.binary)
+    else:
+        engine = load_binary(args.binary)
+        replace_file(args.yaml, lambda path: save_opencv(path, engine))
+        source, target = binary_data_path(args.binary), args.yaml
+    print(f" {source} ({os.path.getsize(source) / 1e6:.1f} MB) -> {target} "
+          f"({os.path.getsize(target) / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,208 @@
+import numpy as np
+
+# Matches DBL_MAX, the "no threshold" value OpenCV stores in LBPH models
+NO_MATCH_DISTANCE = np.finfo(np.float64).max
+
+# Histogram matrices in these dtypes are used as given (e.g. memory-mapped
+# from a binary model file); anything else is converted to float32
+STORAGE_DTYPES = (np.dtype(np.float32), np.dtype(np.float16), np.dtype(np.uint16))
+
+
+class LBPHEngine:
+    """Vectorized re-implementation of OpenCV's LBPHFaceRecognizer.predict.
+
+    The training histograms are pulled out of a trained recognizer into one
+    contiguous float32 matrix (one row per training image). Query faces are
+    converted to LBP histograms as a batch with NumPy and scored against the
+    whole matrix, returning the same (label, confidence) pairs as
+    recognizer.predict.
+
+    Distances for the whole batch are computed in float32 with a
+    reciprocal-sum identity, then the few rows closest to the minimum are
+    re-scored exactly in float64.
+
+    The matrix may also be stored as float16, or as uint16 pixel counts with
+    histogram value = count * scale (see backend/lbph_binary.py); rows are
+    widened to float32 one cache-sized chunk at a time while scoring.
+    """
+
+    def __init__(self, histograms, labels, radius=1, neighbors=8, grid_x=8, grid_y=8,
+                 threshold=NO_MATCH_DISTANCE, chunk_elements=262_144, scale=1.0):
+        histograms = np.asarray(histograms)
+        if histograms.dtype not in STORAGE_DTYPES or not histograms.flags.c_contiguous:
+            histograms = np.ascontiguousarray(histograms, dtype=np.float32)
+        self.histograms = histograms
+        self.scale = float(scale)
+        self.labels = np.asarray(labels, dtype=np.int32).ravel()
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.threshold = threshold
+        self.num_patterns = 2 ** neighbors
+        # Training rows per chunk = chunk_elements / bins, sized to stay in cache
+        self.chunk_elements = chunk_elements
+        self.row_sums = self.histograms.sum(axis=1, dtype=np.float64) * self.scale
+        self._offsets = self._sample_offsets()
+
+    @classmethod
+    def from_recognizer(cls, recognizer, **kwargs):
+        """Build an engine from a trained cv2.face.LBPHFaceRecognizer."""
+        histograms = recognizer.getHistograms()
+        if len(histograms) == 0:
+            raise ValueError("Recognizer has no training histograms")
+        return cls(
+            np.vstack([h.reshape(1, -1) for h in histograms]),
+            recognizer.getLabels(),
+            radius=recognizer.getRadius(),
+            neighbors=recognizer.getNeighbors(),
+            grid_x=recognizer.getGridX(),
+            grid_y=recognizer.getGridY(),
+            threshold=recognizer.getThreshold(),
+            **kwargs,
+        )
+
+    def __len__(self):
+        return len(self.labels)
+
+    def decode_rows(self, rows, dtype=np.float32):
+        """Stored histogram rows (an index array, mask or slice) as histogram values."""
+        block = np.asarray(self.histograms[rows]).astype(dtype, copy=False)
+        if self.scale != 1.0:
+            block = block * dtype(self.scale)
+        return block
+
+    # ---------- feature extraction ----------
+    def _sample_offsets(self):
+        """Per-neighbor sampling offsets and bilinear weights, computed as OpenCV does."""
+        offsets = []
+        for n in range(self.neighbors):
+            angle = 2.0 * np.pi * n / float(self.neighbors)
+            x = np.float32(self.radius * np.cos(angle))
+            y = np.float32(-self.radius * np.sin(angle))
+            fx, fy = int(np.floor(x)), int(np.floor(y))
+            cx, cy = int(np.ceil(x)), int(np.ceil(y))
+            ty = np.float32(y - fy)
+            tx = np.float32(x - fx)
+            one = np.float32(1)
+            weights = (
+                (one - tx) * (one - ty),
+                tx * (one - ty),
+                (one - tx) * ty,
+                tx * ty,
+            )
+            offsets.append((fx, fy, cx, cy, weights))
+        return offsets
+
+    def lbp_images(self, faces):
+        """Extended (circular) LBP codes for a (batch, height, width) uint8 array."""
+        src = np.asarray(faces, dtype=np.float32)
+        if src.ndim == 2:
+            src = src[None]
+        r = self.radius
+        _, rows, cols = src.shape
+        center = src[:, r:rows - r, r:cols - r]
+        codes = np.zeros(center.shape, dtype=np.int32)
+        eps = np.finfo(np.float32).eps
+
+        def window(dy, dx):
+            return src[:, r + dy:rows - r + dy, r + dx:cols - r + dx]
+
+        for n, (fx, fy, cx, cy, (w1, w2, w3, w4)) in enumerate(self._offsets):
+            t = w1 * window(fy, fx) + w2 * window(fy, cx) + w3 * window(cy, fx) + w4 * window(cy, cx)
+            bit = (t > center) | (np.abs(t - center) < eps)
+            codes |= bit.astype(np.int32) << n
+        return codes
+
+    def compute_histograms(self, faces):
+        """Normalized spatial LBP histograms, one row per face (batch, grid_y*grid_x*patterns)."""
+        codes = self.lbp_images(faces)
+        batch, rows, cols = codes.shape
+        height, width = rows // self.grid_y, cols // self.grid_x
+        cells = codes[:, :height * self.grid_y, :width * self.grid_x]
+        cells = cells.reshape(batch, self.grid_y, height, self.grid_x, width)
+        cells = cells.transpose(0, 1, 3, 2, 4).reshape(batch, self.grid_y * self.grid_x, -1)
+
+        num_cells = self.grid_y * self.grid_x
+        cell_offsets = (np.arange(batch * num_cells) * self.num_patterns).reshape(batch, num_cells, 1)
+        counts = np.bincount(
+            (cells + cell_offsets).ravel(),
+            minlength=batch * num_cells * self.num_patterns,
+        )
+        hist = counts.reshape(batch, -1).astype(np.float32)
+        hist /= np.float32(height * width)
+        return hist
+
+    # ---------- matching ----------
+    def distance_matrix(self, queries, rows=None):
+        """Approximate chi-square distances, shape (len(queries), len(rows)).
+
+        Uses sum((h-q)^2/(h+q)) = sum(h) + sum(q) - 4*sum(1/(1/h + 1/q)), where
+        zero bins become inf reciprocals and drop out. Reciprocals of each
+        training chunk are computed once and shared by the whole batch, so
+        every query costs one add, one reciprocal and one sum per element.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        row_ids = np.arange(len(self.labels)) if rows is None else np.asarray(rows)
+        with np.errstate(divide="ignore"):
+            inv_queries = np.reciprocal(queries)
+
+        harmonic = np.empty((len(queries), len(row_ids)), dtype=np.float64)
+        step = max(1, self.chunk_elements // self.histograms.shape[1])
+        buffer = np.empty((step, self.histograms.shape[1]), dtype=np.float32)
+        for start in range(0, len(row_ids), step):
+            chunk_ids = row_ids[start:start + step]
+            chunk = self.decode_rows(slice(chunk_ids[0], chunk_ids[-1] + 1) if rows is None else chunk_ids)
+            with np.errstate(divide="ignore"):
+                inv_chunk = np.reciprocal(chunk)
+            out = buffer[:len(chunk_ids)]
+            for i, inv_query in enumerate(inv_queries):
+                np.add(inv_chunk, inv_query, out=out)
+                np.reciprocal(out, out=out)
+                harmonic[i, start:start + len(chunk_ids)] = out.sum(axis=1)
+
+        query_sums = queries.sum(axis=1, dtype=np.float64)
+        return 2.0 * (self.row_sums[row_ids][None, :] + query_sums[:, None] - 4.0 * harmonic)
+
+    def exact_distances(self, query, rows):
+        """Chi-square (CHISQR_ALT) distances in float64, bin for bin as OpenCV computes them."""
+        h = self.decode_rows(rows, np.float64)
+        q = np.asarray(query, dtype=np.float64)
+        diff = h - q
+        total = h + q
+        terms = np.divide(diff * diff, total, out=np.zeros_like(total), where=total > np.finfo(np.float64).eps)
+        return 2.0 * terms.sum(axis=1)
+
+    def predict_histograms(self, queries, rows=None, refine_tolerance=1e-3):
+        """(label, confidence) for each precomputed query histogram.
+
+        Rows within refine_tolerance of the approximate minimum are re-scored
+        with exact_distances so labels, ties and confidences match
+        recognizer.predict. rows optionally restricts the search to a subset
+        of training rows (see backend/lbph_index.py).
+        """
+        row_ids = np.arange(len(self.labels)) if rows is None else np.asarray(rows)
+        if len(row_ids) == 0:
+            return [(-1, float(NO_MATCH_DISTANCE)) for _ in queries]
+
+        approx = self.distance_matrix(queries, row_ids if rows is not None else None)
+        predictions = []
+        for query, dist in zip(queries, approx):
+            candidates = row_ids[dist <= dist.min() + refine_tolerance]
+            exact = self.exact_distances(query, candidates)
+            best = int(np.argmin(exact))
+            if exact[best] < self.threshold:
+                predictions.append((int(self.labels[candidates[best]]), float(exact[best])))
+            else:
+                predictions.append((-1, float(NO_MATCH_DISTANCE)))
+        return predictions
+
+    def predict_batch(self, faces):
+        """Predict a batch of equally sized grayscale faces in one call."""
+        if len(faces) == 0:
+            return []
+        return self.predict_histograms(self.compute_histograms(np.asarray(faces)))
+
+    def predict(self, face):
+        """Drop-in replacement for recognizer.predict on a single face."""
+        return self.predict_batch([face])[0]
@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import numpy as np
+
+from backend.lbph_engine import LBPHEngine
+
+
+def label_digest(labels):
+    """Fingerprint of a model's per-row labels (row count, label set and order)."""
+    return hashlib.sha1(np.ascontiguousarray(labels, dtype="<i4").tobytes()).hexdigest()
+
+
+class CentroidIndex:
+    """Two-stage LBPH search: student centroids first, then the top-k students' histograms.
+
+    Each student's training histograms are averaged into one centroid. A
+    query is compared with every centroid (one row per student instead of
+    ~20), and only the rows of the top_k closest students are scored by the
+    exact engine. With top_k >= number of students this equals exhaustive
+    search.
+    """
+
+    def __init__(self, centroid_labels, centroids, num_rows, labels_digest, source_signature=None, top_k=5):
+        self.centroid_labels = np.asarray(centroid_labels, dtype=np.int32)
+        self.centroids = LBPHEngine(centroids, self.centroid_labels)
+        # Row count, label digest and model file (mtime_ns, size) the index was
+        # built from, to detect a stale index
+        self.num_rows = int(num_rows)
+        self.labels_digest = str(labels_digest)
+        self.source_signature = tuple(int(v) for v in source_signature) if source_signature is not None else None
+        self.top_k = top_k
+        self._rows_by_label = {}
+
+    @classmethod
+    def build(cls, engine, top_k=5, source_signature=None):
+        """Average each label's training histograms into a centroid.
+
+        source_signature is the (mtime_ns, size) of the model file engine
+        came from; load() refuses the saved index once that file changes.
+        """
+        labels = np.unique(engine.labels)
+        centroids = np.vstack([
+            engine.decode_rows(engine.labels == label).mean(axis=0) for label in labels
+        ])
+        index = cls(labels, centroids, len(engine), label_digest(engine.labels), source_signature, top_k=top_k)
+        index.attach(engine)
+        return index
+
+    def save(self, path):
+        np.savez(path, centroid_labels=self.centroid_labels,
+                 centroids=self.centroids.histograms, num_rows=self.num_rows,
+                 labels_digest=self.labels_digest, source_signature=np.array(self.source_signature or (-1, -1)))
+        logging.info(f"Centroid index saved to {path} ({len(self.centroid_labels)} students)")
+
+    @classmethod
+    def load(cls, path, engine, source_signature, top_k=5):
+        """Load a saved index, or rebuild it if it does not match the engine's model.
+
+        source_signature is the current (mtime_ns, size) of the model file;
+        a retrain that keeps every row and label but changes histograms
+        still changes the file.
+        """
+        try:
+            with np.load(path) as data:
+                index = cls(data["centroid_labels"], data["centroids"], data["num_rows"],
+                            data["labels_digest"], data["source_signature"], top_k=top_k)
+        except (OSError, KeyError, ValueError) as e:
+            logging.warning(f"Could not load centroid index {path}: {str(e)}; rebuilding")
+            return cls.build(engine, top_k=top_k, source_signature=source_signature)
+
+        if index.num_rows != len(engine) or index.labels_digest != label_digest(engine.labels) \
+                or source_signature is None or index.source_signature != tuple(source_signature):
+            logging.warning(f"Centroid index {path} is stale; rebuilding from model")
+            return cls.build(engine, top_k=top_k, source_signature=source_signature)
+        index.attach(engine)
+        return index
+
+    def attach(self, engine):
+        """Precompute the training rows belonging to each label."""
+        order = np.argsort(engine.labels, kind="stable")
+        sorted_labels = engine.labels[order]
+        bounds = np.flatnonzero(np.diff(sorted_labels)) + 1
+        self._rows_by_label = {
+            int(group_labels[0]): np.sort(rows)
+            for rows, group_labels in zip(np.split(order, bounds), np.split(sorted_labels, bounds))
+        }
+
+    def candidate_rows(self, queries):
+        """Training row ids of the top_k closest students, one array per query."""
+        k = min(self.top_k, len(self.centroid_labels))
+        dist = self.centroids.distance_matrix(queries)
+        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        candidates = []
+        for labels in self.centroid_labels[nearest]:
+            rows = [self._rows_by_label[int(label)] for label in labels]
+            candidates.append(np.sort(np.concatenate(rows)))
+        return candidates
+
+    def predict_histograms(self, engine, queries):
+        predictions = []
+        for query, rows in zip(queries, self.candidate_rows(queries)):
+            predictions.extend(engine.predict_histograms(query[None], rows=rows))
+        return predictions
+
+    def predict_batch(self, engine, faces):
+        """Same contract as LBPHEngine.predict_batch, searching only candidate students."""
+        if len(faces) == 0:
+            return []
+        return self.predict_histograms(engine, engine.compute_histograms(np.asarray(faces)))
@@ -0,0 +1,339 @@
+import os
+import sys
+import logging
+import argparse
+
+# Ensure project root on sys.path when invoked directly
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.config import ALLOW_DUPLICATE_ATTENDANCE
+from backend import summaries
+
+# Versioned schema migrations tracked with PRAGMA user_version. Each entry
+# upgrades the database by one version; migrate() runs the pending ones and
+# the duplicate-attendance rule in a single transaction. Migrations marked
+# with @_rebuilds_summaries recompute the attendance summaries afterwards.
+
+
+def _columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [col[1] for col in cursor.fetchall()]
+
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+ATTENDANCE_TABLE = """
+    CREATE TABLE attendance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER,
+        student_name TEXT,
+        status TEXT,
+        timestamp TEXT,
+        date TEXT NOT NULL,
+        session TEXT,
+        FOREIGN KEY(student_id) REFERENCES students(id)
+    )
+"""
+
+
+ATTENDANCE_ARCHIVE_TABLE = """
+    CREATE TABLE IF NOT EXISTS attendance_duplicates (
+        id INTEGER PRIMARY KEY,
+        student_id INTEGER,
+        student_name TEXT,
+        status TEXT,
+        timestamp TEXT,
+        date TEXT,
+        session TEXT,
+        archived_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+    )
+"""
+
+
+def _rebuilds_summaries(migration):
+    """Mark a migration whose changes invalidate the attendance summaries."""
+    migration.rebuilds_summaries = True
+    return migration
+
+
+def _duplicate_count(cursor):
+    cursor.execute("""
+        SELECT COALESCE(SUM(n - 1), 0)
+        FROM (SELECT COUNT(*) AS n FROM attendance GROUP BY student_id, date, session)
+    """)
+    return cursor.fetchone()[0]
+
+
+def archive_duplicates(cursor):
+    """Move every attendance row but the first of each (student_id, date, session)
+    into attendance_duplicates; returns the number of rows moved."""
+    cursor.execute(ATTENDANCE_ARCHIVE_TABLE)
+    keep = "SELECT MIN(id) FROM attendance GROUP BY student_id, date, session"
+    cursor.execute(f"""
+        INSERT INTO attendance_duplicates (id, student_id, student_name, status, timestamp, date, session)
+        SELECT id, student_id, student_name, status, timestamp, date, session
+        FROM attendance WHERE id NOT IN ({keep})
+    """)
+    moved = cursor.rowcount
+    cursor.execute(f"DELETE FROM attendance WHERE id NOT IN ({keep})")
+    return moved
+
+
+def _convert_attendance(cursor):
+    """Create attendance, or rebuild an old layout into ATTENDANCE_TABLE.
+
+    ALTER TABLE cannot add a NOT NULL column without a default, so old
+    tables are rebuilt with set-based INSERT ... SELECT statements and end
+    up with the same schema fresh ones get.
+    """
+    if not _table_exists(cursor, "attendance"):
+        cursor.execute(ATTENDANCE_TABLE)
+        return
+
+    columns = _columns(cursor, "attendance")
+    if "timestamp" in columns and "date" in columns:
+        return
+    cursor.execute("ALTER TABLE attendance RENAME TO attendance_old")
+    cursor.execute(ATTENDANCE_TABLE)
+    if "timestamp" in columns:
+        # Old app.py migration: timestamp only
+        cursor.execute("""
+            INSERT INTO attendance (id, student_id, student_name, status, timestamp, date, session)
+            SELECT id, student_id, student_name, status, timestamp, COALESCE(substr(timestamp, 1, 10), ''), session
+            FROM attendance_old
+        """)
+    else:
+        # Old models.create_tables: separate date and time columns
+        cursor.execute("""
+            INSERT INTO attendance (id, student_id, student_name, status, timestamp, date, session)
+            SELECT a.id, a.student_id, s.name, a.status, a.date || ' ' || a.time, a.date, a.session
+            FROM attendance_old a
+            LEFT JOIN students s ON a.student_id = s.id
+        """)
+    cursor.execute("DROP TABLE attendance_old")
+
+
+@_rebuilds_summaries
+def _v1_base_schema(cursor):
+    """Converge students, attendance and unverified_faces on one schema.
+
+    attendance gets a sortable YYYY-MM-DD `date` column next to `timestamp`.
+    Databases created by the old models.create_tables (separate date/time
+    columns) or by the old app.py migration (timestamp only) are converted.
+    With ALLOW_DUPLICATE_ATTENDANCE = False, existing duplicates are moved
+    to attendance_duplicates once here, so the unique index can be built;
+    no record is ever dropped.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS students (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            roll_no TEXT UNIQUE NOT NULL,
+            photo_path TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS unverified_faces (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            image_path TEXT,
+            detected_time TEXT,
+            resolved INTEGER DEFAULT 0
+        )
+    """)
+    # Leftover from the old row-by-row migration in frontend/app.py
+    cursor.execute("DROP TABLE IF EXISTS attendance_new")
+    _convert_attendance(cursor)
+
+    cursor.execute(ATTENDANCE_ARCHIVE_TABLE)
+    if not ALLOW_DUPLICATE_ATTENDANCE:
+        moved = archive_duplicates(cursor)
+        if moved:
+            logging.warning(f"Moved {moved} duplicate attendance rows to attendance_duplicates")
+            print(f" Moved {moved} duplicate attendance rows to attendance_duplicates")
+
+
+def _v2_indexes(cursor):
+    """Indexes for the dashboard, per-student history and alert queries."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_date_session ON attendance (date, session)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_student_date ON attendance (student_id, date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_unverified_resolved_time ON unverified_faces (resolved, detected_time)")
+
+
+@_rebuilds_summaries
+def _v3_summaries(cursor):
+    """Materialized per-student and per-session attendance summaries (see backend/summaries.py)."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS session_schedule (
+            session TEXT PRIMARY KEY,
+            late_after TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_student_summary (
+            date TEXT NOT NULL,
+            session TEXT NOT NULL,
+            student_id INTEGER NOT NULL,
+            student_name TEXT,
+            present INTEGER NOT NULL DEFAULT 0,
+            late INTEGER NOT NULL DEFAULT 0,
+            absent INTEGER NOT NULL DEFAULT 0,
+            first_seen TEXT,
+            PRIMARY KEY (date, session, student_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_session_summary (
+            date TEXT NOT NULL,
+            session TEXT NOT NULL,
+            present INTEGER NOT NULL DEFAULT 0,
+            late INTEGER NOT NULL DEFAULT 0,
+            absent INTEGER NOT NULL DEFAULT 0,
+            students INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, session)
+        )
+    """)
+
+
+def _v4_alert_sightings(cursor):
+    """Unknown-face alerts become one row per person with a sighting count."""
+    columns = _columns(cursor, "unverified_faces")
+    if "sighting_count" not in columns:
+        cursor.execute("ALTER TABLE unverified_faces ADD COLUMN sighting_count INTEGER NOT NULL DEFAULT 1")
+    if "last_seen" not in columns:
+        cursor.execute("ALTER TABLE unverified_faces ADD COLUMN last_seen TEXT")
+
+
+def _v5_alert_keys(cursor):
+    """Alerts get a stable key the alert writer updates sightings by; image_path
+    changes when a better crop is stored."""
+    if "alert_key" not in _columns(cursor, "unverified_faces"):
+        cursor.execute("ALTER TABLE unverified_faces ADD COLUMN alert_key TEXT")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_unverified_alert_key ON unverified_faces (alert_key)")
+
+
+MIGRATIONS = [
+    _v1_base_schema,
+    _v2_indexes,
+    _v3_summaries,
+    _v4_alert_sightings,
+    _v5_alert_keys,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+class DuplicateAttendanceError(RuntimeError):
+    """Duplicates exist but ALLOW_DUPLICATE_ATTENDANCE is False."""
+
+
+def _index_exists(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def _apply_duplicate_rule(cursor):
+    """Enforce ALLOW_DUPLICATE_ATTENDANCE with a unique index on (student_id, date, session).
+
+    Only the index changes here; records are never removed because of the
+    setting. Turning duplicates off again while duplicates exist stops the
+    migration with a report (run `python backend/migrations.py
+    --archive-duplicates` to move them to attendance_duplicates).
+    """
+    if ALLOW_DUPLICATE_ATTENDANCE:
+        cursor.execute("DROP INDEX IF EXISTS uq_attendance_student_date_session")
+        return
+    if _index_exists(cursor, "uq_attendance_student_date_session"):
+        return
+    duplicates = _duplicate_count(cursor)
+    if duplicates:
+        raise DuplicateAttendanceError(
+            f"{duplicates} duplicate attendance rows exist but ALLOW_DUPLICATE_ATTENDANCE is False; "
+            "run `python backend/migrations.py --archive-duplicates` or allow duplicates"
+        )
+    cursor.execute("""
+        CREATE UNIQUE INDEX uq_attendance_student_date_session
+        ON attendance (student_id, date, session)
+    """)
+
+
+def _sync_session_schedule(cursor):
+    """Store late cutoffs from config; returns True if they changed."""
+    cursor.execute("SELECT session, late_after FROM session_schedule")
+    current = dict(cursor.fetchall())
+    cutoffs = summaries.late_cutoffs()
+    if current == cutoffs:
+        return False
+    cursor.execute("DELETE FROM session_schedule")
+    cursor.executemany("INSERT INTO session_schedule (session, late_after) VALUES (?, ?)", cutoffs.items())
+    return True
+
+
+def summary_runner(cursor):
+    """Adapter for backend.summaries: run one statement, or executemany for a list of params."""
+    def run(sql, params):
+        if isinstance(params, list):
+            cursor.executemany(sql, params)
+        else:
+            cursor.execute(sql, params)
+    return run
+
+
+def migrate(conn):
+    """Bring the database up to SCHEMA_VERSION; safe to call on every startup."""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA user_version")
+    version = cursor.fetchone()[0]
+
+    conn.commit()
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None  # explicit transaction so DDL and data moves commit together
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        pending = MIGRATIONS[version:]
+        for number, migration in enumerate(pending, start=version + 1):
+            logging.info(f"Applying database migration {number}: {migration.__name__}")
+            migration(cursor)
+        _apply_duplicate_rule(cursor)
+        schedule_changed = _sync_session_schedule(cursor)
+        if schedule_changed or any(getattr(migration, "rebuilds_summaries", False) for migration in pending):
+            # New summary tables, converted attendance or a changed schedule: recompute from raw attendance
+            summaries.rebuild(summary_runner(cursor))
+        cursor.execute(f"PRAGMA user_version = {max(version, SCHEMA_VERSION)}")
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        logging.error("Database migration failed; changes rolled back")
+        raise
+    finally:
+        conn.isolation_level = previous_isolation
+
+    if version < SCHEMA_VERSION:
+        print(f" Database schema upgraded to version {SCHEMA_VERSION}")
+    return SCHEMA_VERSION
+
+
+if __name__ == "__main__":
+    from backend.repository import get_repository
+
+    parser = argparse.ArgumentParser(description="Upgrade the attendance database schema")
+    parser.add_argument("--archive-duplicates", action="store_true",
+                        help="Move duplicate attendance rows to attendance_duplicates so the unique index can be built")
+    args = parser.parse_args()
+
+    repository = get_repository()
+    try:
+        repository.migrate()
+    except DuplicateAttendanceError:
+        # Only raised once the schema is current (migration 1 archived the first time)
+        if not args.archive_duplicates:
+            raise
+    if args.archive_duplicates:
+        moved = repository.archive_duplicate_attendance()
+        print(f" Moved {moved} duplicate attendance rows to attendance_duplicates")
+        repository.migrate()
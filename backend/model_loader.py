@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+from backend.lbph_engine import LBPHEngine
+from backend.lbph_index import CentroidIndex
+from backend.lbph_binary import load_binary
+from backend.config import (
+    MODEL_PATH, BINARY_MODEL_PATH, STUDENT_MAP_PATH, INDEX_PATH, RECOGNITION_ENGINE,
+    RECOGNITION_SEARCH, CENTROID_TOP_K, MODEL_FORMAT, MODEL_CHECK_INTERVAL
+)
+
+# The trained model as one swappable unit. RecognitionModel bundles the
+# recognizer, label mapping, batched engine and centroid index from a single
+# training run; ModelReloader loads a retrained one on a background thread so
+# the recognition loop can switch to it between frames without restarting
+# (and without losing the students already recognized this session).
+
+MODEL_FILES = (MODEL_PATH, BINARY_MODEL_PATH, STUDENT_MAP_PATH, INDEX_PATH)
+
+
+def replace_file(path, write):
+    """Call write(tmp_path), then rename over path.
+
+    A running recognizer hot-reloads the model files, so it must never see
+    a half-written one. The temporary name keeps the extension because
+    OpenCV and NumPy pick the file format from it.
+    """
+    root, ext = os.path.splitext(path)
+    tmp_path = f"{root}.tmp{ext}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_json(data):
+    """replace_file writer for a JSON document."""
+    def write(path):
+        with open(path, "w") as f:
+            json.dump(data, f)
+    return write
+
+
+def model_file(engine_kind=RECOGNITION_ENGINE):
+    """The histogram file RecognitionModel.load reads: the binary model when
+    configured and present, else the OpenCV YAML."""
+    if MODEL_FORMAT == "binary" and engine_kind == "batched" and os.path.exists(BINARY_MODEL_PATH):
+        return BINARY_MODEL_PATH
+    return MODEL_PATH
+
+
+def create_recognizer():
+    return cv2.face.LBPHFaceRecognizer_create() if hasattr(cv2.face, "LBPHFaceRecognizer_create") else cv2.createLBPHFaceRecognizer()
+
+
+def model_signature(paths=MODEL_FILES):
+    """(mtime_ns, size) of each model file, None for missing ones."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class RecognitionModel:
+    """Recognizer, label mapping and optional batched engine / centroid index.
+
+    Prediction and label lookups go through one instance, so replacing the
+    reference to it swaps all of them at once. A model loaded from the
+    binary format has only the engine; recognizer is None.
+    """
+
+    def __init__(self, recognizer, student_id_map, engine=None, index=None):
+        self.recognizer = recognizer
+        self.student_id_map = student_id_map
+        # Reverse mapping (label -> student roll number)
+        self.label_to_name = {v: k for k, v in student_id_map.items()}
+        self.engine = engine
+        self.index = index
+
+    @classmethod
+    def load(cls, engine_kind=RECOGNITION_ENGINE, search=RECOGNITION_SEARCH):
+        """Read the model files written by train_faces.py."""
+        with open(STUDENT_MAP_PATH, "r") as f:
+            student_id_map = json.load(f)
+        logging.info(f"Loaded student mapping: {len(student_id_map)} students")
+
+        path = model_file(engine_kind)
+        if MODEL_FORMAT == "binary" and path != BINARY_MODEL_PATH:
+            logging.warning(f"Binary model {BINARY_MODEL_PATH} not found; loading {MODEL_PATH}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No trained model found at {path}")
+
+        recognizer = engine = None
+        if path == BINARY_MODEL_PATH:
+            # Histograms stay memory-mapped; nothing is parsed or copied
+            engine = load_binary(path)
+            logging.info(f"Loaded binary face model from {path}: {len(engine)} training histograms, "
+                         f"{engine.histograms.dtype.name}")
+        else:
+            recognizer = create_recognizer()
+            recognizer.read(path)
+            logging.info(f"Loaded face recognizer model from {path}")
+            if engine_kind == "batched":
+                # Vectorized LBPH matcher built from the recognizer's training histograms
+                engine = LBPHEngine.from_recognizer(recognizer)
+                logging.info(f"Batched LBPH engine ready: {len(engine)} training histograms")
+
+        # Optional coarse-to-fine index: per-student centroids, then top-k students' histograms
+        index = None
+        if engine is not None and search == "centroid":
+            # Built by training from the YAML, which binary models are exported from
+            index = CentroidIndex.load(INDEX_PATH, engine, model_signature((MODEL_PATH,))[0], top_k=CENTROID_TOP_K)
+            logging.info(f"Centroid index ready: {len(index.centroid_labels)} students, top {CENTROID_TOP_K}")
+        return cls(recognizer, student_id_map, engine, index)
+
+    def predict(self, crops):
+        """Predict a (label, confidence) for every crop.
+
+        With the batched engine all crops of a frame are scored in one call;
+        otherwise each crop goes through recognizer.predict.
+        """
+        if not crops:
+            return []
+        if self.index is not None:
+            return self.index.predict_batch(self.engine, np.stack(crops))
+        if self.engine is not None:
+            return self.engine.predict_batch(np.stack(crops))
+        return [self.recognizer.predict(roi_gray) for roi_gray in crops]
+
+
+class ModelReloader:
+    """Loads a retrained model in the background for the recognition loop to pick up.
+
+    A reload starts when the model files change and then stay unchanged for
+    one check interval (train_faces.py replaces them one after another), or
+    when request() is called, e.g. from SIGHUP. The loop calls take() between
+    frames and gets the new RecognitionModel once it is fully loaded; frames
+    keep using the current model while the load runs. A model that fails to
+    load is logged and skipped until the files change again.
+    """
+
+    def __init__(self, load=RecognitionModel.load, paths=MODEL_FILES, check_interval=MODEL_CHECK_INTERVAL):
+        self.load = load
+        self.paths = paths
+        self.check_interval = check_interval
+        self._loaded_signature = model_signature(paths)
+        self._pending = None
+        self._requested = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def request(self, *args):
+        """Reload on the next check even if the files look unchanged; safe from signal handlers."""
+        self._requested.set()
+
+    def take(self):
+        """The newly loaded model, or None; each model is handed out once."""
+        with self._lock:
+            model, self._pending = self._pending, None
+        return model
+
+    def _run(self):
+        seen = self._loaded_signature
+        while not self._stop.wait(self.check_interval):
+            current = model_signature(self.paths)
+            if not self._requested.is_set():
+                if current == self._loaded_signature or current != seen:
+                    seen = current  # unchanged, or still being written
+                    continue
+            self._requested.clear()
+            self._reload(current)
+
+    def _reload(self, signature):
+        started = time.time()
+        try:
+            model = self.load()
+        except Exception as e:
+            logging.error(f"Model reload failed, keeping the current model: {str(e)}")
+            self._loaded_signature = signature
+            return
+        if model_signature(self.paths) != signature:
+            logging.info("Model files changed during reload; waiting for training to finish")
+            return
+        with self._lock:
+            self._pending = model
+        self._loaded_signature = signature
+        logging.info(f"Reloaded model in {time.time() - started:.2f}s: {len(model.student_id_map)} students")
+        print(f"🔄 Reloaded face model ({len(model.student_id_map)} students)")
@@ -1,32 +1,10 @@
-
-from backend.database import get_connection
+from backend.repository import get_repository
 
 def create_tables():
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    # Create students table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS students (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            roll_no TEXT UNIQUE NOT NULL,
-            photo_path TEXT
-        )
-    """)
-
-    # Create attendance table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS attendance (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id INTEGER,
-            date TEXT,
-            time TEXT,
-            status TEXT,
-            session TEXT,
-            FOREIGN KEY(student_id) REFERENCES students(id)
-        )
-    """)
+    """Create or upgrade students, attendance and unverified_faces to the current schema.
 
-    conn.commit()
-    conn.close()
+    The SQLite schema lives in backend/migrations.py and the server-database
+    schema in backend/repository.py, so every entry point converges on the
+    same tables and indexes.
+    """
+    get_repository().migrate()
@@ -0,0 +1,203 @@
+import queue
+import threading
+import time
+import logging
+
+# Sentinel telling the sink stage that all workers have finished
+_STOP = object()
+
+
+class DropOldestQueue:
+    """Bounded queue that discards the oldest item instead of blocking the producer.
+
+    The capture thread must never wait on slow consumers, otherwise the camera
+    buffer fills up and frames arrive late. Dropping the oldest frame keeps the
+    workers on the most recent image.
+    """
+
+    def __init__(self, maxsize):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def put(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        return self._queue.get(timeout=timeout)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+class StageStats:
+    """Thread-safe item counter that reports throughput since the last snapshot."""
+
+    def __init__(self, name):
+        self.name = name
+        self.total = 0
+        self._lock = threading.Lock()
+        self._last_total = 0
+        self._last_time = time.time()
+
+    def tick(self, count=1):
+        with self._lock:
+            self.total += count
+
+    def fps(self):
+        """Items per second since the previous call."""
+        with self._lock:
+            now = time.time()
+            elapsed = now - self._last_time
+            rate = (self.total - self._last_total) / elapsed if elapsed > 0 else 0.0
+            self._last_total = self.total
+            self._last_time = now
+            return rate
+
+
+class RecognitionPipeline:
+    """Capture -> detect/recognize workers -> sink, each stage on its own thread(s).
+
+    process_frame(frame) runs on the worker pool and returns the face results.
+    handle_result(frame, results) runs on a single sink thread, so it may keep
+    per-session state (recognized students, cooldowns) without locking and is
+    the only stage that touches the database or disk. Its return value is
+    handed back with the frame by get_display_frame().
+    """
+
+    def __init__(self, cap, process_frame, handle_result, workers=2, queue_size=4):
+        self.cap = cap
+        self.process_frame = process_frame
+        self.handle_result = handle_result
+        self.num_workers = max(1, workers)
+
+        self.frame_queue = DropOldestQueue(queue_size)
+        # Blocking queue: attendance results are never dropped, back-pressure
+        # ends up in frame_queue where dropping is harmless
+        self.result_queue = queue.Queue(maxsize=queue_size * self.num_workers)
+
+        self.stats = {
+            "capture": StageStats("capture"),
+            "recognize": StageStats("recognize"),
+            "sink": StageStats("sink"),
+        }
+
+        self._stop_event = threading.Event()
+        self._capture_done = threading.Event()
+        self._workers_lock = threading.Lock()
+        self._workers_left = self.num_workers
+        self._threads = []
+
+        self._display_lock = threading.Lock()
+        self._display_cond = threading.Condition(self._display_lock)
+        self._display_frame = None
+        self._display_seq = 0
+
+    # ---------- lifecycle ----------
+    def start(self):
+        capture = threading.Thread(target=self._capture_loop, name="capture", daemon=True)
+        workers = [
+            threading.Thread(target=self._worker_loop, name=f"recognize-{i}", daemon=True)
+            for i in range(self.num_workers)
+        ]
+        self._sink_thread = threading.Thread(target=self._sink_loop, name="sink", daemon=True)
+        self._threads = [capture] + workers
+        for thread in self._threads + [self._sink_thread]:
+            thread.start()
+        logging.info(f"Recognition pipeline started with {self.num_workers} workers")
+
+    def stop(self):
+        """Stop capturing, let the sink drain pending results, then join all stages."""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._sink_thread.join()
+
+    def is_running(self):
+        return self._sink_thread.is_alive()
+
+    # ---------- stages ----------
+    def _capture_loop(self):
+        seq = 0
+        while not self._stop_event.is_set():
+            ret, frame = self.cap.read()
+            if not ret:
+                logging.warning("Failed to read frame from camera")
+                break
+            seq += 1
+            self.frame_queue.put((seq, frame))
+            self.stats["capture"].tick()
+        self._capture_done.set()
+
+    def _worker_loop(self):
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    seq, frame = self.frame_queue.get(timeout=0.1)
+                except queue.Empty:
+                    if self._capture_done.is_set() and self.frame_queue.qsize() == 0:
+                        break
+                    continue
+                try:
+                    results = self.process_frame(frame)
+                except Exception as e:
+                    logging.error(f"Recognition worker failed on frame {seq}: {str(e)}")
+                    continue
+                self.result_queue.put((seq, frame, results))
+                self.stats["recognize"].tick()
+        finally:
+            with self._workers_lock:
+                self._workers_left -= 1
+                last_worker = self._workers_left == 0
+            if last_worker:
+                self.result_queue.put(_STOP)
+
+    def _sink_loop(self):
+        while True:
+            item = self.result_queue.get()
+            if item is _STOP:
+                break
+            seq, frame, results = item
+            annotation = None
+            try:
+                annotation = self.handle_result(frame, results)
+            except Exception as e:
+                logging.error(f"Pipeline sink failed on frame {seq}: {str(e)}")
+            self.stats["sink"].tick()
+
+            # Workers finish out of order; never show an older frame after a newer one
+            with self._display_cond:
+                if seq > self._display_seq:
+                    self._display_seq = seq
+                    self._display_frame = (frame, annotation)
+                    self._display_cond.notify_all()
+
+        with self._display_cond:
+            self._display_cond.notify_all()
+
+    # ---------- consumers ----------
+    def get_display_frame(self, timeout=None):
+        """Return (frame, handle_result's return value) for the newest frame not yet
+        displayed, or None on timeout."""
+        with self._display_cond:
+            if self._display_frame is None:
+                self._display_cond.wait(timeout)
+            frame, self._display_frame = self._display_frame, None
+            return frame
+
+    def format_stats(self):
+        """One-line per-stage FPS and queue depth report."""
+        rates = " | ".join(f"{name} {stage.fps():.1f} fps" for name, stage in self.stats.items())
+        return (
+            f"{rates} | frame_q {self.frame_queue.qsize()}/{self.frame_queue.maxsize} "
+            f"(dropped {self.frame_queue.dropped}) | result_q {self.result_queue.qsize()}"
+        )
@@ -0,0 +1,294 @@
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import logging
+import argparse
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+
+# Ensure project root on sys.path when invoked directly
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.config import (
+    CAMERA_SOURCES, SERVICE_WORKERS, SERVICE_STATS_INTERVAL,
+    FACE_DETECTION_SCALE_FACTOR, FACE_DETECTION_MIN_NEIGHBORS, DETECTION_SCALE,
+    FACE_SIZE_WIDTH, FACE_SIZE_HEIGHT, RECOGNITION_SEARCH, CENTROID_TOP_K
+)
+from backend.detection import detect_faces_scaled, face_size_limits
+from backend.lbph_engine import LBPHEngine
+from backend.lbph_index import CentroidIndex
+
+# One recognition service for many cameras. The parent process loads the
+# model once, places the LBPH histogram matrix in shared memory and starts a
+# pool of worker processes that map it read-only. Capture threads keep only
+# the newest frame per camera; a round-robin scheduler gives every camera at
+# most one frame in flight, so a busy room cannot starve the others. Results
+# come back to a single sink thread that keeps per-room session state and
+# writes attendance and alerts.
+#
+#   python backend/recognition_service.py --sources cameras.json
+#
+# cameras.json: [{"source": 0, "room": "101", "session": "Morning"},
+#                {"source": "rtsp://cam-102/stream", "room": "102", "session": "Morning"}]
+
+# ---------- worker process side ----------
+_worker = {}
+
+def _init_worker(shm_name, shape, dtype, labels, params):
+    """Attach to the shared histogram matrix and build the per-process matchers."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    histograms = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    histograms.flags.writeable = False
+    engine = LBPHEngine(histograms, labels, **params)
+    _worker["shm"] = shm  # keep the mapping alive for the life of the process
+    _worker["engine"] = engine
+    _worker["index"] = CentroidIndex.build(engine, top_k=CENTROID_TOP_K) if RECOGNITION_SEARCH == "centroid" else None
+    _worker["cascade"] = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+
+def _recognize(gray):
+    """Detect and recognize faces in one grayscale frame; runs in a worker process."""
+    min_size, max_size = face_size_limits(gray.shape[1])
+    faces = detect_faces_scaled(
+        _worker["cascade"], gray, FACE_DETECTION_SCALE_FACTOR, FACE_DETECTION_MIN_NEIGHBORS,
+        detection_scale=DETECTION_SCALE, min_size=min_size, max_size=max_size,
+    )
+    if len(faces) == 0:
+        return []
+    crops = np.stack([
+        cv2.resize(gray[y:y+h, x:x+w], (FACE_SIZE_WIDTH, FACE_SIZE_HEIGHT)) for (x, y, w, h) in faces
+    ])
+    if _worker["index"] is not None:
+        predictions = _worker["index"].predict_batch(_worker["engine"], crops)
+    else:
+        predictions = _worker["engine"].predict_batch(crops)
+    return [
+        (int(x), int(y), int(w), int(h), label, confidence, f"{x}_{y}_{w}_{h}")
+        for (x, y, w, h), (label, confidence) in zip(faces, predictions)
+    ]
+
+# ---------- parent process side ----------
+class CameraStream:
+    """Capture thread for one source that keeps only its newest frame."""
+
+    def __init__(self, camera_id, source, room, session):
+        self.camera_id = camera_id
+        self.source = source
+        self.room = room
+        self.session = session
+        self.recognized_students = set()
+        self.unknown_faces = None  # UnknownFaceCache, created by the service in the parent
+        self.processed = 0
+        self.busy = False
+        self.finished = False
+        self._lock = threading.Lock()
+        self._frame = None
+        self._seq = 0
+        self._taken_seq = 0
+        self._thread = None
+
+    def start(self, stop_event):
+        self._thread = threading.Thread(target=self._run, args=(stop_event,),
+                                        name=f"camera-{self.room}", daemon=True)
+        self._thread.start()
+
+    def _run(self, stop_event):
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            logging.error(f"Room {self.room}: failed to open camera source {self.source}")
+            self.finished = True
+            return
+        logging.info(f"Room {self.room}: camera source {self.source} opened")
+
+        # Video files decode faster than real time; pace them to their frame rate
+        is_file = isinstance(self.source, str) and os.path.isfile(self.source)
+        frame_delay = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 25) if is_file else 0
+
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                logging.warning(f"Room {self.room}: failed to read frame")
+                break
+            with self._lock:
+                self._frame = frame
+                self._seq += 1
+            if frame_delay:
+                time.sleep(frame_delay)
+        cap.release()
+        self.finished = True
+
+    def take_frame(self):
+        """Newest frame not yet handed out, or None while one is still in flight.
+
+        busy and processed are shared by the scheduler and the sink thread,
+        so they only change under the camera's lock.
+        """
+        with self._lock:
+            if self.busy or self._frame is None or self._seq == self._taken_seq:
+                return None
+            self._taken_seq = self._seq
+            self.busy = True
+            return self._frame
+
+    def frame_done(self):
+        """Mark the in-flight frame as processed."""
+        with self._lock:
+            self.busy = False
+            self.processed += 1
+
+    def take_processed(self):
+        """Frames processed since the last call."""
+        with self._lock:
+            processed, self.processed = self.processed, 0
+            return processed
+
+
+class RecognitionService:
+    def __init__(self, sources, workers=None):
+        self.cameras = [
+            CameraStream(i, src["source"], src.get("room", str(i)), src["session"])
+            for i, src in enumerate(sources)
+        ]
+        self.num_workers = workers or SERVICE_WORKERS or os.cpu_count()
+        self.stop_event = threading.Event()
+        self.results = queue.Queue()
+        self._shm = None
+
+    def _share_model(self, engine):
+        """Copy the histogram matrix into shared memory once for all workers.
+
+        The matrix keeps its stored dtype, so a float16 or uint16 binary
+        model (see backend/lbph_binary.py) also halves the shared segment.
+        """
+        self._shm = shared_memory.SharedMemory(create=True, size=engine.histograms.nbytes)
+        shared = np.ndarray(engine.histograms.shape, dtype=engine.histograms.dtype, buffer=self._shm.buf)
+        shared[:] = engine.histograms
+        params = {
+            "radius": engine.radius, "neighbors": engine.neighbors,
+            "grid_x": engine.grid_x, "grid_y": engine.grid_y, "threshold": engine.threshold,
+            "scale": engine.scale,
+        }
+        logging.info(f"Shared model: {len(engine)} histograms, {engine.histograms.nbytes / 1e6:.1f} MB")
+        return (self._shm.name, engine.histograms.shape, engine.histograms.dtype.str,
+                np.asarray(engine.labels), params)
+
+    def run(self):
+        # Loaded here, in the parent only: importing face_recognition loads the model
+        from backend import face_recognition as fr
+
+        engine = fr.model.engine if fr.model.engine is not None else LBPHEngine.from_recognizer(fr.model.recognizer)
+        init_args = self._share_model(engine)
+        context = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=self.num_workers, mp_context=context,
+                                   initializer=_init_worker, initargs=init_args)
+
+        for camera in self.cameras:
+            camera.unknown_faces = fr.create_unknown_face_cache()
+        sink = threading.Thread(target=self._sink_loop, args=(fr,), name="service-sink", daemon=True)
+        sink.start()
+        for camera in self.cameras:
+            camera.start(self.stop_event)
+        fr.attendance_writer.start()
+        fr.alert_writer.start()
+        logging.info(f"Recognition service started: {len(self.cameras)} cameras, {self.num_workers} workers")
+        print(f" Recognition service running for {len(self.cameras)} cameras with {self.num_workers} workers")
+
+        try:
+            self._schedule(pool)
+        finally:
+            self.stop_event.set()
+            pool.shutdown(wait=True)
+            self.results.put(None)
+            sink.join()
+            fr.attendance_writer.stop()
+            for camera in self.cameras:
+                camera.unknown_faces.close()
+            fr.alert_writer.stop()
+            self._shm.close()
+            self._shm.unlink()
+            logging.info("Recognition service stopped")
+
+    def _schedule(self, pool):
+        """Round-robin over cameras, at most one frame in flight per camera."""
+        next_camera = 0
+        last_report = time.time()
+        while not self.stop_event.is_set():
+            if all(camera.finished and not camera.busy for camera in self.cameras):
+                break
+            submitted = False
+            for offset in range(len(self.cameras)):
+                camera = self.cameras[(next_camera + offset) % len(self.cameras)]
+                frame = camera.take_frame()
+                if frame is None:
+                    continue
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                future = pool.submit(_recognize, gray)
+                future.add_done_callback(
+                    lambda f, camera=camera, frame=frame: self.results.put((camera, frame, f))
+                )
+                next_camera = (next_camera + offset + 1) % len(self.cameras)
+                submitted = True
+            if not submitted:
+                time.sleep(0.005)
+
+            if time.time() - last_report >= SERVICE_STATS_INTERVAL:
+                elapsed = time.time() - last_report
+                report = " | ".join(
+                    f"{camera.room} {camera.take_processed() / elapsed:.1f} fps" for camera in self.cameras
+                )
+                logging.info(f"Service stats: {report}")
+                print(f"📊 {report}")
+                last_report = time.time()
+
+    def _sink_loop(self, fr):
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            camera, frame, future = item
+            camera.frame_done()
+            try:
+                results = future.result()
+            except Exception as e:
+                logging.error(f"Room {camera.room}: recognition failed: {str(e)}")
+                continue
+            fr.handle_results(frame, results, camera.session,
+                              camera.recognized_students, camera.unknown_faces)
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+
+def load_sources(path=None):
+    if path is None:
+        return CAMERA_SOURCES
+    with open(path) as f:
+        sources = json.load(f)
+    # Numeric strings are device indices
+    for src in sources:
+        if isinstance(src["source"], str) and src["source"].isdigit():
+            src["source"] = int(src["source"])
+    return sources
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-camera face recognition service")
+    parser.add_argument("--sources", help="JSON file with camera sources (default: CAMERA_SOURCES in config)")
+    parser.add_argument("--workers", type=int, default=None, help="Recognition worker processes")
+    args = parser.parse_args()
+
+    service = RecognitionService(load_sources(args.sources), workers=args.workers)
+    signal.signal(signal.SIGTERM, service.stop)
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        service.stop()
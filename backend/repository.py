@@ -0,0 +1,830 @@
+import os
+import logging
+import threading
+from datetime import datetime
+
+from backend.config import (
+    ALLOW_DUPLICATE_ATTENDANCE, STORAGE_BACKEND, DATABASE_URL,
+    DB_POOL_SIZE, DB_BUSY_TIMEOUT, EXPORT_FETCH_SIZE, ATTENDANCE_STATUS_ABSENT
+)
+from backend.database import DB_NAME, connection, get_connection
+from backend.migrations import migrate, summary_runner, archive_duplicates, DuplicateAttendanceError
+from backend import summaries
+
+# Storage operations for students, attendance and unknown-face alerts.
+#
+# Everything that reads or writes these tables goes through a Repository, so
+# the recognizer, the attendance writer and the dashboard do not care whether
+# the data lives in the local SQLite file or on a database server shared by
+# several recognition nodes. get_repository() returns the process-wide
+# instance selected by STORAGE_BACKEND / DATABASE_URL in config.
+#
+# Attendance records are tuples in ATTENDANCE_FIELDS order.
+
+ATTENDANCE_FIELDS = ("student_id", "student_name", "status", "timestamp", "date", "session")
+EXPORT_COLUMNS = ["id", "student_id", "student_name", "status", "timestamp", "date", "session"]
+
+
+class Repository:
+    """Interface shared by the storage backends."""
+
+    def migrate(self):
+        """Create or upgrade the schema; safe to call on every startup."""
+        raise NotImplementedError
+
+    def archive_duplicate_attendance(self):
+        """Move all but the first record of each (student_id, date, session) to
+        attendance_duplicates; returns the number of rows moved."""
+        raise NotImplementedError
+
+    def change_token(self):
+        """Cheap value that changes when data may have changed, or None if unknown."""
+        return None
+
+    # ---------- students ----------
+    def students_token(self):
+        """Cheap value that changes when students are added or removed, or None if unknown."""
+        return None
+
+    def list_students(self):
+        """[(id, name, roll_no)] for every student."""
+        raise NotImplementedError
+
+    def add_student(self, name, roll_no, photo_path=None):
+        """Insert a student unless the roll number exists; returns (id, created)."""
+        raise NotImplementedError
+
+    def search_students(self, query):
+        """[(name, roll_no)] whose name or roll number contains query."""
+        raise NotImplementedError
+
+    # ---------- attendance ----------
+    def add_attendance(self, records):
+        """Insert attendance records in one transaction; returns the records actually stored.
+
+        Records that would duplicate (student_id, date, session) are skipped
+        when ALLOW_DUPLICATE_ATTENDANCE is False.
+        """
+        raise NotImplementedError
+
+    def mark_student_attendance(self, student_id, status, timestamp, date, session):
+        """Insert one record for a student id, looking up the name; returns True if stored."""
+        raise NotImplementedError
+
+    def attendance_for_date(self, date, limit=None):
+        """Newest-first list of attendance dicts for one day."""
+        raise NotImplementedError
+
+    def attendance_report(self, date):
+        """[(id, name, roll_no, date, time, status, session)] joined with students."""
+        raise NotImplementedError
+
+    def attendance_since(self, last_id):
+        """Attendance dicts with id > last_id, oldest first."""
+        raise NotImplementedError
+
+    def max_attendance_id(self):
+        raise NotImplementedError
+
+    def iter_attendance(self, fetch_size=EXPORT_FETCH_SIZE, start_date=None, end_date=None,
+                        session=None, student_id=None):
+        """Yield lists of at most fetch_size rows (EXPORT_COLUMNS order), optionally filtered."""
+        raise NotImplementedError
+
+    # ---------- summaries ----------
+    def close_session(self, date, session, timestamp):
+        """Mark every student without a record in (date, session) Absent; returns rows added."""
+        raise NotImplementedError
+
+    def session_summary(self, date):
+        """Per-session present / late / absent student counts for one day."""
+        raise NotImplementedError
+
+    def student_summary(self, date, session=None):
+        """Per-student summary rows (with derived status) for one day."""
+        raise NotImplementedError
+
+    # ---------- unknown-face alerts ----------
+    def add_alerts(self, records, updates=()):
+        """Insert (alert_key, image_path, detected_time) records and apply
+        (alert_key, image_path, sighting_count, last_seen) updates in one
+        transaction; None in an update leaves that column unchanged."""
+        raise NotImplementedError
+
+    def unresolved_alerts(self, limit=None, before=None):
+        """Newest-first list of unresolved alert dicts.
+
+        before is the (detected_time, id) of the last alert on the previous
+        page; pages are read with an index range scan instead of OFFSET.
+        """
+        raise NotImplementedError
+
+    def alert_count(self):
+        raise NotImplementedError
+
+    def resolve_alert(self, alert_id, resolved):
+        """Set resolved (1 = approved, 2 = threat) on one alert."""
+        raise NotImplementedError
+
+    def approve_alert(self, alert_id, name, roll_no, timestamp, date, session):
+        """Add the student, mark them present and resolve the alert atomically; returns the student id."""
+        raise NotImplementedError
+
+
+def _filters(start_date, end_date, session, student_id):
+    """(column, operator, value) triples for the export filters that are set."""
+    filters = []
+    if start_date:
+        filters.append(("date", ">=", start_date))
+    if end_date:
+        filters.append(("date", "<=", end_date))
+    if session:
+        filters.append(("session", "=", session))
+    if student_id is not None:
+        filters.append(("student_id", "=", student_id))
+    return filters
+
+
+def _attendance_dict(row):
+    row_id, student_id, student_name, status, timestamp, session = row
+    return {"id": row_id, "student_id": student_id, "student_name": student_name,
+            "status": status, "timestamp": timestamp, "session": session}
+
+
+def _session_summary_dict(row):
+    date, session, present, late, absent, students = row
+    return {"date": date, "session": session, "present": present, "late": late,
+            "absent": absent, "students": students}
+
+
+def _student_summary_dict(row):
+    date, session, student_id, student_name, present, late, absent, first_seen = row
+    return {"date": date, "session": session, "student_id": student_id, "student_name": student_name,
+            "present": present, "late": late, "absent": absent, "first_seen": first_seen,
+            "status": summaries.student_status(present, late, absent)}
+
+
+SESSION_SUMMARY_SQL = """
+    SELECT date, session, present, late, absent, students
+    FROM attendance_session_summary
+    WHERE date = :date
+    ORDER BY session
+"""
+
+STUDENT_SUMMARY_SQL = """
+    SELECT date, session, student_id, student_name, present, late, absent, first_seen
+    FROM attendance_student_summary
+    WHERE date = :date {session_filter}
+    ORDER BY session, student_name
+"""
+
+
+def _student_summary_query(date, session):
+    if session is None:
+        return STUDENT_SUMMARY_SQL.format(session_filter=""), {"date": date}
+    return STUDENT_SUMMARY_SQL.format(session_filter="AND session = :session"), {"date": date, "session": session}
+
+
+def _alert_dict(row):
+    alert_id, image_path, detected_time, resolved, sighting_count, last_seen = row
+    return {"id": alert_id, "image_path": image_path, "detected_time": detected_time, "resolved": resolved,
+            "sighting_count": sighting_count, "last_seen": last_seen or detected_time}
+
+
+class SQLiteRepository(Repository):
+    """Local SQLite file, accessed through the shared connection pool."""
+
+    def __init__(self, db_name=DB_NAME):
+        self.db_name = db_name
+
+    def migrate(self):
+        conn = get_connection(self.db_name)
+        try:
+            return migrate(conn)
+        finally:
+            conn.close()
+
+    def archive_duplicate_attendance(self):
+        with connection(self.db_name) as conn:
+            cursor = conn.cursor()
+            moved = archive_duplicates(cursor)
+            if moved:
+                summaries.rebuild(summary_runner(cursor))
+        return moved
+
+    def change_token(self):
+        # Commits from any process touch the database file or its WAL
+        mtimes = []
+        for path in (self.db_name, self.db_name + "-wal"):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                pass
+        return max(mtimes) if mtimes else None
+
+    # ---------- students ----------
+    def students_token(self):
+        # Students are only ever inserted; attendance commits leave this unchanged
+        with connection(self.db_name) as conn:
+            return conn.execute("SELECT COUNT(*), MAX(id) FROM students").fetchone()
+
+    def list_students(self):
+        with connection(self.db_name) as conn:
+            return conn.execute("SELECT id, name, roll_no FROM students").fetchall()
+
+    def add_student(self, name, roll_no, photo_path=None):
+        with connection(self.db_name) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM students WHERE roll_no = ?", (roll_no,))
+            row = cursor.fetchone()
+            if row:
+                return row[0], False
+            cursor.execute("""
+                INSERT INTO students (name, roll_no, photo_path)
+                VALUES (?, ?, ?)
+            """, (name, roll_no, photo_path))
+            return cursor.lastrowid, True
+
+    def search_students(self, query):
+        with connection(self.db_name) as conn:
+            return conn.execute("""
+                SELECT name, roll_no
+                FROM students
+                WHERE name LIKE ? OR roll_no LIKE ?
+                ORDER BY name ASC
+            """, (f"%{query}%", f"%{query}%")).fetchall()
+
+    # ---------- attendance ----------
+    def add_attendance(self, records):
+        # OR IGNORE: the unique (student_id, date, session) index rejects duplicates
+        stored = []
+        with connection(self.db_name) as conn:
+            cursor = conn.cursor()
+            for record in records:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO attendance (student_id, student_name, status, timestamp, date, session)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, record)
+                if cursor.rowcount:
+                    stored.append(record)
+            summaries.refresh(summary_runner(cursor), summaries.student_keys(stored))
+        return stored
+
+
+    def mark_student_attendance(self, student_id, status, timestamp, date, session):
+        with connection(self.db_name) as conn:
+            cursor = conn.execute("""
+                INSERT OR IGNORE INTO attendance (student_id, student_name, status, timestamp, date, session)
+                SELECT id, name, ?, ?, ?, ? FROM students WHERE id = ?
+            """, (status, timestamp, date, session, student_id))
+            if not cursor.rowcount:
+                return False
+            summaries.refresh(summary_runner(cursor), [{"date": date, "session": session, "student_id": student_id}])
+            return True
+
+    def attendance_for_date(self, date, limit=None):
+        sql = """
+            SELECT id, student_id, student_name, status, timestamp, session
+            FROM attendance
+            WHERE date = ?
+            ORDER BY timestamp DESC
+        """
+        params = (date,)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        with connection(self.db_name) as conn:
+            return [_attendance_dict(row) for row in conn.execute(sql, params).fetchall()]
+
+    def attendance_report(self, date):
+        with connection(self.db_name) as conn:
+            return conn.execute("""
+                SELECT a.id, s.name, s.roll_no, a.date, substr(a.timestamp, 12), a.status, a.session
+                FROM attendance a
+                JOIN students s ON a.student_id = s.id
+                WHERE a.date = ?
+            """, (date,)).fetchall()
+
+    def attendance_since(self, last_id):
+        with connection(self.db_name) as conn:
+            rows = conn.execute("""
+                SELECT id, student_id, student_name, status, timestamp, session
+                FROM attendance
+                WHERE id > ?
+                ORDER BY id
+            """, (last_id,)).fetchall()
+        return [_attendance_dict(row) for row in rows]
+
+    def max_attendance_id(self):
+        with connection(self.db_name) as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM attendance").fetchone()[0]
+
+    def iter_attendance(self, fetch_size=EXPORT_FETCH_SIZE, start_date=None, end_date=None,
+                        session=None, student_id=None):
+        filters = _filters(start_date, end_date, session, student_id)
+        sql = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM attendance"
+        if filters:
+            sql += " WHERE " + " AND ".join(f"{column} {op} ?" for column, op, _ in filters)
+        sql += " ORDER BY date, id"
+        with connection(self.db_name) as conn:
+            cursor = conn.execute(sql, [value for _, _, value in filters])
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield rows
+
+    # ---------- summaries ----------
+    def close_session(self, date, session, timestamp):
+        with connection(self.db_name) as conn:
+            cursor = conn.cursor()
+            cursor.execute(summaries.CLOSE_SESSION, {
+                "status": ATTENDANCE_STATUS_ABSENT, "timestamp": timestamp, "date": date, "session": session,
+            })
+            added = cursor.rowcount
+            summaries.refresh_session(summary_runner(cursor), date, session)
+        return added
+
+    def session_summary(self, date):
+        with connection(self.db_name) as conn:
+            rows = conn.execute(SESSION_SUMMARY_SQL, {"date": date}).fetchall()
+        return [_session_summary_dict(row) for row in rows]
+
+    def student_summary(self, date, session=None):
+        with connection(self.db_name) as conn:
+            rows = conn.execute(*_student_summary_query(date, session)).fetchall()
+        return [_student_summary_dict(row) for row in rows]
+
+    # ---------- unknown-face alerts ----------
+    def add_alerts(self, records, updates=()):
+        with connection(self.db_name) as conn:
+            conn.executemany("""
+                INSERT INTO unverified_faces (alert_key, image_path, detected_time, resolved, last_seen)
+                VALUES (?, ?, ?, 0, ?)
+            """, [(key, image_path, detected_time, detected_time) for key, image_path, detected_time in records])
+            conn.executemany("""
+                UPDATE unverified_faces
+                SET image_path = COALESCE(?, image_path),
+                    sighting_count = COALESCE(?, sighting_count),
+                    last_seen = COALESCE(?, last_seen)
+                WHERE alert_key = ?
+            """, [(image_path, count, last_seen, key) for key, image_path, count, last_seen in updates])
+
+    def unresolved_alerts(self, limit=None, before=None):
+        sql = """
+            SELECT id, image_path, detected_time, resolved, sighting_count, last_seen
+            FROM unverified_faces
+            WHERE resolved = 0
+        """
+        params = ()
+        if before is not None:
+            sql += " AND (detected_time < ? OR (detected_time = ? AND id < ?))"
+            params += (before[0], before[0], before[1])
+        sql += " ORDER BY detected_time DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        with connection(self.db_name) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [_alert_dict(row) for row in rows]
+
+    def alert_count(self):
+        with connection(self.db_name) as conn:
+            return conn.execute("SELECT COUNT(*) FROM unverified_faces WHERE resolved = 0").fetchone()[0]
+
+    def resolve_alert(self, alert_id, resolved):
+        with connection(self.db_name) as conn:
+            conn.execute("UPDATE unverified_faces SET resolved = ? WHERE id = ?", (resolved, alert_id))
+
+    def approve_alert(self, alert_id, name, roll_no, timestamp, date, session):
+        with connection(self.db_name) as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO students (name, roll_no) VALUES (?, ?)", (name, roll_no))
+            student_id = cursor.lastrowid
+            cursor.execute("""
+                INSERT OR IGNORE INTO attendance (student_id, student_name, status, timestamp, date, session)
+                VALUES (?, ?, 'Present', ?, ?, ?)
+            """, (student_id, name, timestamp, date, session))
+            cursor.execute("UPDATE unverified_faces SET resolved = 1 WHERE id = ?", (alert_id,))
+            summaries.refresh(summary_runner(cursor), [{"date": date, "session": session, "student_id": student_id}])
+            return student_id
+
+
+class SQLAlchemyRepository(Repository):
+    """Server database (MySQL, PostgreSQL, ...) through a pooled SQLAlchemy engine.
+
+    Lets several recognition nodes feed one dashboard. The schema is defined
+    with SQLAlchemy Core and mirrors backend/migrations.py. Attendance and
+    alerts are written with executemany bulk inserts; duplicates are filtered
+    with one lookup per batch, so no dialect-specific upsert is needed. A
+    sqlite:/// URL works as a local stand-in for testing.
+    """
+
+    def __init__(self, url, pool_size=DB_POOL_SIZE):
+        import sqlalchemy as sa
+
+        self.sa = sa
+        options = {"pool_pre_ping": True, "future": True}
+        if url.startswith("sqlite"):
+            options["connect_args"] = {"timeout": DB_BUSY_TIMEOUT}
+        else:
+            options.update(pool_size=pool_size, max_overflow=pool_size, pool_recycle=3600)
+        self.engine = sa.create_engine(url, **options)
+        self.url = url
+
+        self.metadata = sa.MetaData()
+        self.students = sa.Table(
+            "students", self.metadata,
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("name", sa.String(255), nullable=False),
+            sa.Column("roll_no", sa.String(64), unique=True, nullable=False),
+            sa.Column("photo_path", sa.String(512)),
+        )
+        self.attendance = sa.Table(
+            "attendance", self.metadata,
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("student_id", sa.Integer, sa.ForeignKey("students.id")),
+            sa.Column("student_name", sa.String(255)),
+            sa.Column("status", sa.String(32)),
+            sa.Column("timestamp", sa.String(19)),
+            sa.Column("date", sa.String(10), nullable=False),
+            sa.Column("session", sa.String(32)),
+            sa.Index("idx_attendance_date_session", "date", "session"),
+            sa.Index("idx_attendance_student_date", "student_id", "date"),
+        )
+        self.unverified_faces = sa.Table(
+            "unverified_faces", self.metadata,
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("image_path", sa.String(512)),
+            sa.Column("detected_time", sa.String(19)),
+            sa.Column("resolved", sa.Integer, default=0),
+            sa.Column("sighting_count", sa.Integer, nullable=False, default=1, server_default="1"),
+            sa.Column("last_seen", sa.String(19)),
+            sa.Column("alert_key", sa.String(64)),
+            sa.Index("idx_unverified_resolved_time", "resolved", "detected_time"),
+            sa.Index("uq_unverified_alert_key", "alert_key", unique=True),
+        )
+        # Summary tables maintained through backend/summaries.py
+        sa.Table(
+            "session_schedule", self.metadata,
+            sa.Column("session", sa.String(32), primary_key=True),
+            sa.Column("late_after", sa.String(8), nullable=False),
+        )
+        sa.Table(
+            "attendance_student_summary", self.metadata,
+            sa.Column("date", sa.String(10), primary_key=True),
+            sa.Column("session", sa.String(32), primary_key=True),
+            sa.Column("student_id", sa.Integer, primary_key=True, autoincrement=False),
+            sa.Column("student_name", sa.String(255)),
+            sa.Column("present", sa.Integer, nullable=False, default=0),
+            sa.Column("late", sa.Integer, nullable=False, default=0),
+            sa.Column("absent", sa.Integer, nullable=False, default=0),
+            sa.Column("first_seen", sa.String(19)),
+        )
+        sa.Table(
+            "attendance_session_summary", self.metadata,
+            sa.Column("date", sa.String(10), primary_key=True),
+            sa.Column("session", sa.String(32), primary_key=True),
+            sa.Column("present", sa.Integer, nullable=False, default=0),
+            sa.Column("late", sa.Integer, nullable=False, default=0),
+            sa.Column("absent", sa.Integer, nullable=False, default=0),
+            sa.Column("students", sa.Integer, nullable=False, default=0),
+        )
+        # Rows moved aside by archive_duplicate_attendance(); never deleted
+        self.attendance_duplicates = sa.Table(
+            "attendance_duplicates", self.metadata,
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+            sa.Column("student_id", sa.Integer),
+            sa.Column("student_name", sa.String(255)),
+            sa.Column("status", sa.String(32)),
+            sa.Column("timestamp", sa.String(19)),
+            sa.Column("date", sa.String(10)),
+            sa.Column("session", sa.String(32)),
+            sa.Column("archived_at", sa.String(19), nullable=False),
+        )
+        self.unique_attendance = sa.Index(
+            "uq_attendance_student_date_session",
+            self.attendance.c.student_id, self.attendance.c.date, self.attendance.c.session,
+            unique=True,
+        )
+        # Not part of metadata: created or dropped by migrate() per ALLOW_DUPLICATE_ATTENDANCE
+        self.attendance.indexes.discard(self.unique_attendance)
+
+    def _runner(self, conn):
+        """Adapter for backend.summaries (lists of params run as executemany)."""
+        return lambda sql, params: conn.execute(self.sa.text(sql), params)
+
+    def _duplicate_count(self, conn):
+        return conn.execute(self.sa.text("""
+            SELECT COALESCE(SUM(n - 1), 0)
+            FROM (SELECT COUNT(*) AS n FROM attendance GROUP BY student_id, date, session) AS groups
+        """)).scalar()
+
+    def _archive_duplicates(self, conn):
+        # Derived table so MySQL accepts a subquery on the table being changed
+        keep = """
+            id NOT IN (
+                SELECT id FROM (
+                    SELECT MIN(id) AS id FROM attendance GROUP BY student_id, date, session
+                ) AS keep
+            )
+        """
+        result = conn.execute(self.sa.text(f"""
+            INSERT INTO attendance_duplicates (id, student_id, student_name, status, timestamp, date, session, archived_at)
+            SELECT id, student_id, student_name, status, timestamp, date, session, :now
+            FROM attendance WHERE {keep}
+        """), {"now": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+        conn.execute(self.sa.text(f"DELETE FROM attendance WHERE {keep}"))
+        return result.rowcount
+
+    def archive_duplicate_attendance(self):
+        with self.engine.begin() as conn:
+            moved = self._archive_duplicates(conn)
+            if moved:
+                summaries.rebuild(self._runner(conn))
+        return moved
+
+    def migrate(self):
+        sa = self.sa
+        inspector = sa.inspect(self.engine)
+        rebuild = not inspector.has_table("attendance_student_summary")
+        first_archive = not inspector.has_table("attendance_duplicates")
+        self.metadata.create_all(self.engine)
+        with self.engine.begin() as conn:
+            # Columns added after the table was first created
+            columns = {column["name"] for column in sa.inspect(conn).get_columns("unverified_faces")}
+            if "sighting_count" not in columns:
+                conn.execute(sa.text("ALTER TABLE unverified_faces ADD COLUMN sighting_count INTEGER NOT NULL DEFAULT 1"))
+            if "last_seen" not in columns:
+                conn.execute(sa.text("ALTER TABLE unverified_faces ADD COLUMN last_seen VARCHAR(19)"))
+            if "alert_key" not in columns:
+                conn.execute(sa.text("ALTER TABLE unverified_faces ADD COLUMN alert_key VARCHAR(64)"))
+            alert_indexes = {index["name"] for index in sa.inspect(conn).get_indexes("unverified_faces")}
+            for index in self.unverified_faces.indexes:
+                if index.name not in alert_indexes:
+                    index.create(conn)
+
+            existing = {index["name"] for index in sa.inspect(conn).get_indexes("attendance")}
+            if ALLOW_DUPLICATE_ATTENDANCE:
+                if self.unique_attendance.name in existing:
+                    self.unique_attendance.drop(conn)
+            elif self.unique_attendance.name not in existing:
+                # Same rule as backend/migrations.py: duplicates are archived once
+                # when the archive table is introduced, afterwards only reported
+                duplicates = self._duplicate_count(conn)
+                if duplicates and first_archive:
+                    moved = self._archive_duplicates(conn)
+                    logging.warning(f"Moved {moved} duplicate attendance rows to attendance_duplicates")
+                    rebuild = True
+                elif duplicates:
+                    raise DuplicateAttendanceError(
+                        f"{duplicates} duplicate attendance rows exist but ALLOW_DUPLICATE_ATTENDANCE is False; "
+                        "run `python backend/migrations.py --archive-duplicates` or allow duplicates"
+                    )
+                self.unique_attendance.create(conn)
+
+            # Late cutoffs from config; a changed schedule invalidates every summary
+            cutoffs = summaries.late_cutoffs()
+            current = dict(tuple(row) for row in conn.execute(sa.text("SELECT session, late_after FROM session_schedule")))
+            if current != cutoffs:
+                conn.execute(sa.text("DELETE FROM session_schedule"))
+                conn.execute(sa.text("INSERT INTO session_schedule (session, late_after) VALUES (:session, :late_after)"),
+                             [{"session": session, "late_after": late_after} for session, late_after in cutoffs.items()])
+                rebuild = True
+            if rebuild:
+                summaries.rebuild(self._runner(conn))
+        logging.info(f"Database schema ready at {self.engine.url.render_as_string(hide_password=True)}")
+
+    # ---------- students ----------
+    def students_token(self):
+        s = self.students
+        with self.engine.connect() as conn:
+            return tuple(conn.execute(self.sa.select(self.sa.func.count(), self.sa.func.max(s.c.id))).one())
+
+    def list_students(self):
+        s = self.students
+        with self.engine.connect() as conn:
+            return [tuple(row) for row in conn.execute(self.sa.select(s.c.id, s.c.name, s.c.roll_no))]
+
+    def add_student(self, name, roll_no, photo_path=None):
+        s = self.students
+        with self.engine.begin() as conn:
+            row = conn.execute(self.sa.select(s.c.id).where(s.c.roll_no == roll_no)).first()
+            if row:
+                return row[0], False
+            result = conn.execute(s.insert().values(name=name, roll_no=roll_no, photo_path=photo_path))
+            return result.inserted_primary_key[0], True
+
+    def search_students(self, query):
+        s = self.students
+        pattern = f"%{query}%"
+        statement = (
+            self.sa.select(s.c.name, s.c.roll_no)
+            .where(self.sa.or_(s.c.name.like(pattern), s.c.roll_no.like(pattern)))
+            .order_by(s.c.name)
+        )
+        with self.engine.connect() as conn:
+            return [tuple(row) for row in conn.execute(statement)]
+
+    # ---------- attendance ----------
+    def _new_records(self, conn, records):
+        """Drop records whose (student_id, date, session) already exists or repeats in the batch."""
+        a = self.attendance
+        keys = {(r[0], r[4], r[5]) for r in records}
+        existing = set(
+            tuple(row) for row in conn.execute(
+                self.sa.select(a.c.student_id, a.c.date, a.c.session).where(
+                    a.c.student_id.in_({k[0] for k in keys}), a.c.date.in_({k[1] for k in keys})
+                )
+            )
+        )
+        fresh = []
+        for record in records:
+            key = (record[0], record[4], record[5])
+            if key not in existing:
+                existing.add(key)
+                fresh.append(record)
+        return fresh
+
+    def add_attendance(self, records):
+        sa = self.sa
+        if not records:
+            return []
+        try:
+            with self.engine.begin() as conn:
+                fresh = records if ALLOW_DUPLICATE_ATTENDANCE else self._new_records(conn, records)
+                if fresh:
+                    conn.execute(self.attendance.insert(), [dict(zip(ATTENDANCE_FIELDS, r)) for r in fresh])
+                    summaries.refresh(self._runner(conn), summaries.student_keys(fresh))
+                return fresh
+        except sa.exc.IntegrityError:
+            # Another node stored one of these between our lookup and insert;
+            # fall back to row-by-row inserts so the rest of the batch survives
+            stored = []
+            with self.engine.begin() as conn:
+                for record in records:
+                    try:
+                        with conn.begin_nested():
+                            conn.execute(self.attendance.insert().values(**dict(zip(ATTENDANCE_FIELDS, record))))
+                        stored.append(record)
+                    except sa.exc.IntegrityError:
+                        pass
+                summaries.refresh(self._runner(conn), summaries.student_keys(stored))
+            return stored
+
+    def mark_student_attendance(self, student_id, status, timestamp, date, session):
+        s = self.students
+        with self.engine.connect() as conn:
+            row = conn.execute(self.sa.select(s.c.name).where(s.c.id == student_id)).first()
+        if row is None:
+            return False
+        return bool(self.add_attendance([(student_id, row[0], status, timestamp, date, session)]))
+
+    def _attendance_columns(self):
+        a = self.attendance
+        return (a.c.id, a.c.student_id, a.c.student_name, a.c.status, a.c.timestamp, a.c.session)
+
+    def attendance_for_date(self, date, limit=None):
+        a = self.attendance
+        statement = self.sa.select(*self._attendance_columns()).where(a.c.date == date).order_by(a.c.timestamp.desc())
+        if limit is not None:
+            statement = statement.limit(limit)
+        with self.engine.connect() as conn:
+            return [_attendance_dict(row) for row in conn.execute(statement)]
+
+    def attendance_report(self, date):
+        sa, a, s = self.sa, self.attendance, self.students
+        statement = (
+            sa.select(a.c.id, s.c.name, s.c.roll_no, a.c.date, sa.func.substr(a.c.timestamp, 12),
+                      a.c.status, a.c.session)
+            .select_from(a.join(s, a.c.student_id == s.c.id))
+            .where(a.c.date == date)
+        )
+        with self.engine.connect() as conn:
+            return [tuple(row) for row in conn.execute(statement)]
+
+    def attendance_since(self, last_id):
+        a = self.attendance
+        statement = self.sa.select(*self._attendance_columns()).where(a.c.id > last_id).order_by(a.c.id)
+        with self.engine.connect() as conn:
+            return [_attendance_dict(row) for row in conn.execute(statement)]
+
+    def max_attendance_id(self):
+        with self.engine.connect() as conn:
+            return conn.execute(self.sa.select(self.sa.func.coalesce(self.sa.func.max(self.attendance.c.id), 0))).scalar()
+
+    def iter_attendance(self, fetch_size=EXPORT_FETCH_SIZE, start_date=None, end_date=None,
+                        session=None, student_id=None):
+        a = self.attendance
+        operators = {">=": lambda c, v: c >= v, "<=": lambda c, v: c <= v, "=": lambda c, v: c == v}
+        statement = self.sa.select(*[a.c[name] for name in EXPORT_COLUMNS])
+        for column, op, value in _filters(start_date, end_date, session, student_id):
+            statement = statement.where(operators[op](a.c[column], value))
+        statement = statement.order_by(a.c.date, a.c.id)
+        # stream_results uses a server-side cursor where the driver supports one
+        with self.engine.connect().execution_options(stream_results=True, yield_per=fetch_size) as conn:
+            for partition in conn.execute(statement).partitions(fetch_size):
+                yield [tuple(row) for row in partition]
+
+    # ---------- summaries ----------
+    def close_session(self, date, session, timestamp):
+        with self.engine.begin() as conn:
+            result = conn.execute(self.sa.text(summaries.CLOSE_SESSION), {
+                "status": ATTENDANCE_STATUS_ABSENT, "timestamp": timestamp, "date": date, "session": session,
+            })
+            summaries.refresh_session(self._runner(conn), date, session)
+        return result.rowcount
+
+    def session_summary(self, date):
+        with self.engine.connect() as conn:
+            rows = conn.execute(self.sa.text(SESSION_SUMMARY_SQL), {"date": date})
+            return [_session_summary_dict(tuple(row)) for row in rows]
+
+    def student_summary(self, date, session=None):
+        sql, params = _student_summary_query(date, session)
+        with self.engine.connect() as conn:
+            return [_student_summary_dict(tuple(row)) for row in conn.execute(self.sa.text(sql), params)]
+
+    # ---------- unknown-face alerts ----------
+    def add_alerts(self, records, updates=()):
+        if not records and not updates:
+            return
+        sa, u = self.sa, self.unverified_faces
+        with self.engine.begin() as conn:
+            if records:
+                conn.execute(u.insert(), [
+                    {"alert_key": key, "image_path": image_path, "detected_time": detected_time,
+                     "resolved": 0, "last_seen": detected_time}
+                    for key, image_path, detected_time in records
+                ])
+            if updates:
+                conn.execute(
+                    u.update().where(u.c.alert_key == sa.bindparam("key")).values(
+                        image_path=sa.func.coalesce(sa.bindparam("path"), u.c.image_path),
+                        sighting_count=sa.func.coalesce(sa.bindparam("count"), u.c.sighting_count),
+                        last_seen=sa.func.coalesce(sa.bindparam("seen"), u.c.last_seen),
+                    ),
+                    [{"key": key, "path": image_path, "count": count, "seen": last_seen}
+                     for key, image_path, count, last_seen in updates],
+                )
+
+    def unresolved_alerts(self, limit=None, before=None):
+        sa, u = self.sa, self.unverified_faces
+        statement = (
+            sa.select(u.c.id, u.c.image_path, u.c.detected_time, u.c.resolved, u.c.sighting_count, u.c.last_seen)
+            .where(u.c.resolved == 0).order_by(u.c.detected_time.desc(), u.c.id.desc())
+        )
+        if before is not None:
+            statement = statement.where(sa.or_(
+                u.c.detected_time < before[0],
+                sa.and_(u.c.detected_time == before[0], u.c.id < before[1]),
+            ))
+        if limit is not None:
+            statement = statement.limit(limit)
+        with self.engine.connect() as conn:
+            return [_alert_dict(row) for row in conn.execute(statement)]
+
+    def alert_count(self):
+        u = self.unverified_faces
+        with self.engine.connect() as conn:
+            return conn.execute(self.sa.select(self.sa.func.count()).select_from(u).where(u.c.resolved == 0)).scalar()
+
+    def resolve_alert(self, alert_id, resolved):
+        u = self.unverified_faces
+        with self.engine.begin() as conn:
+            conn.execute(u.update().where(u.c.id == alert_id).values(resolved=resolved))
+
+    def approve_alert(self, alert_id, name, roll_no, timestamp, date, session):
+        u = self.unverified_faces
+        with self.engine.begin() as conn:
+            result = conn.execute(self.students.insert().values(name=name, roll_no=roll_no))
+            student_id = result.inserted_primary_key[0]
+            conn.execute(self.attendance.insert().values(
+                student_id=student_id, student_name=name, status="Present",
+                timestamp=timestamp, date=date, session=session,
+            ))
+            conn.execute(u.update().where(u.c.id == alert_id).values(resolved=1))
+            summaries.refresh(self._runner(conn), [{"date": date, "session": session, "student_id": student_id}])
+        return student_id
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+def create_repository(backend=STORAGE_BACKEND, url=DATABASE_URL):
+    """Build a repository for "sqlite" (the local file) or "sqlalchemy" (url)."""
+    if backend == "sqlite":
+        return SQLiteRepository()
+    if backend == "sqlalchemy":
+        if not url:
+            raise ValueError("STORAGE_BACKEND 'sqlalchemy' requires DATABASE_URL")
+        return SQLAlchemyRepository(url)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+def get_repository():
+    """The process-wide repository configured in backend/config.py."""
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            _repository = create_repository()
+        return _repository
@@ -0,0 +1,66 @@
+import time
+import logging
+import threading
+
+from backend.repository import get_repository
+
+
+class RosterCache:
+    """In-memory students table as recognizer label -> (id, name).
+
+    Loaded once and reloaded only when the repository's students token (row
+    count and highest id) differs from the last load, so students added
+    through /add_student or capture_images.py show up without restarting the
+    recognizer, while the recognizer's own attendance commits do not cause
+    reloads. Change checks run at most every `check_interval` seconds;
+    backends without a students token reload at that interval.
+    """
+
+    def __init__(self, label_to_name, repository=None, check_interval=2.0):
+        self.label_to_name = label_to_name
+        self.repository = repository or get_repository()
+        self.check_interval = check_interval
+        self.by_label = {}
+        self._lock = threading.Lock()
+        self._loaded_token = None
+        self._last_check = 0.0
+        self.reload()
+
+    def reload(self):
+        """Load every student in one query and rebuild both lookup tables."""
+        token = self.repository.students_token()
+        rows = self.repository.list_students()
+
+        by_roll = {roll_no: (student_id, name) for student_id, name, roll_no in rows}
+        by_label = {
+            label: by_roll[roll_no]
+            for label, roll_no in self.label_to_name.items()
+            if roll_no in by_roll
+        }
+        with self._lock:
+            self.by_label = by_label
+            self._loaded_token = token
+            self._last_check = time.time()
+        logging.info(f"Roster loaded: {len(by_roll)} students, {len(by_label)} mapped labels")
+
+    def refresh_if_changed(self):
+        """Reload if the students table changed; checks are rate-limited to check_interval."""
+        now = time.time()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        token = self.repository.students_token()
+        if token is not None and token == self._loaded_token:
+            return False
+        self.reload()
+        return True
+
+    def set_label_map(self, label_to_name):
+        """Use the label mapping of a reloaded model."""
+        self.label_to_name = label_to_name
+        self.reload()
+
+    def get_by_label(self, label):
+        """(student_id, name) for a recognizer label, or None if the student is not in the DB."""
+        self.refresh_if_changed()
+        return self.by_label.get(label)
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+
+from backend.config import (
+    SESSION_START_TIMES, LATE_AFTER_MINUTES,
+    ATTENDANCE_STATUS_ABSENT, ATTENDANCE_STATUS_PRESENT, ATTENDANCE_STATUS_LATE
+)
+
+# Materialized attendance summaries, shared by both storage backends.
+#
+#   session_schedule            session -> late_after (HH:MM:SS), from config
+#   attendance_student_summary  per (date, session, student): present / late /
+#                               absent record counts, first sighting, status
+#   attendance_session_summary  per (date, session): students present, late,
+#                               absent and total
+#
+# Repositories refresh only the (date, session, student) keys touched by a
+# write, in the same transaction as the write, so reports read precomputed
+# rows instead of aggregating raw attendance events. All SQL uses named
+# parameters, which both sqlite3 and SQLAlchemy text() accept.
+
+_STUDENT_SELECT = f"""
+    SELECT a.date, a.session, a.student_id, MAX(a.student_name),
+           SUM(CASE WHEN a.status <> '{ATTENDANCE_STATUS_ABSENT}'
+                     AND (sch.late_after IS NULL OR substr(a.timestamp, 12) <= sch.late_after)
+                    THEN 1 ELSE 0 END),
+           SUM(CASE WHEN a.status <> '{ATTENDANCE_STATUS_ABSENT}'
+                     AND sch.late_after IS NOT NULL AND substr(a.timestamp, 12) > sch.late_after
+                    THEN 1 ELSE 0 END),
+           SUM(CASE WHEN a.status = '{ATTENDANCE_STATUS_ABSENT}' THEN 1 ELSE 0 END),
+           MIN(CASE WHEN a.status <> '{ATTENDANCE_STATUS_ABSENT}' THEN a.timestamp END)
+    FROM attendance a
+    LEFT JOIN session_schedule sch ON sch.session = a.session
+    {{where}}
+    GROUP BY a.date, a.session, a.student_id
+"""
+
+_STUDENT_INSERT = """
+    INSERT INTO attendance_student_summary
+        (date, session, student_id, student_name, present, late, absent, first_seen)
+"""
+
+_SESSION_INSERT = f"""
+    INSERT INTO attendance_session_summary (date, session, present, late, absent, students)
+    SELECT date, session,
+           SUM(CASE WHEN present > 0 THEN 1 ELSE 0 END),
+           SUM(CASE WHEN present = 0 AND late > 0 THEN 1 ELSE 0 END),
+           SUM(CASE WHEN present = 0 AND late = 0 AND absent > 0 THEN 1 ELSE 0 END),
+           COUNT(*)
+    FROM attendance_student_summary
+    {{where}}
+    GROUP BY date, session
+"""
+
+REFRESH_STUDENT = [
+    """DELETE FROM attendance_student_summary
+       WHERE date = :date AND session = :session AND student_id = :student_id""",
+    _STUDENT_INSERT + _STUDENT_SELECT.format(
+        where="WHERE a.date = :date AND a.session = :session AND a.student_id = :student_id"
+    ),
+]
+
+REFRESH_SESSION = [
+    """DELETE FROM attendance_student_summary WHERE date = :date AND session = :session""",
+    _STUDENT_INSERT + _STUDENT_SELECT.format(where="WHERE a.date = :date AND a.session = :session"),
+]
+
+REFRESH_SESSION_TOTALS = [
+    """DELETE FROM attendance_session_summary WHERE date = :date AND session = :session""",
+    _SESSION_INSERT.format(where="WHERE date = :date AND session = :session"),
+]
+
+REBUILD_ALL = [
+    "DELETE FROM attendance_student_summary",
+    _STUDENT_INSERT + _STUDENT_SELECT.format(where=""),
+    "DELETE FROM attendance_session_summary",
+    _SESSION_INSERT.format(where=""),
+]
+
+# Session close: one set-based statement adds an Absent row for every student
+# with no record in that session; running it twice adds nothing
+CLOSE_SESSION = """
+    INSERT INTO attendance (student_id, student_name, status, timestamp, date, session)
+    SELECT s.id, s.name, :status, :timestamp, :date, :session
+    FROM students s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM attendance a
+        WHERE a.student_id = s.id AND a.date = :date AND a.session = :session
+    )
+"""
+
+
+def late_cutoffs():
+    """{session: "HH:MM:SS"} after which a first sighting counts as late."""
+    cutoffs = {}
+    for session, start in SESSION_START_TIMES.items():
+        start_time = datetime.strptime(start, "%H:%M")
+        cutoffs[session] = (start_time + timedelta(minutes=LATE_AFTER_MINUTES)).strftime("%H:%M:%S")
+    return cutoffs
+
+
+def student_keys(records):
+    """Distinct {date, session, student_id} keys for attendance records (ATTENDANCE_FIELDS order)."""
+    keys = {(record[4], record[5], record[0]) for record in records}
+    return [{"date": date, "session": session, "student_id": student_id} for date, session, student_id in keys]
+
+
+def refresh(run, keys):
+    """Recompute summaries for the given student keys. run(sql, params) executes one statement
+    (params may be a list of dicts for executemany)."""
+    if not keys:
+        return
+    for sql in REFRESH_STUDENT:
+        run(sql, keys)
+    sessions = [dict(pair) for pair in {(("date", k["date"]), ("session", k["session"])) for k in keys}]
+    for sql in REFRESH_SESSION_TOTALS:
+        run(sql, sessions)
+
+
+def refresh_session(run, date, session):
+    """Recompute every student row and the totals of one session."""
+    params = {"date": date, "session": session}
+    for sql in REFRESH_SESSION + REFRESH_SESSION_TOTALS:
+        run(sql, params)
+
+
+def rebuild(run):
+    """Recompute all summaries from the attendance table."""
+    for sql in REBUILD_ALL:
+        run(sql, {})
+
+
+def student_status(present, late, absent):
+    if present:
+        return ATTENDANCE_STATUS_PRESENT
+    if late:
+        return ATTENDANCE_STATUS_LATE
+    return ATTENDANCE_STATUS_ABSENT
@@ -0,0 +1,159 @@
+import itertools
+import logging
+import cv2
+import numpy as np
+
+
+def iou(box_a, box_b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class FaceTrack:
+    """A face followed across frames, recognized once when it is created."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, box, label, confidence):
+        self.id = next(self._ids)
+        self.box = tuple(int(v) for v in box)
+        self.label = label
+        self.confidence = confidence
+        self.misses = 0
+
+    @property
+    def key(self):
+        return f"track_{self.id}"
+
+
+class FaceTracker:
+    """Runs Haar detection every N frames (or on motion) and tracks faces in between.
+
+    Between detections each track's box is moved by the median optical-flow
+    displacement of corner features inside it. On detection frames tracks are
+    matched to the new boxes by IoU: matched tracks keep their identity, new
+    boxes are recognized once, and tracks unmatched for max_misses detection
+    rounds are dropped.
+    """
+
+    def __init__(self, detect_interval=10, motion_threshold=0.02,
+                 iou_threshold=0.3, max_misses=2, unknown_threshold=None):
+        self.detect_interval = max(1, detect_interval)
+        self.motion_threshold = motion_threshold
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        # Tracks at or above this confidence are unknown and get re-recognized
+        # on detection frames instead of keeping a bad first guess forever
+        self.unknown_threshold = unknown_threshold
+        self.tracks = []
+        self.frame_count = 0
+        self.detections_run = 0
+        self.recognitions_run = 0
+        self._prev_gray = None
+        self._prev_small = None
+        self._force_detect = True
+
+    def update(self, gray, detect_fn, recognize_fn):
+        """Advance the tracker by one grayscale frame and return the live tracks.
+
+        detect_fn(gray) returns (x, y, w, h) boxes; recognize_fn(gray, boxes)
+        returns one (label, confidence) per box.
+        """
+        self.frame_count += 1
+        motion = self._motion_detected(gray)
+
+        if self._force_detect or motion or self.frame_count % self.detect_interval == 0:
+            self._detect(gray, detect_fn, recognize_fn)
+        elif self._prev_gray is not None:
+            self._propagate(gray)
+
+        self._prev_gray = gray
+        return list(self.tracks)
+
+    def _motion_detected(self, gray):
+        small = cv2.resize(gray, (80, 60), interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        prev, self._prev_small = self._prev_small, small
+        if prev is None or self.motion_threshold is None:
+            return False
+        changed = cv2.absdiff(prev, small) > 25
+        return changed.mean() > self.motion_threshold
+
+    def _detect(self, gray, detect_fn, recognize_fn):
+        self.detections_run += 1
+        self._force_detect = False
+        boxes = [tuple(int(v) for v in box) for box in detect_fn(gray)]
+
+        # Greedy IoU matching, best overlaps first
+        pairs = sorted(
+            ((iou(track.box, box), ti, bi)
+             for ti, track in enumerate(self.tracks)
+             for bi, box in enumerate(boxes)),
+            reverse=True,
+        )
+        matched_tracks, matched_boxes = set(), set()
+        for overlap, ti, bi in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if ti in matched_tracks or bi in matched_boxes:
+                continue
+            track = self.tracks[ti]
+            track.box = boxes[bi]
+            track.misses = 0
+            matched_tracks.add(ti)
+            matched_boxes.add(bi)
+
+        survivors = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    logging.debug(f"Face track {track.id} lost")
+                    continue
+            survivors.append(track)
+
+        retry = [t for t in survivors if t.misses == 0 and self._is_unknown(t)]
+        new_boxes = [box for bi, box in enumerate(boxes) if bi not in matched_boxes]
+        to_recognize = [t.box for t in retry] + new_boxes
+        if to_recognize:
+            self.recognitions_run += len(to_recognize)
+            predictions = recognize_fn(gray, to_recognize)
+            for track, (label, confidence) in zip(retry, predictions):
+                track.label, track.confidence = label, confidence
+            for box, (label, confidence) in zip(new_boxes, predictions[len(retry):]):
+                survivors.append(FaceTrack(box, label, confidence))
+
+        self.tracks = survivors
+
+    def _is_unknown(self, track):
+        return self.unknown_threshold is not None and track.confidence >= self.unknown_threshold
+
+    def _propagate(self, gray):
+        height, width = gray.shape[:2]
+        for track in self.tracks:
+            x, y, w, h = track.box
+            roi = self._prev_gray[y:y+h, x:x+w]
+            if roi.size == 0:
+                self._force_detect = True
+                continue
+            points = cv2.goodFeaturesToTrack(roi, maxCorners=20, qualityLevel=0.01, minDistance=5)
+            if points is None or len(points) < 3:
+                self._force_detect = True
+                continue
+            points = points.reshape(-1, 2) + np.array([x, y], dtype=np.float32)
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, points, None)
+            good = status.ravel() == 1
+            if good.sum() < 3:
+                # Flow lost the face; confirm with a real detection next frame
+                self._force_detect = True
+                continue
+            dx, dy = np.median(moved[good] - points[good], axis=0)
+            new_x = int(round(min(max(x + dx, 0), width - w)))
+            new_y = int(round(min(max(y + dy, 0), height - h)))
+            track.box = (new_x, new_y, w, h)
@@ -1,9 +1,10 @@
 import os
 import sys
-import cv2 as cv
 import numpy as np
 import json
+import hashlib
 import logging
+import argparse
 
 # Ensure project root on sys.path when invoked directly
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -11,7 +12,15 @@ PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from backend.config import LOG_FILE, LOG_LEVEL, MODEL_PATH, STUDENT_MAP_PATH
+from backend.config import (
+    LOG_FILE, LOG_LEVEL, MODEL_PATH, STUDENT_MAP_PATH, INDEX_PATH, CENTROID_TOP_K,
+    TRAIN_MANIFEST_PATH, FACE_CACHE_DIR, MODEL_FORMAT, BINARY_MODEL_PATH, BINARY_MODEL_DTYPE
+)
+from backend.lbph_engine import LBPHEngine
+from backend.lbph_index import CentroidIndex
+from backend.lbph_binary import publish_binary
+from backend.model_loader import replace_file, write_json, model_signature, create_recognizer
+from backend.face_dataset import FaceDataset, scan_dataset
 
 # Setup logging
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
@@ -22,69 +31,172 @@ logging.basicConfig(
     filemode='a'
 )
 
-project_root = CURRENT_DIR  # backend folder
+# Every input and output resolved against the project root, so training
+# from any working directory uses the same tree as capture_images.py
 data_dir = os.path.join(PROJECT_ROOT, "data", "faces", "train")
-model_dir = os.path.join(PROJECT_ROOT, "data", "models")
+cache_dir = os.path.join(PROJECT_ROOT, FACE_CACHE_DIR)
+model_path = os.path.join(PROJECT_ROOT, MODEL_PATH)
+binary_model_path = os.path.join(PROJECT_ROOT, BINARY_MODEL_PATH)
+student_map_path = os.path.join(PROJECT_ROOT, STUDENT_MAP_PATH)
+index_path = os.path.join(PROJECT_ROOT, INDEX_PATH)
+manifest_path = os.path.join(PROJECT_ROOT, TRAIN_MANIFEST_PATH)
+model_dir = os.path.dirname(model_path)
 os.makedirs(model_dir, exist_ok=True)
 
-# Training data containers
-faces = []
-labels = []
-
-# Only include folders (skip files like .DS_Store)
-student_folders = [f for f in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, f))]
-student_folders.sort()  # consistent mapping
-student_id_map = {name: idx for idx, name in enumerate(student_folders)}
-
-logging.info(f"Students found for training: {student_id_map}")
-print(" Students found for training:", student_id_map)
-
-# Collect faces & labels
-total_images = 0
-for student_name, student_id in student_id_map.items():
-    student_path = os.path.join(data_dir, student_name)
-    student_images = 0
-    for file_name in os.listdir(student_path):
-        if file_name.endswith(".jpg"):
-            img_path = os.path.join(student_path, file_name)
-            img = cv.imread(img_path, cv.IMREAD_GRAYSCALE)
-            if img is None:
-                logging.warning(f"Skipping unreadable image: {img_path}")
-                print(f" Skipping unreadable image: {img_path}")
-                continue
-
-            # Ensure consistent size
-            img = cv.resize(img, (200, 200))
-
-            faces.append(img)
-            labels.append(student_id)
-            student_images += 1
-            total_images += 1
-    
-    logging.info(f"Loaded {student_images} images for {student_name}")
-
-# Convert to numpy arrays
-faces = np.array(faces, dtype="uint8")  # uint8 = required for OpenCV
-labels = np.array(labels)
-
-logging.info(f"Collected {len(faces)} face images for training")
-print(f" Collected {len(faces)} face images for training.")
-
-# Train recognizer
-logging.info("Starting face recognizer training...")
-face_recognizer = cv.face.LBPHFaceRecognizer_create() if hasattr(cv.face, "LBPHFaceRecognizer_create") else cv.createLBPHFaceRecognizer()
-face_recognizer.train(faces, labels)
-logging.info("Face recognizer training completed")
-
-# Save model
-face_recognizer.save(MODEL_PATH)
-logging.info(f"Model saved to {MODEL_PATH}")
-
-# Save student mapping
-with open(STUDENT_MAP_PATH, "w") as f:
-    json.dump(student_id_map, f)
-logging.info(f"Student mapping saved to {STUDENT_MAP_PATH}")
-
-logging.info("Training process completed successfully")
-print(f" Training complete! Model saved at {MODEL_PATH}")
-print(f"Student mapping saved at {STUDENT_MAP_PATH}")
+def file_sha1(path):
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+def load_manifest():
+    """Previous training state: stable labels plus per-file mtime/size/hash."""
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return json.load(f)
+    # First run with a manifest: keep labels of an existing model if there is one
+    labels = {}
+    if os.path.exists(student_map_path):
+        with open(student_map_path) as f:
+            labels = json.load(f)
+    return {"labels": labels, "files": {}}
+
+def save_manifest(manifest):
+    replace_file(manifest_path, write_json(manifest))
+    logging.info(f"Training manifest saved to {manifest_path}")
+
+def diff_dataset(files, manifest):
+    """Compare the scanned files with the manifest.
+
+    Returns (new, changed, removed, entries) where entries is the manifest
+    "files" section for the current dataset. Files whose mtime and size are
+    unchanged are trusted without hashing; others are hashed so a touched but
+    identical image is not treated as changed.
+    """
+    known = manifest["files"]
+    new, changed, entries = [], [], {}
+    for rel_path, (_, img_path, mtime_ns, size) in files.items():
+        entry = known.get(rel_path)
+        if entry and entry["mtime_ns"] == mtime_ns and entry["size"] == size:
+            entries[rel_path] = entry
+            continue
+        digest = file_sha1(img_path)
+        entries[rel_path] = {"mtime_ns": mtime_ns, "size": size, "sha1": digest}
+        if entry is None:
+            new.append(rel_path)
+        elif entry["sha1"] != digest:
+            changed.append(rel_path)
+    removed = [rel_path for rel_path in known if rel_path not in files]
+    return new, changed, removed, entries
+
+def assign_labels(student_names, existing):
+    """Keep every existing label; new students get the next free integers."""
+    labels = {name: label for name, label in existing.items() if name in student_names}
+    next_label = max(existing.values(), default=-1) + 1
+    for name in sorted(student_names):
+        if name not in labels:
+            labels[name] = next_label
+            next_label += 1
+    return labels
+
+def load_faces(dataset, rel_paths, student_id_map):
+    """Faces and labels for the given images, read from the memory-mapped face cache.
+
+    When every cached image is requested the cache arrays are used as-is,
+    without copying.
+    """
+    label_of_student = np.array([student_id_map.get(name, -1) for name in dataset.students], dtype=np.int32)
+    rows = dataset.rows(rel_paths)
+    if len(rows) == len(dataset):
+        return dataset.faces, label_of_student[dataset.labels]
+    return dataset.faces[rows], label_of_student[dataset.labels[rows]]
+
+def save_model(face_recognizer, student_id_map):
+    # The recognizer reloads once all files have stopped changing. The model
+    # goes first so the centroid index can record the file it matches.
+    replace_file(model_path, face_recognizer.save)
+    logging.info(f"Model saved to {model_path}")
+
+    engine = LBPHEngine.from_recognizer(face_recognizer)
+    index = CentroidIndex.build(engine, top_k=CENTROID_TOP_K, source_signature=model_signature((model_path,))[0])
+    replace_file(index_path, index.save)
+
+    replace_file(student_map_path, write_json(student_id_map))
+    logging.info(f"Student mapping saved to {student_map_path}")
+
+    # Compact memory-mapped copy for recognizers; the YAML stays the training source
+    if MODEL_FORMAT == "binary":
+        publish_binary(binary_model_path, engine, BINARY_MODEL_DTYPE)
+
+def train(full=False):
+    """Train the recognizer, incrementally when only new images were added.
+
+    Incremental mode reads the existing model and passes just the new images
+    to LBPH update(). Changed or deleted images cannot be removed from an
+    LBPH model, so they trigger a full retrain; labels stay stable either way.
+    """
+    # Decode only images added since the last run into the packed face cache
+    dataset = FaceDataset(data_dir, cache_dir)
+    dataset.sync()
+
+    # Images the cache could not decode are left out of the manifest too,
+    # so they are retried (and reported) on the next run
+    files = scan_dataset(data_dir)
+    unreadable = [rel_path for rel_path in files if rel_path not in dataset]
+    if unreadable:
+        logging.warning(f"Skipping {len(unreadable)} unreadable images: {', '.join(unreadable)}")
+        print(f" {len(unreadable)} unreadable image(s) left out of training; they are retried next run")
+        files = {rel_path: info for rel_path, info in files.items() if rel_path in dataset}
+    manifest = load_manifest()
+    new, changed, removed, entries = diff_dataset(files, manifest)
+
+    student_names = {student_name for student_name, _, _, _ in files.values()}
+    student_id_map = assign_labels(student_names, manifest["labels"])
+    logging.info(f"Students found for training: {student_id_map}")
+    print(" Students found for training:", student_id_map)
+
+    incremental = (
+        not full and not changed and not removed
+        and manifest["files"] and os.path.exists(model_path)
+    )
+    if incremental and not new:
+        logging.info("Training data unchanged; model is up to date")
+        print(" No new images since last training. Model is up to date.")
+        return
+
+    face_recognizer = create_recognizer()
+    if incremental:
+        faces, labels = load_faces(dataset, new, student_id_map)
+        logging.info(f"Incremental training with {len(faces)} new images")
+        print(f" Adding {len(faces)} new face images to the existing model.")
+        if len(faces) == 0:
+            logging.warning("No readable new images; model left unchanged")
+            return
+        face_recognizer.read(model_path)
+        face_recognizer.update(faces, labels)
+    else:
+        if changed or removed:
+            logging.info(f"Full retrain: {len(changed)} changed and {len(removed)} removed images")
+        faces, labels = load_faces(dataset, list(files), student_id_map)
+        logging.info(f"Collected {len(faces)} face images for training")
+        print(f" Collected {len(faces)} face images for training.")
+
+        # Train recognizer
+        logging.info("Starting face recognizer training...")
+        face_recognizer.train(faces, labels)
+    logging.info("Face recognizer training completed")
+
+    save_model(face_recognizer, student_id_map)
+    save_manifest({"labels": student_id_map, "files": entries})
+
+    logging.info("Training process completed successfully")
+    print(f" Training complete! Model saved at {model_path}")
+    print(f"Student mapping saved at {student_map_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the LBPH face recognizer")
+    parser.add_argument("--full", action="store_true",
+                        help="Retrain from scratch instead of adding only new images")
+    args = parser.parse_args()
+    train(full=args.full)
@@ -0,0 +1,149 @@
+import time
+import logging
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from backend.config import (
+    FACE_SIZE_WIDTH, FACE_SIZE_HEIGHT, UNKNOWN_MATCH_THRESHOLD, UNKNOWN_FACE_TTL,
+    UNKNOWN_FLUSH_INTERVAL, UNKNOWN_CROP_MIN_GAIN
+)
+
+# Weight of a new sighting in a cluster's running-average histogram
+HISTOGRAM_UPDATE_RATE = 0.2
+
+
+def chi_square(histograms, query):
+    """CHISQR_ALT distance of query to every row, on the same scale as LBPH confidence."""
+    diff = histograms - query
+    total = histograms + query
+    terms = np.divide(diff * diff, total, out=np.zeros_like(total), where=total > 0)
+    return 2.0 * terms.sum(axis=1)
+
+
+def crop_quality(gray_crop):
+    """Sharpness (Laplacian variance) weighted by face size; higher is better."""
+    sharpness = cv2.Laplacian(gray_crop, cv2.CV_64F).var()
+    return sharpness * np.sqrt(gray_crop.shape[0] * gray_crop.shape[1])
+
+
+class UnknownPerson:
+    """One cluster of sightings believed to be the same unrecognized person."""
+
+    def __init__(self, histogram, crop, quality, now):
+        self.histogram = histogram
+        self.best_crop = crop
+        self.best_quality = quality
+        self.sightings = 1
+        self.first_seen = now
+        self.last_seen = now
+        self.alert_key = None
+        self.saved = False  # new-alert job accepted by the writer
+        self.crop_dirty = False
+        self.count_dirty = False
+
+
+class UnknownFaceCache:
+    """Online clustering of unknown faces by LBPH histogram similarity.
+
+    Each unknown crop is turned into the same LBP histogram the recognizer
+    uses and compared with the people seen recently. A match within
+    match_threshold adds a sighting to that person; otherwise a new person
+    (and one alert row plus one JPEG) is created. Image encoding and database
+    writes are handed to an AlertWriter; sighting counts and better crops are
+    sent at most every flush_interval seconds, and people not seen for ttl
+    seconds are flushed and forgotten. Jobs the writer refuses under load
+    stay pending and are offered again on the next flush. One cache serves
+    one camera and is used from a single thread (the sink).
+    """
+
+    def __init__(self, histogram_fn, writer,
+                 match_threshold=UNKNOWN_MATCH_THRESHOLD, ttl=UNKNOWN_FACE_TTL,
+                 flush_interval=UNKNOWN_FLUSH_INTERVAL, min_gain=UNKNOWN_CROP_MIN_GAIN):
+        self.histogram_fn = histogram_fn
+        self.writer = writer
+        self.match_threshold = match_threshold
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.min_gain = min_gain
+        self.people = []
+        self.sightings = 0
+        self.alerts_created = 0
+        self._last_flush = time.time()
+
+    def observe(self, frame, x, y, w, h):
+        """Record one unknown face in frame; returns its UnknownPerson."""
+        now = datetime.now()
+        crop = frame[y:y+h, x:x+w]
+        gray = crop if crop.ndim == 2 else cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        face = cv2.resize(gray, (FACE_SIZE_WIDTH, FACE_SIZE_HEIGHT))
+        histogram = self.histogram_fn(face[None])[0].astype(np.float64)
+        quality = crop_quality(gray)
+        self.sightings += 1
+
+        person = self._match(histogram)
+        if person is None:
+            person = UnknownPerson(histogram, crop.copy(), quality, now)
+            person.alert_key = self.writer.new_key(now)
+            self.people.append(person)
+            self._save_new(person)
+        else:
+            person.sightings += 1
+            person.last_seen = now
+            person.count_dirty = True
+            person.histogram += HISTOGRAM_UPDATE_RATE * (histogram - person.histogram)
+            if quality > person.best_quality * self.min_gain:
+                person.best_crop = crop.copy()
+                person.best_quality = quality
+                person.crop_dirty = True
+        return person
+
+    def _match(self, histogram):
+        if not self.people:
+            return None
+        distances = chi_square(np.stack([p.histogram for p in self.people]), histogram)
+        best = int(np.argmin(distances))
+        return self.people[best] if distances[best] < self.match_threshold else None
+
+    def tick(self):
+        """Flush and expire on schedule; call once per processed frame."""
+        now = time.time()
+        if now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        self.flush()
+        cutoff = datetime.fromtimestamp(now - self.ttl)
+        active = [p for p in self.people if p.last_seen >= cutoff]
+        if len(active) < len(self.people):
+            logging.info(f"Unknown faces: {len(self.people) - len(active)} people expired, {len(active)} active")
+            self.people = active
+
+    def flush(self):
+        """Send sighting counts and improved crops of every open alert to the writer."""
+        for person in self.people:
+            if not person.saved:
+                self._save_new(person)
+                continue
+            if person.crop_dirty and self.writer.replace_image(person.alert_key, person.best_crop):
+                person.crop_dirty = False
+            if person.count_dirty and self.writer.update_sightings(
+                    person.alert_key, person.sightings, self._format_time(person.last_seen)):
+                person.count_dirty = False
+
+    def close(self):
+        self.flush()
+        logging.info(f"Unknown faces: {self.sightings} sightings grouped into {self.alerts_created} alerts")
+
+    @staticmethod
+    def _format_time(timestamp):
+        return timestamp.strftime("%Y-%m-%d %H:%M:%S")
+
+    def _save_new(self, person):
+        """Queue the alert row and image; counts seen so far go with the first flush."""
+        if not self.writer.add(person.alert_key, person.best_crop, self._format_time(person.first_seen)):
+            return
+        person.saved = True
+        person.crop_dirty = False
+        person.count_dirty = person.sightings > 1
+        self.alerts_created += 1
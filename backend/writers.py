@@ -0,0 +1,247 @@
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from backend.repository import get_repository
+
+# Sentinel that tells the writer thread to flush and exit
+_STOP = object()
+
+
+class BatchWriter:
+    """Background thread that drains a queue into the database in batches.
+
+    Producers only call submit(), which never touches the database. The
+    writer thread commits through the repository whenever
+    batch_size items are pending or flush_interval seconds have passed since
+    the first pending item. stop() (also registered with atexit) commits
+    everything still queued before returning; after it, submit() refuses
+    items until start() is called again. With max_pending set the queue is
+    bounded and submit() refuses items instead of blocking.
+    """
+
+    name = "batch-writer"
+
+    def __init__(self, batch_size=50, flush_interval=1.0, max_retries=3, repository=None, max_pending=0):
+        self.repository = repository or get_repository()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.max_pending = max_pending
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = False
+        self.written = 0
+        self.dropped = 0
+        atexit.register(self.stop)
+
+    # ---------- lifecycle ----------
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Flush all queued items and stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+            self._stopped = True
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join()
+
+    def submit(self, item):
+        """Queue an item for writing; returns False if it was refused.
+
+        Starts the writer thread on first use. Items submitted after stop()
+        are refused, since nothing would ever commit them.
+        """
+        if self._thread is None:
+            if self._stopped:
+                logging.warning(f"{self.name}: item submitted after stop(), not written")
+                self.dropped += 1
+                return False
+            self.start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            return self._refuse()
+        return True
+
+    def _refuse(self):
+        self.dropped += 1
+        if self.dropped == 1 or self.dropped % 100 == 0:
+            logging.warning(f"{self.name}: queue backed up, {self.dropped} items refused so far")
+        return False
+
+    def pending(self):
+        return self._queue.qsize()
+
+    # ---------- writer thread ----------
+    def write_batch(self, items):
+        """Write items in one transaction; return the items actually stored (None = all)."""
+        raise NotImplementedError
+
+    def after_commit(self, items):
+        """Hook run on the writer thread once a batch is durable."""
+
+    def _run(self):
+        batch = []
+        deadline = None
+        retries = 0
+        stopping = False
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                item = self._queue.get(timeout=timeout)
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.time() + self.flush_interval
+            except queue.Empty:
+                pass
+
+            due = deadline is not None and time.time() >= deadline
+            if batch and (stopping or due or len(batch) >= self.batch_size):
+                # Pick up anything else already waiting before committing
+                while len(batch) < self.batch_size * 4:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                    else:
+                        batch.append(item)
+                if self._commit(batch):
+                    batch, deadline, retries = [], None, 0
+                else:
+                    retries += 1
+                    if retries > self.max_retries or stopping:
+                        logging.error(f"{self.name}: dropping {len(batch)} items after {retries} failed commits")
+                        batch, retries = [], 0
+                    deadline = time.time() + self.flush_interval
+
+            if stopping and not batch:
+                break
+
+    def _commit(self, batch):
+        try:
+            stored = self.write_batch(batch)
+        except Exception as e:
+            logging.error(f"{self.name}: failed to commit {len(batch)} items: {str(e)}")
+            return False
+        stored = batch if stored is None else stored
+        self.written += len(stored)
+        try:
+            self.after_commit(stored)
+        except Exception as e:
+            logging.error(f"{self.name}: post-commit hook failed: {str(e)}")
+        return True
+
+
+class AttendanceWriter(BatchWriter):
+    """Queues attendance rows from the camera loop and inserts them in batches."""
+
+    name = "attendance-writer"
+
+    def mark(self, student_id, student_name, status="Present", session="Morning"):
+        """Enqueue an attendance record; the timestamp is taken now, not at write time."""
+        now = datetime.now()
+        timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+        self.submit((student_id, student_name, status, timestamp, now.strftime("%Y-%m-%d"), session))
+
+    def write_batch(self, items):
+        return self.repository.add_attendance(items)
+
+    def after_commit(self, items):
+        for student_id, student_name, status, timestamp, date, session in items:
+            logging.info(f"Attendance marked: {student_name} (ID: {student_id}), Status: {status}, Session: {session}, Time: {timestamp}")
+            print(f"✅ {student_name} marked present at {timestamp}")
+
+
+class AlertWriter(BatchWriter):
+    """Encodes unknown-face crops and records their alerts off the camera loop.
+
+    Jobs are ("new", alert_key, crop, detected_time), ("image", alert_key,
+    crop) and ("seen", alert_key, sighting_count, last_seen). A batch stores
+    its crops in the content-addressed ImageStore first and then inserts and
+    updates the rows in one transaction, so the alerts page never lists an
+    image that is not on disk yet. alert_key is chosen by the caller because
+    a queued alert has no id, and a better crop changes the image name.
+
+    The queue is bounded and the camera loop never waits on it. With policy
+    "drop" jobs are refused once it is full; with "sample", past half full,
+    image and count updates are refused and only every sample_every-th new
+    alert is accepted. Callers keep refused work and offer it again later.
+    """
+
+    name = "alert-writer"
+
+    def __init__(self, store, policy="sample", sample_every=5, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self.policy = policy
+        self.sample_every = sample_every
+        self._offered = 0
+
+    @staticmethod
+    def new_key(timestamp):
+        """Collision-free alert key for a face first seen at `timestamp` (a datetime)."""
+        return f"unknown_face_{timestamp.strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}"
+
+    def _overloaded(self):
+        return self.policy == "sample" and self.max_pending and self.pending() >= self.max_pending // 2
+
+    def add(self, alert_key, crop, detected_time):
+        """Queue a new alert; returns False if it was refused."""
+        if self._overloaded():
+            self._offered += 1
+            if self._offered % self.sample_every:
+                return self._refuse()
+        return self.submit(("new", alert_key, crop, detected_time))
+
+    def replace_image(self, alert_key, crop):
+        """Queue a better crop for an existing alert; returns False if it was refused."""
+        if self._overloaded():
+            return self._refuse()
+        return self.submit(("image", alert_key, crop))
+
+    def update_sightings(self, alert_key, sighting_count, last_seen):
+        """Queue a sighting count update; returns False if it was refused."""
+        if self._overloaded():
+            return self._refuse()
+        return self.submit(("seen", alert_key, sighting_count, last_seen))
+
+    def write_batch(self, items):
+        records, updates = [], {}
+        for item in items:
+            kind, alert_key = item[0], item[1]
+            if kind == "new":
+                records.append((alert_key, self.store.put(item[2]), item[3]))
+                continue
+            # [image_path, sighting_count, last_seen]; None leaves the column unchanged
+            update = updates.setdefault(alert_key, [None, None, None])
+            if kind == "image":
+                update[0] = self.store.put(item[2])
+            else:
+                update[1:] = item[2:]  # counts are cumulative: the newest wins
+        self.repository.add_alerts(records, [(key, *update) for key, update in updates.items()])
+
+    def after_commit(self, items):
+        for item in items:
+            if item[0] == "new":
+                logging.warning(f"Unknown face detected and saved: {item[1]}")
+                print(f"⚠️ Unknown face detected! Saved as {item[1]}")
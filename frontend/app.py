@@ -1,12 +1,12 @@
-from flask import Flask, render_template, send_file, request
-import sqlite3
-import pandas as pd
+from flask import Flask, Response, render_template, request, send_from_directory, stream_with_context
 import os
 import sys
+import signal
 import threading
 import webbrowser
 import subprocess
 import time
+import logging
 from datetime import datetime
 
 app = Flask(__name__)
@@ -17,89 +17,54 @@ PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-# Paths
-DB_PATH = os.path.join(PROJECT_ROOT, "attendance.db")
-EXPORTS_DIR = os.path.join(PROJECT_ROOT, "logs")
-os.makedirs(EXPORTS_DIR, exist_ok=True)
-
 # Import backend modules
+from backend.repository import get_repository
 from backend.utils import get_attendance, add_student
-from backend.models import create_tables
+from backend.config import CAMERA_SOURCES, UNKNOWN_FACES_PATH, ALERTS_PAGE_SIZE, ALERT_IMAGE_MAX_AGE
+from backend.events import EventBroker, DatabaseEventFeed
+from backend.exports import iter_attendance_csv
+from backend.image_store import content_digest, thumbnail_name
+from backend.frame_buffer import FrameFeed
+from backend.migrations import DuplicateAttendanceError
+
+# Students, attendance and alerts storage (SQLite file or a shared database server)
+repository = get_repository()
+
+# One broker and one database watcher per web server, shared by every dashboard
+event_broker = EventBroker()
+event_feed = DatabaseEventFeed(event_broker, repository)
+
+# Preview frames published by the recognizer, shared by every /video_feed client
+preview_feed = FrameFeed()
 
 def update_database_structure():
-    """Update database structure to match new frontend requirements."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+    """Create or upgrade the database to the current schema (see backend/migrations.py)."""
     try:
-        # Create new attendance table with timestamp
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS attendance_new (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER,
-                student_name TEXT,
-                status TEXT,
-                timestamp TEXT,
-                session TEXT,
-                FOREIGN KEY(student_id) REFERENCES students(id)
-            )
-        """)
-        
-        # Create unverified_faces table for alerts
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS unverified_faces (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                image_path TEXT,
-                detected_time TEXT,
-                resolved INTEGER DEFAULT 0
-            )
-        """)
-        
-        # Check if we need to migrate data
-        cursor.execute("SELECT COUNT(*) FROM attendance")
-        old_count = cursor.fetchone()[0]
-        
-        if old_count > 0:
-            # Check if old table has 'date' column (old structure)
-            cursor.execute("PRAGMA table_info(attendance)")
-            columns = [col[1] for col in cursor.fetchall()]
-            
-            if 'date' in columns and 'timestamp' not in columns:
-                # Migrate existing data to new structure
-                cursor.execute("""
-                    SELECT a.*, s.name 
-                    FROM attendance a 
-                    JOIN students s ON a.student_id = s.id
-                """)
-                old_records = cursor.fetchall()
-                
-                for record in old_records:
-                    # Convert date and time to timestamp
-                    timestamp = f"{record[2]} {record[3]}"
-                    cursor.execute("""
-                        INSERT INTO attendance_new (student_id, student_name, status, timestamp, session)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (record[1], record[6], record[4], timestamp, record[5]))
-                
-                # Drop old table and rename new one
-                cursor.execute("DROP TABLE attendance")
-                cursor.execute("ALTER TABLE attendance_new RENAME TO attendance")
-                print(" Database structure updated successfully!")
-        
-        conn.commit()
-        
+        repository.migrate()
+    except DuplicateAttendanceError as e:
+        logging.error(f"Database upgrade stopped: {e}")
+        print(f" Database upgrade stopped: {e}")
     except Exception as e:
+        logging.exception("Database update failed")
         print(f" Database update failed: {str(e)}")
-        conn.rollback()
-    finally:
-        conn.close()
+
+# Background recognizer started by start_face_recognition(), stopped via /api/recognition/stop
+recognition_process = None
 
 def start_face_recognition():
-    """Start the face recognition system in background."""
+    """Start the face recognition system in background.
+
+    A single camera runs the interactive recognizer; several CAMERA_SOURCES
+    share one multi-camera recognition service process.
+    """
+    script = "backend/recognition_service.py" if len(CAMERA_SOURCES) > 1 else "backend/face_recognition.py"
+
     def run_recognition():
+        global recognition_process
         time.sleep(3)  # Wait for web server to start
         try:
-            subprocess.run([sys.executable, "backend/face_recognition.py"], cwd=PROJECT_ROOT)
+            recognition_process = subprocess.Popen([sys.executable, script], cwd=PROJECT_ROOT)
+            recognition_process.wait()
         except Exception as e:
             print(f" Face recognition failed: {str(e)}")
     
@@ -128,35 +93,41 @@ def index():
 # ---------- Dashboard (today’s attendance) ----------
 @app.route("/dashboard")
 def dashboard():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query(
-        """
-        SELECT student_id, student_name AS name, status, timestamp
-        FROM attendance
-        WHERE date(timestamp) = date('now')
-        ORDER BY timestamp DESC
-        """,
-        conn
-    )
-    conn.close()
-    return render_template("dashboard.html", records=df.to_dict(orient="records"))
+    today = datetime.now().strftime("%Y-%m-%d")
+    records = repository.attendance_for_date(today)
+    summary = repository.session_summary(today)
+    return render_template("dashboard.html", records=records, summary=summary)
 
 
 # ---------- Alerts (unverified faces) ----------
 @app.route("/alerts")
 def alerts():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query(
-        """
-        SELECT id, image_path, detected_time, resolved
-        FROM unverified_faces
-        WHERE resolved = 0
-        ORDER BY detected_time DESC
-        """,
-        conn
+    # Keyset pagination: the next page starts after the last (detected_time, id) shown
+    before = None
+    before_id = request.args.get("before_id", type=int)
+    if before_id is not None:
+        before = (request.args.get("before_time", ""), before_id)
+    page = repository.unresolved_alerts(limit=ALERTS_PAGE_SIZE + 1, before=before)
+    alerts = page[:ALERTS_PAGE_SIZE]
+    for alert in alerts:
+        alert["thumbnail_path"] = thumbnail_name(alert["image_path"])
+    return render_template(
+        "alerts.html", alerts=alerts, total=repository.alert_count(), first_page=before is None,
+        next_page=alerts[-1] if len(page) > ALERTS_PAGE_SIZE else None,
     )
-    conn.close()
-    return render_template("alerts.html", alerts=df.to_dict(orient="records"))
+
+@app.route("/alert_images/<path:name>")
+def alert_image(name):
+    """Unknown-face crops and thumbnails; content-addressed names never change, so cache them for good."""
+    directory = os.path.join(PROJECT_ROOT, UNKNOWN_FACES_PATH)
+    digest = content_digest(name)
+    if digest is None:
+        # Flat names from before the image store
+        return send_from_directory(directory, name, max_age=3600)
+    response = send_from_directory(directory, name, max_age=ALERT_IMAGE_MAX_AGE, etag=digest)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 # ---------- Approve Unknown Face ----------
 @app.route("/approve/<int:alert_id>", methods=["POST"])
@@ -167,34 +138,12 @@ def approve_face(alert_id):
         
         if student_name and roll_no:
             try:
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                
-                # Add student to database
-                cursor.execute("""
-                    INSERT INTO students (name, roll_no)
-                    VALUES (?, ?)
-                """, (student_name, roll_no))
-                
-                student_id = cursor.lastrowid
-                
-                # Mark attendance
+                # Add student, mark attendance and resolve the alert in one transaction
                 now = datetime.now()
-                timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
-                cursor.execute("""
-                    INSERT INTO attendance (student_id, student_name, status, timestamp, session)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (student_id, student_name, "Present", timestamp, "Morning"))
-                
-                # Mark alert as resolved
-                cursor.execute("""
-                    UPDATE unverified_faces 
-                    SET resolved = 1 
-                    WHERE id = ?
-                """, (alert_id,))
-                
-                conn.commit()
-                conn.close()
+                repository.approve_alert(
+                    alert_id, student_name, roll_no,
+                    now.strftime("%Y-%m-%d %H:%M:%S"), now.strftime("%Y-%m-%d"), "Morning",
+                )
                 
                 return f"✅ Student {student_name} approved and marked present! <a href='/alerts'>Back to Alerts</a>"
                 
@@ -207,70 +156,83 @@ def approve_face(alert_id):
 @app.route("/reject/<int:alert_id>", methods=["POST"])
 def reject_face(alert_id):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
         # Mark alert as resolved (threat)
-        cursor.execute("""
-            UPDATE unverified_faces 
-            SET resolved = 2 
-            WHERE id = ?
-        """, (alert_id,))
-        
-        conn.commit()
-        conn.close()
+        repository.resolve_alert(alert_id, 2)
         
         return "Face marked as threat! Security has been notified. <a href='/alerts'>Back to Alerts</a>"
         
     except Exception as e:
         return f" Error rejecting face: {str(e)}"
 
-# ---------- Get Recent Attendance (for real-time updates) ----------
+# ---------- Live Events (Server-Sent Events) ----------
+@app.route("/api/events")
+def events():
+    event_feed.start()
+    return Response(
+        stream_with_context(event_broker.stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ---------- Live Camera Preview (MJPEG) ----------
+@app.route("/video_feed")
+def video_feed():
+    return Response(
+        stream_with_context(preview_feed.stream()),
+        mimetype="multipart/x-mixed-replace; boundary=frame",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ---------- Get Recent Attendance (fallback for browsers without EventSource) ----------
 @app.route("/api/recent_attendance")
 def recent_attendance():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query(
-        """
-        SELECT student_name, status, timestamp
-        FROM attendance
-        WHERE date(timestamp) = date('now')
-        ORDER BY timestamp DESC
-        LIMIT 10
-        """,
-        conn
-    )
-    conn.close()
-    return df.to_json(orient="records")
+    return repository.attendance_for_date(datetime.now().strftime("%Y-%m-%d"), limit=10)
+
+# ---------- Session Summary (precomputed present / late / absent counts) ----------
+@app.route("/api/summary")
+def attendance_summary():
+    day = request.args.get("date") or datetime.now().strftime("%Y-%m-%d")
+    if request.args.get("students"):
+        return repository.student_summary(day, request.args.get("session") or None)
+    return repository.session_summary(day)
 
 # ---------- Get Alert Count ----------
 @app.route("/api/alert_count")
 def alert_count():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM unverified_faces WHERE resolved = 0")
-    count = cursor.fetchone()[0]
-    conn.close()
-    return {"count": count}
+    return {"count": repository.alert_count()}
+
+# ---------- Stop Face Recognition ----------
+@app.route("/api/recognition/stop", methods=["POST"])
+def stop_recognition():
+    """SIGTERM the background recognizer; it flushes queued attendance and alerts before exiting."""
+    process = recognition_process
+    if process is None or process.poll() is not None:
+        return {"stopped": False}
+    process.terminate()
+    return {"stopped": True}
+
+# ---------- Reload Face Model ----------
+@app.route("/api/recognition/reload", methods=["POST"])
+def reload_recognition_model():
+    """SIGHUP the background recognizer so it loads the latest trained model between frames.
+
+    Only the single-camera recognizer hot-reloads; the multi-camera service
+    shares its model with worker processes and needs a restart.
+    """
+    process = recognition_process
+    if process is None or process.poll() is not None or len(CAMERA_SOURCES) > 1 or not hasattr(signal, "SIGHUP"):
+        return {"reloading": False}
+    process.send_signal(signal.SIGHUP)
+    return {"reloading": True}
+
 # ---------- Search Students ----------
 @app.route("/api/search_students")
 def search_students():
     q = request.args.get("q", "").strip()
     if not q:
         return []
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT name, roll_no, '' as email, '' as phone
-        FROM students
-        WHERE name LIKE ? OR roll_no LIKE ?
-        ORDER BY name ASC
-        """,
-        (f"%{q}%", f"%{q}%"),
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    return [{"name": r[0], "roll_no": r[1], "email": r[2], "phone": r[3]} for r in rows]
+    rows = repository.search_students(q)
+    return [{"name": name, "roll_no": roll_no, "email": "", "phone": ""} for name, roll_no in rows]
 
 
 # ---------- Add Student ----------
@@ -287,18 +249,33 @@ def add_student_route():
             return f" Error adding student: {str(e)}"
     return render_template("add_student.html")
 
-# ---------- Download CSV (all attendance records) ----------
+# ---------- Download CSV (streamed, optionally filtered) ----------
 @app.route("/download_csv")
 def download_csv():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM attendance", conn)
-    conn.close()
+    """Stream attendance as CSV.
 
-    filename = f"attendance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    file_path = os.path.join(EXPORTS_DIR, filename)
-    df.to_csv(file_path, index=False)
+    Query parameters (all optional): start, end (YYYY-MM-DD, inclusive),
+    session, student_id, and gzip=1 for a compressed download.
+    """
+    student_id = request.args.get("student_id", type=int)
+    compress = request.args.get("gzip", "0").lower() in ("1", "true", "yes")
+    chunks = iter_attendance_csv(
+        repository,
+        compress=compress,
+        start_date=request.args.get("start") or None,
+        end_date=request.args.get("end") or None,
+        session=request.args.get("session") or None,
+        student_id=student_id,
+    )
 
-    return send_file(file_path, as_attachment=True)
+    filename = f"attendance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    if compress:
+        filename += ".gz"
+    return Response(
+        chunks,
+        mimetype="application/gzip" if compress else "text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
 
 if __name__ == "__main__":
@@ -306,7 +283,6 @@ if __name__ == "__main__":
     print("=" * 50)
 
     # Create tables if they don't exist and migrate structure
-    create_tables()
     update_database_structure()
 
     # Guard to avoid running side-effects twice under Flask reloader
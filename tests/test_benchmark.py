@@ -0,0 +1,55 @@
+import os
+import sys
+
+# Ensure project root on sys.path when run from anywhere
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.benchmark_recognition import STAGES, compare, median_summary
+
+# Baseline comparison: median over runs, relative tolerances, the absolute
+# floor for sub-millisecond stages and accuracy drops.
+
+
+def results(fps=30.0, p95=None, accuracy=()):
+    p95 = p95 or {}
+    return {
+        "fps": fps,
+        "stages": {stage: {"count": 10, "p95_ms": p95.get(stage, 5.0)} for stage in STAGES},
+        "accuracy": list(accuracy),
+    }
+
+
+def accuracy(threshold, precision, recall):
+    return {"threshold": threshold, "precision": precision, "recall": recall}
+
+
+def test_median_summary_ignores_empty_runs():
+    runs = [{"count": 4, "p95_ms": 3.0}, {"count": 0}, {"count": 6, "p95_ms": 1.0}, {"count": 5, "p95_ms": 2.0}]
+    assert median_summary(runs) == {"count": 5, "p95_ms": 2.0}
+    assert median_summary([{"count": 0}]) == {"count": 0}
+
+
+def test_identical_runs_do_not_regress():
+    assert compare(results(), results(), tolerance=0.1, accuracy_tolerance=0.01) == []
+
+
+def test_fps_and_latency_regressions():
+    regressions = compare(results(fps=20.0, p95={"detect": 8.0}), results(),
+                          tolerance=0.1, accuracy_tolerance=0.01)
+    assert regressions == ["fps 30.0 -> 20.0", "detect p95 5.00 ms -> 8.00 ms"]
+
+
+def test_sub_millisecond_jitter_is_ignored():
+    # +100% but only 0.4 ms slower
+    new, old = results(p95={"resize": 0.8}), results(p95={"resize": 0.4})
+    assert compare(new, old, tolerance=0.1, accuracy_tolerance=0.01) == []
+    assert compare(new, old, tolerance=0.1, accuracy_tolerance=0.01, min_delta_ms=0.1) == [
+        "resize p95 0.40 ms -> 0.80 ms"]
+
+
+def test_accuracy_drop_beyond_tolerance():
+    baseline = results(accuracy=[accuracy(60, 0.95, 0.90), accuracy(70, 0.90, 0.95)])
+    new = results(accuracy=[accuracy(60, 0.945, 0.80), accuracy(70, None, 0.95)])
+    assert compare(new, baseline, tolerance=0.1, accuracy_tolerance=0.01) == ["recall@60 0.900 -> 0.800"]
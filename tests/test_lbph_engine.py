@@ -0,0 +1,72 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# Ensure project root on sys.path when run from anywhere
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.lbph_engine import LBPHEngine
+from backend.lbph_binary import save_binary, load_binary
+
+# LBPHEngine must give the same (label, confidence) as OpenCV's
+# LBPHFaceRecognizer.predict, for float32 and for the compact binary
+# storage types. The model is a few synthetic "students": a blurred noise
+# pattern each, trained and queried with per-image noise.
+
+FACE_SIZE = 64
+STUDENTS = 4
+IMAGES_PER_STUDENT = 5
+
+
+def noisy(base, rng, sigma=12):
+    return np.clip(base + rng.normal(0, sigma, base.shape), 0, 255).astype(np.uint8)
+
+
+def synthetic_faces(seed=0):
+    rng = np.random.default_rng(seed)
+    bases = [cv2.GaussianBlur(rng.uniform(0, 255, (FACE_SIZE, FACE_SIZE)), (5, 5), 0) for _ in range(STUDENTS)]
+    train = [noisy(base, rng) for base in bases for _ in range(IMAGES_PER_STUDENT)]
+    labels = np.repeat(np.arange(STUDENTS), IMAGES_PER_STUDENT)
+    # Unseen images of every student plus faces of nobody enrolled
+    queries = [noisy(base, rng) for base in bases for _ in range(3)]
+    queries += [rng.integers(0, 256, (FACE_SIZE, FACE_SIZE), dtype=np.uint8) for _ in range(3)]
+    return train, labels, np.stack(queries)
+
+
+def trained_recognizer(radius):
+    train, labels, queries = synthetic_faces()
+    recognizer = cv2.face.LBPHFaceRecognizer_create(radius=radius, neighbors=8, grid_x=8, grid_y=8)
+    recognizer.train(train, labels)
+    return recognizer, queries
+
+
+def assert_same_predictions(engine, recognizer, queries, tolerance):
+    expected = [recognizer.predict(face) for face in queries]
+    actual = engine.predict_batch(queries)
+    assert [label for label, _ in actual] == [label for label, _ in expected]
+    deltas = [abs(a - e) for (_, a), (_, e) in zip(actual, expected)]
+    assert max(deltas) < tolerance
+
+
+@pytest.mark.parametrize("radius", [1, 2])
+def test_engine_matches_opencv(radius):
+    recognizer, queries = trained_recognizer(radius)
+    engine = LBPHEngine.from_recognizer(recognizer)
+    assert_same_predictions(engine, recognizer, queries, 1e-5)
+
+
+@pytest.mark.parametrize("radius", [1, 2])
+# uint16 counts are exact; OpenCV's own float32 bins differ from them by rounding
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 1e-5), ("uint16", 1e-5), ("float16", 0.1)])
+def test_binary_storage_matches_opencv(tmp_path, radius, dtype, tolerance):
+    recognizer, queries = trained_recognizer(radius)
+    path = str(tmp_path / "model.lbph")
+    save_binary(path, LBPHEngine.from_recognizer(recognizer), dtype)
+    engine = load_binary(path)
+    assert engine.histograms.dtype == np.dtype(dtype)
+    assert_same_predictions(engine, recognizer, queries, tolerance)
@@ -0,0 +1,135 @@
+import os
+import sys
+import sqlite3
+
+import pytest
+
+# Ensure project root on sys.path when run from anywhere
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend import migrations
+from backend.migrations import migrate, archive_duplicates, DuplicateAttendanceError, SCHEMA_VERSION
+
+# The migration chain on a fresh database and on the two layouts older
+# versions of the app left behind: models.create_tables (separate date and
+# time columns) and the app.py migration (timestamp only).
+
+STUDENTS = """
+    CREATE TABLE students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        roll_no TEXT UNIQUE NOT NULL,
+        photo_path TEXT
+    )
+"""
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "attendance.db"))
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(autouse=True)
+def no_duplicates(monkeypatch):
+    monkeypatch.setattr(migrations, "ALLOW_DUPLICATE_ATTENDANCE", False)
+
+
+def timestamp_layout(conn):
+    conn.execute(STUDENTS)
+    conn.execute("""
+        CREATE TABLE attendance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER, student_name TEXT, status TEXT, timestamp TEXT, session TEXT
+        )
+    """)
+    conn.execute("INSERT INTO students (name, roll_no) VALUES ('Ann', 'S1'), ('Bob', 'S2')")
+    conn.executemany(
+        "INSERT INTO attendance (student_id, student_name, status, timestamp, session) VALUES (?, ?, ?, ?, ?)",
+        [(1, "Ann", "Present", "2024-05-01 09:00:00", "Morning"),
+         (1, "Ann", "Present", "2024-05-01 09:05:00", "Morning"),
+         (2, "Bob", "Present", "2024-05-01 09:10:00", "Morning"),
+         (2, "Bob", "Present", "2024-05-02 09:00:00", "Morning")],
+    )
+    conn.commit()
+
+
+def columns(conn, table):
+    return {col[1]: col for col in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def indexes(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA index_list({table})")}
+
+
+def test_fresh_database(conn):
+    assert migrate(conn) == SCHEMA_VERSION
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert columns(conn, "attendance")["date"][3] == 1  # NOT NULL
+    assert "uq_attendance_student_date_session" in indexes(conn, "attendance")
+    assert {"sighting_count", "last_seen", "alert_key"} <= set(columns(conn, "unverified_faces"))
+    assert "uq_unverified_alert_key" in indexes(conn, "unverified_faces")
+    # Running again is a no-op
+    assert migrate(conn) == SCHEMA_VERSION
+
+
+def test_timestamp_layout_is_rebuilt_and_duplicates_archived(conn):
+    timestamp_layout(conn)
+    migrate(conn)
+
+    assert columns(conn, "attendance")["date"][3] == 1
+    rows = conn.execute("SELECT id, date FROM attendance ORDER BY id").fetchall()
+    assert rows == [(1, "2024-05-01"), (3, "2024-05-01"), (4, "2024-05-02")]
+    archived = conn.execute("SELECT id, timestamp FROM attendance_duplicates").fetchall()
+    assert archived == [(2, "2024-05-01 09:05:00")]
+    assert {"idx_attendance_date_session", "idx_attendance_student_date",
+            "uq_attendance_student_date_session"} <= indexes(conn, "attendance")
+    # Summaries are built from the converted rows
+    assert conn.execute("SELECT SUM(present) FROM attendance_student_summary").fetchone()[0] == 3
+
+
+def test_date_time_layout_is_converted(conn):
+    conn.execute(STUDENTS)
+    conn.execute("""
+        CREATE TABLE attendance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER, date TEXT, time TEXT, status TEXT, session TEXT
+        )
+    """)
+    conn.execute("INSERT INTO students (name, roll_no) VALUES ('Ann', 'S1')")
+    conn.execute("INSERT INTO attendance (student_id, date, time, status, session) "
+                 "VALUES (1, '2024-05-01', '09:00:00', 'Present', 'Morning')")
+    conn.commit()
+    migrate(conn)
+
+    row = conn.execute("SELECT student_name, timestamp, date FROM attendance").fetchone()
+    assert row == ("Ann", "2024-05-01 09:00:00", "2024-05-01")
+
+
+def test_duplicates_are_kept_when_allowed(conn, monkeypatch):
+    monkeypatch.setattr(migrations, "ALLOW_DUPLICATE_ATTENDANCE", True)
+    timestamp_layout(conn)
+    migrate(conn)
+
+    assert conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0] == 4
+    assert conn.execute("SELECT COUNT(*) FROM attendance_duplicates").fetchone()[0] == 0
+    assert "uq_attendance_student_date_session" not in indexes(conn, "attendance")
+
+
+def test_disallowing_duplicates_later_reports_instead_of_deleting(conn, monkeypatch):
+    monkeypatch.setattr(migrations, "ALLOW_DUPLICATE_ATTENDANCE", True)
+    timestamp_layout(conn)
+    migrate(conn)
+
+    monkeypatch.setattr(migrations, "ALLOW_DUPLICATE_ATTENDANCE", False)
+    with pytest.raises(DuplicateAttendanceError):
+        migrate(conn)
+    assert conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0] == 4
+
+    assert archive_duplicates(conn.cursor()) == 1
+    conn.commit()
+    migrate(conn)
+    assert "uq_attendance_student_date_session" in indexes(conn, "attendance")
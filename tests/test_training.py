@@ -0,0 +1,96 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# Ensure project root on sys.path when run from anywhere
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.face_dataset import FaceDataset, scan_dataset
+from backend.train_faces import diff_dataset, assign_labels
+
+# Incremental training: which images are new, changed or removed since the
+# last run, stable labels across runs, and the packed face cache.
+
+
+def write_face(root, rel_path, value):
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cv2.imwrite(path, np.full((40, 40), value, dtype=np.uint8))
+    return path
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    root = str(tmp_path / "train")
+    write_face(root, "S1/a.jpg", 10)
+    write_face(root, "S1/b.jpg", 20)
+    write_face(root, "S2/a.jpg", 30)
+    return root
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_diff_first_run_everything_is_new(dataset_dir):
+    new, changed, removed, entries = diff_dataset(scan_dataset(dataset_dir), {"labels": {}, "files": {}})
+    assert new == ["S1/a.jpg", "S1/b.jpg", "S2/a.jpg"]
+    assert changed == [] and removed == []
+    assert set(entries) == set(new)
+
+
+def test_diff_detects_new_changed_and_removed(dataset_dir):
+    _, _, _, entries = diff_dataset(scan_dataset(dataset_dir), {"labels": {}, "files": {}})
+    manifest = {"labels": {}, "files": entries}
+
+    # Touched but identical: hashed again, not changed
+    bump_mtime(os.path.join(dataset_dir, "S1/a.jpg"))
+    write_face(dataset_dir, "S1/b.jpg", 99)
+    bump_mtime(os.path.join(dataset_dir, "S1/b.jpg"))
+    os.remove(os.path.join(dataset_dir, "S2/a.jpg"))
+    write_face(dataset_dir, "S3/a.jpg", 50)
+
+    new, changed, removed, entries = diff_dataset(scan_dataset(dataset_dir), manifest)
+    assert new == ["S3/a.jpg"]
+    assert changed == ["S1/b.jpg"]
+    assert removed == ["S2/a.jpg"]
+    assert set(entries) == {"S1/a.jpg", "S1/b.jpg", "S3/a.jpg"}
+
+
+def test_diff_unchanged_dataset(dataset_dir):
+    _, _, _, entries = diff_dataset(scan_dataset(dataset_dir), {"labels": {}, "files": {}})
+    assert diff_dataset(scan_dataset(dataset_dir), {"labels": {}, "files": entries})[:3] == ([], [], [])
+
+
+def test_assign_labels_keeps_existing_and_never_reuses():
+    labels = assign_labels({"S1", "S3", "S4"}, {"S1": 0, "S2": 1})
+    # S2 was removed; its label is not handed to a new student
+    assert labels == {"S1": 0, "S3": 2, "S4": 3}
+
+
+def test_face_cache_sync_is_incremental_and_skips_unreadable(dataset_dir, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    with open(os.path.join(dataset_dir, "S2", "broken.jpg"), "wb") as f:
+        f.write(b"not an image")
+
+    dataset = FaceDataset(dataset_dir, cache_dir, size=(20, 20))
+    assert dataset.sync() == 3
+    assert len(dataset) == 3 and "S2/broken.jpg" not in dataset
+    assert dataset.faces.shape == (3, 20, 20)
+    assert dataset.sync() == 0
+
+    write_face(dataset_dir, "S1/b.jpg", 200)
+    bump_mtime(os.path.join(dataset_dir, "S1/b.jpg"))
+    os.remove(os.path.join(dataset_dir, "S2/a.jpg"))
+    dataset = FaceDataset(dataset_dir, cache_dir, size=(20, 20))
+    assert dataset.sync() == 1
+    assert len(dataset) == 2
+    row = dataset.rows(["S1/b.jpg"])[0]
+    assert dataset.faces[row].mean() == pytest.approx(200, abs=2)
+    assert [dataset.students[label] for label in dataset.labels] == ["S1", "S1"]
@@ -0,0 +1,121 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Ensure project root on sys.path when run from anywhere
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from backend.unknown_faces import UnknownFaceCache
+
+# Grouping of unknown-face sightings into alerts: clustering by histogram
+# distance, sighting counts and better crops sent on flush, jobs refused by
+# a backed-up writer retried, and people forgotten after the TTL.
+
+
+class FakeWriter:
+    """Records the jobs an AlertWriter would queue; refuses them while `accept` is False."""
+
+    def __init__(self):
+        self.accept = True
+        self.jobs = []
+        self._keys = 0
+
+    def new_key(self, timestamp):
+        self._keys += 1
+        return f"unknown_face_{self._keys}"
+
+    def _offer(self, job):
+        if self.accept:
+            self.jobs.append(job)
+        return self.accept
+
+    def add(self, alert_key, crop, detected_time):
+        return self._offer(("new", alert_key))
+
+    def replace_image(self, alert_key, crop):
+        return self._offer(("image", alert_key))
+
+    def update_sightings(self, alert_key, sighting_count, last_seen):
+        return self._offer(("seen", alert_key, sighting_count))
+
+
+def intensity_histogram(faces):
+    """Stand-in for the LBPH histogram: normalized grey-level histogram of each face."""
+    return np.stack([np.histogram(face, bins=16, range=(0, 256))[0] / face.size for face in faces])
+
+
+def frame(value, noise=0, seed=0):
+    pixels = np.full((100, 100), value, dtype=np.float64)
+    if noise:
+        pixels += np.random.default_rng(seed).normal(0, noise, pixels.shape)
+    return np.clip(pixels, 0, 255).astype(np.uint8)
+
+
+def cache(writer, **kwargs):
+    kwargs.setdefault("match_threshold", 1.0)
+    kwargs.setdefault("flush_interval", 0)
+    return UnknownFaceCache(intensity_histogram, writer, **kwargs)
+
+
+def test_sightings_of_one_person_share_an_alert():
+    writer = FakeWriter()
+    faces = cache(writer)
+    first = faces.observe(frame(40), 10, 10, 50, 50)
+    assert faces.observe(frame(40), 12, 8, 50, 50) is first
+    other = faces.observe(frame(200), 10, 10, 50, 50)
+
+    assert other is not first and len(faces.people) == 2
+    assert first.sightings == 2 and faces.alerts_created == 2
+    assert writer.jobs == [("new", "unknown_face_1"), ("new", "unknown_face_2")]
+
+    faces.flush()
+    assert writer.jobs[2:] == [("seen", "unknown_face_1", 2)]
+    # Nothing changed since: nothing more to send
+    faces.flush()
+    assert len(writer.jobs) == 3
+
+
+def test_sharper_crop_replaces_the_alert_image():
+    writer = FakeWriter()
+    faces = UnknownFaceCache(lambda batch: np.ones((len(batch), 4)), writer, match_threshold=1.0,
+                             flush_interval=0, min_gain=1.2)
+    person = faces.observe(frame(120), 0, 0, 60, 60)
+    faces.observe(frame(120, noise=30), 0, 0, 60, 60)
+    assert person.crop_dirty
+
+    faces.flush()
+    assert ("image", person.alert_key) in writer.jobs and not person.crop_dirty
+
+
+def test_refused_alerts_are_offered_again():
+    writer = FakeWriter()
+    writer.accept = False
+    faces = cache(writer)
+    person = faces.observe(frame(40), 0, 0, 50, 50)
+    faces.observe(frame(40), 0, 0, 50, 50)
+    assert not person.saved and faces.alerts_created == 0
+
+    writer.accept = True
+    faces.flush()
+    assert person.saved and faces.alerts_created == 1
+    # The sightings made while refused go out with the next flush
+    faces.flush()
+    assert writer.jobs == [("new", person.alert_key), ("seen", person.alert_key, 2)]
+
+
+def test_people_expire_after_ttl():
+    writer = FakeWriter()
+    faces = cache(writer, ttl=60)
+    old = faces.observe(frame(40), 0, 0, 50, 50)
+    recent = faces.observe(frame(200), 0, 0, 50, 50)
+    old.last_seen = datetime.now() - timedelta(seconds=120)
+
+    faces.tick()
+    assert faces.people == [recent]
+    # The same face seen again now starts a new alert
+    assert faces.observe(frame(40), 0, 0, 50, 50) is not old
+    assert faces.alerts_created == 3